@@ -2,8 +2,14 @@ import sys
 import os
 import argparse
 import pathlib
-
-from typing import Dict, Tuple, List, Union, Optional
+import asyncio
+import functools
+import collections
+import contextlib
+import io
+from datetime import timedelta
+
+from typing import Dict, Tuple, List, Union, Optional, Callable, Iterator
 import orjson
 from orjson import JSONDecodeError
 import networkx as nx
@@ -18,7 +24,30 @@ from modules_script import m_preprocess_text
 from modules_script import m_process_text
 from modules_script import m_graph_nx
 from modules_script import m_graph_custom
-
+from modules_script import m_window_rank
+from modules_script import m_dedup
+from modules_script import m_rank_service
+from modules_script import m_pipeline
+from modules_script import m_ngram
+from modules_script import m_prune
+from modules_script import m_heavy_hitters
+from modules_script import m_sweep
+from modules_script import m_distributed
+from modules_script import m_rank_cache
+from modules_script import m_checkpoint
+from modules_script import m_stream
+from modules_script import m_extract
+from modules_script import m_summarize
+from modules_script import m_graph_sparse
+from modules_script import m_memory
+from modules_script import m_profile
+from modules_script import m_planner
+from modules_script import m_corpus
+from modules_script import m_score
+
+
+# Compiled extraction of the text fields of the records
+TEXT_EXTRACTOR = m_extract.KeyPathExtractor(TARGET_DATA_KEYS) if TARGET_DATA_KEYS else m_extract.KeyPathExtractor.from_target_key(TARGET_DATA_KEY)
 
 print("==================================")
 print()
@@ -42,6 +71,233 @@ def get_command_line_arg() -> argparse.ArgumentParser.parse_args:
         help="Exclude specified json file(s)" 
     )
 
+    parser.add_argument(
+        "-w", "--window",
+        type=float,
+        metavar="HOURS",
+        help="Rank a sliding time window of the given size (in hours) over the record date, refreshed every bucket"
+    )
+
+    parser.add_argument(
+        "--window-bucket",
+        type=float,
+        default=1,
+        metavar="HOURS",
+        help="Time bucket size (in hours) of the sliding window. Defaults to 1"
+    )
+
+    parser.add_argument(
+        "--window-top",
+        type=int,
+        default=20,
+        metavar="K",
+        help="Number of top scores written for each window. Defaults to 20"
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        nargs="?",
+        type=int,
+        const=max(1, (os.cpu_count() or 2) // 2),
+        metavar="WORKERS",
+        help="Overlap reading, preprocessing, ranking and writing of different files, with WORKERS processes per CPU-bound stage (defaults to half the CPUs)"
+    )
+
+    parser.add_argument(
+        "--sweep-alpha",
+        nargs="+",
+        type=float,
+        metavar="ALPHA",
+        help="Parameter sweep: damping factor values (defaults to the configured damping_factor)"
+    )
+
+    parser.add_argument(
+        "--sweep-threshold",
+        nargs="+",
+        type=float,
+        metavar="EPSILON",
+        help="Parameter sweep: calculation threshold values (defaults to the configured calculation_threshold)"
+    )
+
+    parser.add_argument(
+        "--sweep-bias",
+        nargs="+",
+        type=int,
+        metavar="AMOUNT",
+        help="Parameter sweep: TrustRank bias amount values (defaults to the configured trustrank_bias_amount)"
+    )
+
+    parser.add_argument(
+        "--shared-dir",
+        metavar="DIR",
+        help="Distributed batch mode: shared directory used to coordinate the nodes (requires --shard-index and --shard-count)"
+    )
+
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        help="Distributed batch mode: index of this node (0 to shard count - 1)"
+    )
+
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        help="Distributed batch mode: total number of nodes"
+    )
+
+    parser.add_argument(
+        "--shard-records",
+        action="store_true",
+        help="Distributed batch mode: shard the records of every file instead of the files"
+    )
+
+    parser.add_argument(
+        "--job",
+        default="job",
+        help="Distributed batch mode: job name, used to name the shared files and the outputs. Defaults to 'job'"
+    )
+
+    parser.add_argument(
+        "--reduce-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Distributed batch mode: maximum time to wait for the other nodes before reducing. Defaults to no limit"
+    )
+
+    parser.add_argument(
+        "--stale-lock",
+        type=float,
+        metavar="SECONDS",
+        help="Distributed batch mode: take over locks older than this, left by crashed nodes. Defaults to never"
+    )
+
+    parser.add_argument(
+        "--stdin",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="Streaming mode: read JSON Lines (optionally gzip) from stdin, or from PATH (a file or FIFO)"
+    )
+
+    parser.add_argument(
+        "--score",
+        metavar="PATH",
+        help="Score the documents of PATH (a JSON file, or JSON Lines from a file, FIFO or stdin with '-') with the term rankings of --score-with"
+    )
+
+    parser.add_argument(
+        "--score-with",
+        metavar="DATA_NAME",
+        help="Name of the ranked dataset file whose inverse PageRank and TrustRank outputs are used by --score"
+    )
+
+    parser.add_argument(
+        "--benchmark-score",
+        action="store_true",
+        help="With --score: print the scoring throughput (documents/s) serially and with thread and process pools instead of writing the scores"
+    )
+
+    parser.add_argument(
+        "--emit-every",
+        type=int,
+        metavar="N",
+        help="Streaming mode: write the ranking every N records, in addition to the end of the stream"
+    )
+
+    parser.add_argument(
+        "--stream-name",
+        default="stream",
+        help="Streaming mode: name used for the output files. Defaults to 'stream'"
+    )
+
+    parser.add_argument(
+        "--benchmark-extract",
+        action="store_true",
+        help="Benchmark the text extraction of the target key (get_from_nested_key vs the compiled extractor) on the dataset files"
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile every stage with cProfile and tracemalloc, write the reports to the output directory and print the hottest functions"
+    )
+
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of hot functions and allocation lines reported per stage with --profile. Defaults to 10"
+    )
+
+    parser.add_argument(
+        "--corpus",
+        action="store_true",
+        help="Build one global graph over all selected files, rank it once, and rank each file as a personalized run on it (warm-started from the global scores)"
+    )
+
+    parser.add_argument(
+        "--calibrate-planner",
+        action="store_true",
+        help="Fit the cost model of the ranking planner by benchmarking every backend on synthetic graphs, and save it to the cache directory"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the previous batch run from its checkpoints (completed files are skipped)"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not use the rank cache for this run"
+    )
+
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Remove every cached ranking before running"
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a long-running local ranking service instead of a batch run"
+    )
+
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Host of the ranking service. Defaults to 127.0.0.1"
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Port of the ranking service. Defaults to 8765"
+    )
+
+    parser.add_argument(
+        "--unix-socket",
+        metavar="PATH",
+        help="Serve on a Unix socket instead of TCP"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes of the ranking service and parameter sweeps. Defaults to the number of CPUs"
+    )
+
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of rankings running at once in the service. Defaults to 4"
+    )
+
     args = parser.parse_args()
 
     return args
@@ -60,10 +316,34 @@ def print_settings() -> None:
     print(f"SHOW_GRAPH\t\t\t: {SHOW_GRAPH}")
     print()
 
-    print(f"TARGET_DATA_KEY\t\t\t: {'.'.join(TARGET_DATA_KEY)}")
+    print(f"DEDUP_ENABLED\t\t\t: {DEDUP_ENABLED}")
+    print(f"PRUNING_ENABLED\t\t\t: {PRUNING_ENABLED}")
+    print(f"HEAVY_HITTERS_ENABLED\t\t: {HEAVY_HITTERS_ENABLED}")
+    print(f"RANK_CACHE_ENABLED\t\t: {RANK_CACHE_ENABLED}")
+    print(f"CHECKPOINT_ENABLED\t\t: {CHECKPOINT_ENABLED}")
+    print(f"SUMMARIZATION_ENABLED\t\t: {SUMMARIZATION_ENABLED}")
+    print(f"MEMORY_SCORE_DTYPE\t\t: {MEMORY_SCORE_DTYPE} (budget: {MEMORY_BUDGET_MB} MB, {MEMORY_ON_EXCEED})")
+    print(f"PLANNER_ENABLED\t\t\t: {PLANNER_ENABLED}")
+    print(f"CORPUS_FILE_WEIGHT\t\t: {CORPUS_FILE_WEIGHT}")
+    print(f"SCORING_WORKERS\t\t\t: {SCORING_WORKERS} ({SCORING_POOL} pool, batch size: {SCORING_BATCH_SIZE})")
+    print()
+
+    target_keys = [".".join(map(str, path)) + (f" (weight {weight})" if weight != 1 else "") for path, weight in TEXT_EXTRACTOR.paths]
+    print(f"TARGET_DATA_KEY\t\t\t: {', '.join(target_keys) or None}")
+    print(f"NGRAM_SIZE\t\t\t: {NGRAM_SIZE} (skip: {NGRAM_SKIP})")
     print(f"MAX_CALCULATION_THRESHOLD\t: {CALCULATION_THRESHOLD}")
     print(f"MAX_CALCULATION_ITERATION\t: {MAX_CALCULATION_ITERATION}")
     print(f"MAX_TRUST_RANK_ITERATION\t: {MAX_TRUST_RANK_ITERATION}")
+    print(f"DAMPING_FACTOR\t\t\t: {DAMPING_FACTOR}")
+    print(f"MAX_SUMMARIZE_LENGTH\t\t: {MAX_SUMMARIZE_LENGTH}")
+    print()
+
+
+def print_profile(profiler: m_profile.StageProfiler) -> None:
+    profiler.write_summary()
+    print("* Profile (hottest functions by self time, with their share of the stage time)")
+    print(profiler.format_summary())
+    print(f"  reports: {profiler.output_dir}")
     print()
 
 
@@ -80,7 +360,95 @@ def get_all_files_name(dir: str, extension: Optional[List[str]] = None) -> List[
     return [file for file in os.listdir(dir) if os.path.isfile(os.path.join(dir, file))]
 
 
-def processed_text(data_path: str, write_to_output: bool = True, output_path: str = OUTPUT_DIR, logging: bool = False) -> List[Tuple[str, str, int]]:
+def records_to_weighted_bigrams(all_text_data: List[Union[Dict[str, any], str]], logging: bool = False, sentence_index: Optional[m_summarize.SentenceIndex] = None, extractor: Optional[m_extract.KeyPathExtractor] = None) -> List[Tuple[str, str, int]]:
+    """
+    Convert the records of a dataset to weighted bigrams (without any file I/O).
+
+    Parameters
+    ----------
+    all_text_data : List[Union[Dict[str, any], str]]
+        The records of the dataset.
+    logging : bool, optional
+        Whether to print the deduplication report. Defaults to False.
+    sentence_index : m_summarize.SentenceIndex, optional
+        If given, the sentences of the texts are added to it while they are preprocessed.
+    extractor : m_extract.KeyPathExtractor, optional
+        The extraction of the text fields. Defaults to TEXT_EXTRACTOR (the configured target key(s)).
+
+    Returns
+    -------
+    List[Tuple[str, str, int]]
+        The weighted bigrams, sorted by weight.
+    """
+    # Extract the text fields of every record (each with the weight of its key path)
+    extractor = extractor or TEXT_EXTRACTOR
+    extracted_texts = list(extractor.iter_texts(all_text_data))
+    if len(extracted_texts) == 0 and len(all_text_data) > 0:
+        raise KeyError(f"No text found in the records with the target key(s) {extractor.paths or 'None'}")
+    if extractor.skipped_records > 0:
+        print(f"  Warning: {extractor.skipped_records} of {len(all_text_data)} record(s) without text at the target key(s) skipped")
+
+    # Collapse duplicate texts first (if enabled), separately for each field weight
+    if DEDUP_ENABLED:
+        lsh = m_dedup.MinHashLSH(
+            num_perm=DEDUP_NUM_PERM,
+            bands=DEDUP_BANDS,
+            threshold=DEDUP_SIMILARITY_THRESHOLD,
+            shingle_size=DEDUP_SHINGLE_SIZE
+        )
+        texts_by_weight: Dict[int, List[str]] = dict()
+        for text, weight in extracted_texts:
+            texts_by_weight.setdefault(weight, []).append(text)
+
+        all_text, multiplicities = [], []
+        for weight, texts in texts_by_weight.items():
+            unique_texts, text_multiplicities, dedup_report = m_dedup.dedup_texts(
+                texts,
+                near_duplicate=DEDUP_NEAR_DUPLICATE,
+                lsh=lsh
+            )
+            all_text.extend(unique_texts)
+            multiplicities.extend(multiplicity * weight if DEDUP_COUNT_DUPLICATES else weight for multiplicity in text_multiplicities)
+            if logging:
+                field = f"(weight {weight}) " if len(texts_by_weight) > 1 else ""
+                print(f"  {field}records: {dedup_report['records']}, unique: {dedup_report['exact_unique']}, near-unique: {dedup_report['near_unique']}")
+                print(f"  {field}eliminated: {dedup_report['eliminated_ratio']:.2%} of records, {dedup_report['eliminated_chars_ratio']:.2%} of text")
+    else:
+        all_text = [text for text, _ in extracted_texts]
+        multiplicities = [weight for _, weight in extracted_texts]
+
+    # Preprocess text data & count weighted edges between consecutive n-grams (on token ids)
+    edge_counter = create_edge_counter()
+    for text_part, multiplicity in zip(all_text, multiplicities):
+        if text_part is None:
+            continue
+        if sentence_index is not None:
+            # Preprocessed sentence by sentence, which gives the same words as the whole text
+            edge_counter.add_words(sentence_index.add_text(text_part, multiplicity), multiplicity)
+        else:
+            edge_counter.add_words(m_preprocess_text.preprocess_text(text_part), multiplicity)
+
+    return edge_counter_to_weighted_bigrams(edge_counter, logging=logging)
+
+
+def create_edge_counter() -> Union[m_ngram.NgramEdgeCounter, m_heavy_hitters.HeavyHitterEdgeCounter]:
+    # Approximate heavy hitter counting keeps a fixed number of edge counters (if enabled)
+    if HEAVY_HITTERS_ENABLED:
+        return m_heavy_hitters.HeavyHitterEdgeCounter(HEAVY_HITTERS_CAPACITY, n=NGRAM_SIZE, skip=NGRAM_SKIP)
+    return m_ngram.NgramEdgeCounter(n=NGRAM_SIZE, skip=NGRAM_SKIP)
+
+
+def edge_counter_to_weighted_bigrams(edge_counter: Union[m_ngram.NgramEdgeCounter, m_heavy_hitters.HeavyHitterEdgeCounter], logging: bool = False) -> List[Tuple[str, str, int]]:
+    if HEAVY_HITTERS_ENABLED:
+        weighted_bigrams = edge_counter.weighted_edges(HEAVY_HITTERS_TOP_EDGES, sort=True)
+        if logging:
+            print(f"  heavy hitters: {len(weighted_bigrams)} edges kept, max count error: {edge_counter.sketch.max_error:.2f}")
+        return weighted_bigrams
+
+    return edge_counter.weighted_edges(sort=True)
+
+
+def processed_text(data_path: str, write_to_output: bool = True, output_path: str = OUTPUT_DIR, logging: bool = False, sentence_index: Optional[m_summarize.SentenceIndex] = None) -> List[Tuple[str, str, int]]:
     
     """
     Preprocesses text data and writes the result to cache.
@@ -99,6 +467,8 @@ def processed_text(data_path: str, write_to_output: bool = True, output_path: st
         The path to write the result to. Defaults to OUTPUT_DIR.
     logging : bool, optional
         Whether to print the result. Defaults to False.
+    sentence_index : m_summarize.SentenceIndex, optional
+        If given, the sentences of the text data are indexed for summarization.
 
     Returns
     -------
@@ -109,14 +479,7 @@ def processed_text(data_path: str, write_to_output: bool = True, output_path: st
     # Get raw text data
     all_text_data = read_json(data_path)
 
-    # Preprocess & process text data
-    processed_text_data = m_process_text.json_to_bigrams(all_text_data, TARGET_DATA_KEY, throw_key_error=True)
-
-    # Merge multiple text data (list of bigrams)
-    processed_text_data = m_process_text.merge_multiple_bigrams_list(processed_text_data, sort=False)
-
-    # Convert to weighted bigrams
-    processed_text_data = m_process_text.bigrams_to_weighted_bigrams(processed_text_data, sort=True)
+    processed_text_data = records_to_weighted_bigrams(all_text_data, logging=logging, sentence_index=sentence_index)
 
     # Write to cache
     if write_to_output:
@@ -125,16 +488,201 @@ def processed_text(data_path: str, write_to_output: bool = True, output_path: st
     return processed_text_data
 
 
-def calculate_inverse_pagerank(word_graph: Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph], epsilon: float = CALCULATION_THRESHOLD, max_iter: int = MAX_CALCULATION_ITERATION) -> Dict[str, float]:
+def prune_bigrams(bigrams_list: List[Tuple[str, str, int]], logging: bool = False) -> List[Tuple[str, str, int]]:
+    """
+    Prune weighted bigrams with the configured thresholds (see m_prune.prune_weighted_edges).
+    Raises ValueError if the thresholds remove every edge (there would be nothing to rank).
+    """
+    pruned_bigrams_list, pruning_report = m_prune.prune_weighted_edges(
+        bigrams_list,
+        min_edge_weight=PRUNING_MIN_EDGE_WEIGHT,
+        min_node_frequency=PRUNING_MIN_NODE_FREQUENCY,
+        max_vocabulary=PRUNING_MAX_VOCABULARY,
+        k_core=PRUNING_K_CORE
+    )
+    if logging:
+        print(f"  nodes: {pruning_report['nodes_before']} -> {pruning_report['nodes_after']} (-{pruning_report['node_reduction']:.1%})")
+        print(f"  edges: {pruning_report['edges_before']} -> {pruning_report['edges_after']} (-{pruning_report['edge_reduction']:.1%})")
+
+    if len(pruned_bigrams_list) == 0 and len(bigrams_list) > 0:
+        raise ValueError(
+            f"Pruning removed all {len(bigrams_list)} edges (min_edge_weight: {PRUNING_MIN_EDGE_WEIGHT}, "
+            f"min_node_frequency: {PRUNING_MIN_NODE_FREQUENCY}, max_vocabulary: {PRUNING_MAX_VOCABULARY}, "
+            f"k_core: {PRUNING_K_CORE}); lower the pruning thresholds or disable pruning for this input"
+        )
+    return pruned_bigrams_list
+
+
+def service_weighted_bigrams(records: List[Union[Dict[str, any], str]], key_paths: Optional[List[any]] = None) -> List[Tuple[str, str, int]]:
+    """
+    Weighted bigrams of the records of a ranking service request, as in the default calculation
+    mode (extraction, deduplication, n-gram counting and pruning). Runs in the service workers.
+    `key_paths` overrides the configured target key(s) (an empty list: the records are the texts).
+    """
+    extractor = TEXT_EXTRACTOR if key_paths is None else m_extract.KeyPathExtractor(key_paths)
+    bigrams_list = records_to_weighted_bigrams(records, extractor=extractor)
+    if PRUNING_ENABLED:
+        bigrams_list = prune_bigrams(bigrams_list)
+    return bigrams_list
+
+
+def build_service_graph(bigrams_list: List[Tuple[str, str, int]]) -> Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph]:
+    """
+    Build the graph of a ranking service request or dataset with the configured backend (or the
+    planned one, if PLANNER_ENABLED). Runs in the service workers, which keep dataset graphs resident.
+    """
+    if PLANNER_ENABLED and len(bigrams_list) > 0:
+        plan = plan_ranking(bigrams_list)
+        return generate_word_graph(bigrams_list, plan["backend"], workers=plan["workers"])
+    return generate_word_graph(bigrams_list)
+
+
+def rank_word_graph(word_graph: Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph], bias_amount: int = TRUST_RANK_BIAS_AMOUNT) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+    """
+    Sorted inverse PageRank and TrustRank scores of a graph, with the configured damping factor,
+    threshold and iterations (as in calculation_main, without checkpoints and cache).
+    """
+    if len(word_graph.nodes) == 0:
+        return [], []
+    sorted_inverse_pagerank_scores = m_graph_custom.get_sorted_rank_score(calculate_inverse_pagerank(word_graph))
+    sorted_trust_rank_scores = m_graph_custom.get_sorted_rank_score(calculate_trust_rank(word_graph, sorted_inverse_pagerank_scores, bias_amount))
+    return sorted_inverse_pagerank_scores, sorted_trust_rank_scores
+
+
+def rank_bigrams(bigrams_list: List[Tuple[str, str, int]]) -> List[Tuple[str, float]]:
+    """
+    Build the graph of weighted bigrams and return its sorted inverse PageRank scores.
+    """
+    if len(bigrams_list) == 0:
+        return []
+    return m_graph_custom.get_sorted_rank_score(calculate_inverse_pagerank(generate_word_graph(bigrams_list)))
+
+
+def get_rank_backend() -> str:
+    """
+    The configured ranking backend: "nx", "custom", or "float64" / "float32" (compact scores, see m_memory.BACKEND_FOOTPRINT).
+    """
+    if MEMORY_SCORE_DTYPE is not None:
+        return MEMORY_SCORE_DTYPE
+    return "nx" if USE_PAGERANK_LIBRARY else "custom"
+
+
+def get_inverse_pagerank_file_name(name: str, backend: Optional[str] = None) -> str:
+    """
+    Output file name of the inverse PageRank scores, named after the backend that ranked them
+    (defaults to the configured one): inverse_pagerank_{nx|custom|float64|float32}_{name}.
+    """
+    return f"inverse_pagerank_{backend or get_rank_backend()}_{name}"
+
+
+def get_run_summary_file_name(name: str) -> str:
+    return f"run_summary_{name}"
+
+
+def write_rankings(name: str, sorted_inverse_pagerank_scores: List[Tuple[str, float]], sorted_trust_rank_scores: List[Tuple[str, float]], backend: Optional[str] = None) -> None:
+    """
+    Write the inverse PageRank and TrustRank scores of `name` to OUTPUT_DIR, and the run summary
+    recording the backend and the output files of this run (read by load_term_index, since the
+    outputs of other backends from previous runs may still be there).
+    """
+    backend = backend or get_rank_backend()
+    output_file_name = get_inverse_pagerank_file_name(name, backend)
+    write_to_file(f"{OUTPUT_DIR}/{output_file_name}", to_json(sorted_inverse_pagerank_scores, indent=True), overwrite=True)
+    write_to_file(f"{OUTPUT_DIR}/trust_rank_{name}", to_json(sorted_trust_rank_scores, indent=True), overwrite=True)
+    write_to_file(
+        f"{OUTPUT_DIR}/{get_run_summary_file_name(name)}",
+        to_json({"backend": backend, "inverse_pagerank": output_file_name, "trust_rank": f"trust_rank_{name}"}, indent=True),
+        overwrite=True
+    )
+
+
+def generate_word_graph(bigrams_list: List[Tuple[str, str, int]], backend: Optional[str] = None, workers: int = 1) -> Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph]:
+    backend = backend or get_rank_backend()
+    if backend == "nx":
+        return m_graph_nx.generate_graph(bigrams_list, weighted=True)
+    if backend in ("float64", "float32"):
+        return m_graph_sparse.SparseWordGraph(bigrams_list, dtype=backend, workers=workers)
+    return m_graph_custom.WeightedWordDiGraph(bigrams_list)
+
+
+def plan_ranking(bigrams_list: List[Tuple[str, str, int]]) -> Dict[str, any]:
+    """
+    Inspect the weighted bigrams and plan the backend and worker threads of their ranking with the
+    cost model of m_planner (calibrated with --calibrate-planner, the defaults otherwise).
+    """
+    stats = m_planner.inspect_graph(bigrams_list)
+    plan = m_planner.plan_ranking(
+        stats,
+        cost_model=m_planner.load_cost_model(PLANNER_COST_MODEL_PATH),
+        max_iter=MAX_CALCULATION_ITERATION,
+        trust_rank_max_iter=MAX_TRUST_RANK_ITERATION,
+        memory_limit_bytes=int(MEMORY_BUDGET_MB * 1024 * 1024) if MEMORY_BUDGET_MB is not None else None,
+        backends=PLANNER_BACKENDS,
+        max_workers=PLANNER_MAX_WORKERS
+    )
+    plan["stats"] = stats
+
+    print(f"  nodes: {stats['nodes']}, edges: {stats['edges']}, dangling: {stats['dangling_fraction']:.1%}, components: {stats['components']} (largest: {stats['largest_component_fraction']:.1%}), cpus: {stats['cpus']}")
+    print(m_planner.format_plan(plan))
+    return plan
+
+
+def log_plan(data_name: str, plan: Dict[str, any], backend: str, actual_ms: float) -> None:
+    """
+    Print the predicted and actual time of a planned ranking, and append them to PLANNER_LOG_PATH.
+    """
+    print(f"* Planned ranking: predicted {plan['predicted_s'] * 1e3:.2f} ms, actual {actual_ms:.2f} ms ({plan['backend']} backend, {plan['workers']} worker(s))")
+    m_planner.append_log(PLANNER_LOG_PATH, {
+        "file": data_name,
+        "stats": plan["stats"],
+        "backend": backend,
+        "planned_backend": plan["backend"],
+        "workers": plan["workers"],
+        "predicted_s": plan["predicted_s"],
+        "actual_s": actual_ms / 1e3,
+    })
+    print()
+
+
+def plan_rank_memory(bigrams_list: List[Tuple[str, str, int]], backend: Optional[str] = None) -> Tuple[str, List[Tuple[str, str, int]]]:
+    """
+    Estimate the peak memory of ranking the weighted bigrams, and downshift to a more compact
+    backend or prune the graph if it exceeds MEMORY_BUDGET_MB (or refuse, see m_memory.plan_memory).
+    `backend` is the planned backend (see plan_ranking), the configured one if None.
+    """
+    budget_bytes = int(MEMORY_BUDGET_MB * 1024 * 1024) if MEMORY_BUDGET_MB is not None else None
+    backend, bigrams_list, memory_report = m_memory.plan_memory(
+        bigrams_list,
+        backend or get_rank_backend(),
+        budget_bytes=budget_bytes,
+        downshift=MEMORY_ON_EXCEED != "refuse"
+    )
+
+    print(f"  estimated peak: {memory_report['estimated_bytes'] / 2**20:.1f} MB (budget: {MEMORY_BUDGET_MB} MB, backend: {backend})")
+    if memory_report["downshifted_from"] is not None:
+        print(f"  downshifted from the {memory_report['downshifted_from']} backend", end="")
+        if memory_report["min_edge_weight"] is not None:
+            print(f", pruned to min edge weight {memory_report['min_edge_weight']} ({memory_report['nodes']} nodes, {memory_report['edges']} edges)", end="")
+        print()
+    return backend, bigrams_list
+
+
+def calculate_inverse_pagerank(word_graph: Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph], alpha: float = DAMPING_FACTOR, epsilon: float = CALCULATION_THRESHOLD, max_iter: int = MAX_CALCULATION_ITERATION, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
     """
     Calculate inverse PageRank scores on a given weighted directed graph.
 
     Parameters
     ----------
-    word_graph : Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph]
+    word_graph : Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph]
         The weighted directed graph to calculate the scores on.
+    alpha : float, optional
+        The damping factor. Defaults to DAMPING_FACTOR.
     max_iter : int, optional
         The maximum number of iterations. Defaults to MAX_CALCULATION_ITERATION.
+    initial_scores : Dict[str, float], optional
+        Scores to start the iteration from (warm start). Defaults to None.
+    snapshot_interval, on_snapshot : optional
+        Periodic score snapshots (see WeightedWordDiGraph.markov_chain). Not supported by the networkx graph.
 
     Returns
     -------
@@ -143,30 +691,156 @@ def calculate_inverse_pagerank(word_graph: Union[nx.DiGraph, m_graph_custom.Weig
 
     Notes
     -----
-    Supports two types of weighted directed graph: nx.DiGraph and m_graph_custom.WeightedWordDiGraph.
+    Supports three types of weighted directed graph: nx.DiGraph, m_graph_custom.WeightedWordDiGraph
+    and m_graph_sparse.SparseWordGraph (compact scores).
     """
     inverse_pagerank_scores = None
 
     if isinstance(word_graph, nx.DiGraph):
-        return m_graph_nx.get_inverse_pagerank(word_graph, max_iter=max_iter)
+        return m_graph_nx.get_inverse_pagerank(word_graph, alpha=alpha, max_iter=max_iter, initial_scores=initial_scores)
 
-    elif isinstance(word_graph, m_graph_custom.WeightedWordDiGraph):
-        return word_graph.get_inverse_pagerank(max_iter=max_iter, epsilon=epsilon)
+    elif isinstance(word_graph, (m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph)):
+        return word_graph.get_inverse_pagerank(alpha=alpha, max_iter=max_iter, epsilon=epsilon, initial_scores=initial_scores, snapshot_interval=snapshot_interval, on_snapshot=on_snapshot)
 
     else:
-        raise TypeError("word_graph must be either nx.DiGraph or m_graph_custom.WeightedWordDiGraph")
+        raise TypeError("word_graph must be either nx.DiGraph, m_graph_custom.WeightedWordDiGraph or m_graph_sparse.SparseWordGraph")
 
 
-def calculate_trust_rank(word_graph: Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph], sorted_inverse_pagerank_scores: List[Tuple[str, float]], bias_amount: int, epsilon: float = CALCULATION_THRESHOLD, max_iter: int = MAX_TRUST_RANK_ITERATION) -> None:
+def calculate_trust_rank(word_graph: Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, m_graph_sparse.SparseWordGraph], sorted_inverse_pagerank_scores: List[Tuple[str, float]], bias_amount: int, alpha: float = DAMPING_FACTOR, epsilon: float = CALCULATION_THRESHOLD, max_iter: int = MAX_TRUST_RANK_ITERATION, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
     if isinstance(word_graph, nx.DiGraph):
-        graph = list(word_graph.word_graph.edges(data=True))
+        graph = list(word_graph.edges(data=True))
         graph = [(n1, n2, p["weight"]) for n1, n2, p in graph]
         word_graph = m_graph_custom.WeightedWordDiGraph(graph)
     
-    return word_graph.get_trust_rank(bias_amount, sorted_inverse_pagerank_scores, epsilon=epsilon, max_iter=max_iter)
+    return word_graph.get_trust_rank(bias_amount, sorted_inverse_pagerank_scores, alpha=alpha, epsilon=epsilon, max_iter=max_iter, initial_scores=initial_scores, snapshot_interval=snapshot_interval, on_snapshot=on_snapshot)
+
+
+def run_ranking_stage(stage: str, rank_function: Callable[..., Dict[str, float]], max_iter: int, initial_scores: Optional[Dict[str, float]] = None, checkpoint: Optional[m_checkpoint.FileCheckpoint] = None) -> List[Tuple[str, float]]:
+    """
+    Run one ranking stage, with checkpointing (if a checkpoint is given).
+
+    A stage completed in a previous run is loaded instead of being calculated again, and an
+    unfinished one continues from its last score snapshot. Snapshots are written every
+    CHECKPOINT_SNAPSHOT_INTERVAL iterations.
+
+    Parameters
+    ----------
+    stage : str
+        Name of the stage in the checkpoint.
+    rank_function : Callable[..., Dict[str, float]]
+        Called with max_iter, initial_scores, snapshot_interval and on_snapshot, returns the scores.
+    max_iter : int
+        The maximum number of iterations.
+    initial_scores : Dict[str, float], optional
+        Scores to start the iteration from (warm start). Defaults to None.
+    checkpoint : m_checkpoint.FileCheckpoint, optional
+        The checkpoint of the file. Defaults to None (no checkpointing).
+
+    Returns
+    -------
+    List[Tuple[str, float]]
+        The sorted scores.
+    """
+    if checkpoint is None:
+        return m_graph_custom.get_sorted_rank_score(rank_function(max_iter=max_iter, initial_scores=initial_scores))
+
+    if checkpoint.has_stage(stage):
+        print("  Loaded from checkpoint")
+        return checkpoint.load_tuples(stage)
+
+    completed_iterations = 0
+    snapshot = checkpoint.load_snapshot(stage)
+    if snapshot is not None:
+        initial_scores, completed_iterations = snapshot
+        print(f"  Continuing from the snapshot of iteration {completed_iterations}")
+
+    scores = rank_function(
+        max_iter=max(max_iter - completed_iterations, 0),
+        initial_scores=initial_scores,
+        snapshot_interval=CHECKPOINT_SNAPSHOT_INTERVAL,
+        on_snapshot=checkpoint.snapshot_writer(stage, completed_iterations)
+    )
+    sorted_scores = m_graph_custom.get_sorted_rank_score(scores)
+    checkpoint.save_stage(stage, sorted_scores)
+    return sorted_scores
 
 
-def calculation_main(data_dir: str, data_name: str) -> None:
+def render_ranked_subgraph(bigrams_list: List[Tuple[str, str, int]], sorted_scores: List[Tuple[str, float]], output_path: str) -> None:
+    """
+    Render the subgraph induced by the top ranked nodes (or a score-weighted sample of nodes) to an image file.
+
+    Only GRAPH_RENDER_TOP_K nodes are drawn, so the layout and drawing cost stay bounded whatever
+    the size of the graph.
+
+    Parameters
+    ----------
+    bigrams_list : List[Tuple[str, str, int]]
+        The weighted edges of the graph.
+    sorted_scores : List[Tuple[str, float]]
+        The ranking scores, highest first.
+    output_path : str
+        The image file to write (PNG or SVG).
+    """
+    nodes = m_graph_nx.select_nodes(sorted_scores, GRAPH_RENDER_TOP_K, weighted_sample=GRAPH_RENDER_SAMPLE)
+    subgraph = m_graph_nx.get_induced_subgraph(bigrams_list, nodes)
+    print(f"  nodes: {len(subgraph.nodes)}, edges: {len(subgraph.edges)} (of {len(sorted_scores)} nodes)")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    render_time = m_graph_nx.render_graph(
+        subgraph,
+        output_path,
+        scores=dict(sorted_scores),
+        layout=GRAPH_RENDER_LAYOUT,
+        layout_iterations=GRAPH_RENDER_LAYOUT_ITERATIONS,
+        edge_labels=GRAPH_RENDER_EDGE_LABELS
+    )
+    print(f"  layout: {render_time['layout_ms']:.2f} ms, drawing: {render_time['draw_ms']:.2f} ms")
+
+
+def create_sentence_index() -> m_summarize.SentenceIndex:
+    return m_summarize.SentenceIndex(n=NGRAM_SIZE, skip=NGRAM_SKIP, min_sentence_words=SUMMARIZATION_MIN_SENTENCE_WORDS)
+
+
+def summarize_ranking(sentence_index: m_summarize.SentenceIndex, sorted_scores: List[Tuple[str, float]], output_path: str) -> List[Tuple[str, float]]:
+    """
+    Write the extractive summary of the indexed sentences: the highest scored sentences (by the
+    sum of the scores of their nodes) within MAX_SUMMARIZE_LENGTH words, in their original order.
+    """
+    timer = SingleTimer()
+    timer.start()
+    sentence_ranking = sentence_index.rank(dict(sorted_scores))
+    rank_ms = timer.get_time_and_restart()
+    summary = sentence_ranking.summarize(MAX_SUMMARIZE_LENGTH)
+    summary_ms = timer.get_time_and_restart()
+
+    print(f"  sentences: {len(sentence_index)}, nodes: {len(sentence_index.node_names)}, summary: {len(summary)} sentences")
+    print(f"  scoring: {rank_ms:.2f} ms, selection: {summary_ms:.2f} ms")
+
+    write_to_file(
+        output_path,
+        to_json({"score": SUMMARIZATION_SCORE, "max_words": MAX_SUMMARIZE_LENGTH, "sentences": summary}, indent=True),
+        overwrite=True
+    )
+    print(f"  Written to {output_path}")
+    return summary
+
+
+def get_ranking_parameters(backend: Optional[str] = None) -> Dict[str, any]:
+    """
+    Parameters that determine the ranking result of a graph (used as the rank cache key).
+    `backend` is the backend actually used, if it differs from the configured one (see plan_rank_memory).
+    """
+    return {
+        "alpha": DAMPING_FACTOR,
+        "epsilon": CALCULATION_THRESHOLD,
+        "max_iter": MAX_CALCULATION_ITERATION,
+        "trust_rank_max_iter": MAX_TRUST_RANK_ITERATION,
+        "bias_amount": TRUST_RANK_BIAS_AMOUNT,
+        "backend": backend or get_rank_backend(),
+    }
+
+
+def calculation_main(data_dir: str, data_name: str, rank_cache: Optional[m_rank_cache.RankCache] = None, checkpoint: Optional[m_checkpoint.FileCheckpoint] = None, profiler: Union[m_profile.StageProfiler, m_profile.NullProfiler] = m_profile.NULL_PROFILER) -> None:
     """
     Main calculation function.
 
@@ -181,6 +855,14 @@ def calculation_main(data_dir: str, data_name: str) -> None:
         The directory of the json file
     data_name : str
         The name of the json file
+    rank_cache : m_rank_cache.RankCache, optional
+        If given, the ranking is skipped when the same graph was already ranked with the same
+        parameters, and warm-started from a previous ranking of the same graph otherwise.
+    checkpoint : m_checkpoint.FileCheckpoint, optional
+        If given, the weighted edges and scores are persisted as each stage completes (and score
+        snapshots during ranking), and stages already in the checkpoint are not run again.
+    profiler : m_profile.StageProfiler, optional
+        If given, every stage is profiled (--profile). Defaults to m_profile.NULL_PROFILER (no profiling).
 
     Returns
     -------
@@ -188,80 +870,874 @@ def calculation_main(data_dir: str, data_name: str) -> None:
     """
     data_path = f"{data_dir}/{data_name}"
 
+    # Sentences are indexed during preprocessing for the summary (if enabled)
+    sentence_index = create_sentence_index() if SUMMARIZATION_ENABLED else None
+
     # Time function runtime
     running_timer = MultipleTimer(["func"])
     
     print(f"=== Calculating {data_name} ===\n")
     
-    print("* ", end="")
     running_timer.timer["func"].start()
-    bigrams_list = processed_text(
-        data_path,
-        output_path=f"{OUTPUT_DIR}/graph_{data_name}",
-        write_to_output=OUTPUT_GRAPH,
-        logging=True
-    )
+    if checkpoint is not None and checkpoint.has_stage("weighted_edges"):
+        with profiler.stage("load_checkpoint"):
+            print("* Loading weighted edges from checkpoint")
+            bigrams_list = checkpoint.load_tuples("weighted_edges")
+            print(f"  edges: {len(bigrams_list)}")
+        print_timer(running_timer.timer["func"])
+
+        if sentence_index is not None:
+            with profiler.stage("index_sentences"):
+                print("* Indexing sentences")
+                sentence_index.add_texts(text for text, _ in TEXT_EXTRACTOR.iter_texts(read_json(data_path)))
+            print_timer(running_timer.timer["func"])
+
+    else:
+        with profiler.stage("preprocess"):
+            print("* ", end="")
+            bigrams_list = processed_text(
+                data_path,
+                output_path=f"{OUTPUT_DIR}/graph_{data_name}",
+                write_to_output=OUTPUT_GRAPH,
+                logging=True,
+                sentence_index=sentence_index
+            )
+        print_timer(running_timer.timer["func"])
+
+
+        # Prune graph (if enabled)
+        if PRUNING_ENABLED:
+            with profiler.stage("prune"):
+                print("* Pruning graph")
+                pruned_bigrams_list = prune_bigrams(bigrams_list, logging=True)
+            print_timer(running_timer.timer["func"])
+
+            if PRUNING_REPORT:
+                with profiler.stage("evaluate_pruning"):
+                    print("* Evaluating pruning")
+                    pruning_evaluation = m_prune.evaluate_pruning(bigrams_list, pruned_bigrams_list, rank_bigrams, top_k=PRUNING_REPORT_TOP_K)
+                    print(f"  ranking: {pruning_evaluation['unpruned_ms']:.2f} ms -> {pruning_evaluation['pruned_ms']:.2f} ms (speedup: {pruning_evaluation['speedup']:.2f}x)")
+                    print(f"  top-{PRUNING_REPORT_TOP_K} overlap: {pruning_evaluation['top_k_overlap']:.0%}")
+                    write_to_file(
+                        f"{OUTPUT_DIR}/pruning_report_{data_name}",
+                        to_json(pruning_evaluation, indent=True),
+                        overwrite=True
+                    )
+                print_timer(running_timer.timer["func"])
+
+            bigrams_list = pruned_bigrams_list
+
+        if checkpoint is not None:
+            checkpoint.save_stage("weighted_edges", bigrams_list)
+
+
+    # Plan the backend and worker threads of the ranking (if enabled)
+    plan = None
+    if PLANNER_ENABLED:
+        with profiler.stage("plan"):
+            print("* Planning ranking")
+            plan = plan_ranking(bigrams_list)
+        print_timer(running_timer.timer["func"])
+
+
+    # Estimate the peak memory of the ranking (downshift if over the memory budget)
+    with profiler.stage("estimate_memory"):
+        print("* Estimating memory")
+        rank_backend, bigrams_list = plan_rank_memory(bigrams_list, plan["backend"] if plan is not None else None)
     print_timer(running_timer.timer["func"])
 
 
-    # Generate graph
-    print("* Creating graph")
-    word_graph: Union[nx.DiGraph, m_graph_custom.WeightedWordDiGraph, None] = None
-    if USE_PAGERANK_LIBRARY:
-        word_graph = m_graph_nx.generate_graph(bigrams_list, weighted=True)
+    # Look up the rank cache (if enabled)
+    cached_ranking = None
+    warm_start = None
+    if rank_cache is not None:
+        with profiler.stage("rank_cache"):
+            rank_fingerprint = m_rank_cache.fingerprint_weighted_edges(bigrams_list)
+            ranking_parameters = get_ranking_parameters(rank_backend)
+            cached_ranking = rank_cache.get(rank_fingerprint, ranking_parameters)
+            if cached_ranking is None:
+                warm_start = rank_cache.get_warm_start(rank_fingerprint, backend=ranking_parameters["backend"])
+
+    if cached_ranking is not None:
+        print(f"* Using cached ranking (graph {rank_fingerprint})")
+        sorted_inverse_pagerank_scores = [tuple(score) for score in cached_ranking["inverse_pagerank"]]
+        sorted_trust_rank_scores = [tuple(score) for score in cached_ranking["trust_rank"]]
+        print_timer(running_timer.timer["func"])
+
     else:
-        word_graph = m_graph_custom.WeightedWordDiGraph(bigrams_list)
-    print(f"  nodes: {len(word_graph.nodes)}, edges: {len(word_graph.edges)}")
+        # Time of the planned part (graph and rankings), compared with the prediction of the plan
+        ranking_timer = SingleTimer()
+
+        # Generate graph
+        with profiler.stage("create_graph"):
+            print("* Creating graph")
+            word_graph = generate_word_graph(bigrams_list, rank_backend, workers=plan["workers"] if plan is not None else 1)
+            print(f"  nodes: {len(word_graph.nodes)}, edges: {len(word_graph.edges)}")
+        print_timer(running_timer.timer["func"])
+
+
+        # Inverse-PageRank
+        with profiler.stage("inverse_pagerank"):
+            print("* Calculating inverse pagerank" + (" (warm start from cache)" if warm_start is not None else ""))
+            sorted_inverse_pagerank_scores = run_ranking_stage(
+                "inverse_pagerank",
+                functools.partial(calculate_inverse_pagerank, word_graph),
+                max_iter=MAX_CALCULATION_ITERATION,
+                initial_scores=dict(warm_start["inverse_pagerank"]) if warm_start is not None else None,
+                checkpoint=checkpoint
+            )
+            print(f"  Sum: {sum(score for _, score in sorted_inverse_pagerank_scores): .4f}")  # Verifying
+        print_timer(running_timer.timer["func"])
+        
+
+        # TODO
+        # TrustRank
+        with profiler.stage("trust_rank"):
+            print("* Calculating trustrank")
+            sorted_trust_rank_scores = run_ranking_stage(
+                "trust_rank",
+                functools.partial(calculate_trust_rank, word_graph, sorted_inverse_pagerank_scores, TRUST_RANK_BIAS_AMOUNT),
+                max_iter=MAX_TRUST_RANK_ITERATION,
+                initial_scores=dict(warm_start["trust_rank"]) if warm_start is not None else None,
+                checkpoint=checkpoint
+            )
+            print(f"  Sum: {sum(score for _, score in sorted_trust_rank_scores): .4f}")  # Verifying
+        print_timer(running_timer.timer["func"])
+
+        if plan is not None:
+            log_plan(data_name, plan, rank_backend, ranking_timer.current_time)
+
+        if rank_cache is not None:
+            rank_cache.put(rank_fingerprint, ranking_parameters, sorted_inverse_pagerank_scores, sorted_trust_rank_scores)
+
+
+    with profiler.stage("write_output"):
+        # Write inverse-PageRank and TrustRank scores to file
+        print("* Writing to output")
+        write_rankings(data_name, sorted_inverse_pagerank_scores, sorted_trust_rank_scores, rank_backend)
+    print_timer(running_timer.timer["func"])
+
+
+    # Summarize (if enabled)
+    if sentence_index is not None:
+        with profiler.stage("summarize"):
+            print("* Summarizing")
+            summarize_ranking(
+                sentence_index,
+                sorted_trust_rank_scores if SUMMARIZATION_SCORE == "trust_rank" else sorted_inverse_pagerank_scores,
+                f"{OUTPUT_DIR}/summary_{data_name}"
+            )
+        print_timer(running_timer.timer["func"])
+
+
+    running_timer.main.stop()
+
+    # Render graph (if SHOW_GRAPH is set to True)
+    if SHOW_GRAPH:
+        with profiler.stage("render_graph"):
+            print("* Rendering graph")
+            render_ranked_subgraph(bigrams_list, sorted_inverse_pagerank_scores, f"{OUTPUT_DIR}/graph_{pathlib.Path(data_name).stem}.{GRAPH_RENDER_FORMAT}")
+        print_timer(running_timer.timer["func"])
+
+
+# Stages of the pipelined mode (--pipeline). Each takes and returns a dictionary of the file's state.
+def pipeline_read_stage(state: Dict[str, any]) -> Dict[str, any]:
+    state["records"] = read_json(f"{state['data_dir']}/{state['data_name']}")
+    return state
+
+
+def pipeline_preprocess_stage(state: Dict[str, any]) -> Dict[str, any]:
+    # Sentences are indexed during preprocessing for the summary (if enabled)
+    state["sentence_index"] = create_sentence_index() if SUMMARIZATION_ENABLED else None
+    state["bigrams_list"] = records_to_weighted_bigrams(state.pop("records"), sentence_index=state["sentence_index"])
+    return state
+
+
+def pipeline_rank_stage(state: Dict[str, any]) -> Dict[str, any]:
+    # The output of the stage is kept with the file (printed once it is finished), so the output of
+    # the files ranked at the same time is not interleaved
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        bigrams_list = state["bigrams_list"]
+        if PRUNING_ENABLED:
+            pruned_bigrams_list = prune_bigrams(bigrams_list, logging=True)
+            if PRUNING_REPORT:
+                state["pruning_report"] = m_prune.evaluate_pruning(bigrams_list, pruned_bigrams_list, rank_bigrams, top_k=PRUNING_REPORT_TOP_K)
+                print(f"  pruning top-{PRUNING_REPORT_TOP_K} overlap: {state['pruning_report']['top_k_overlap']:.0%} (speedup: {state['pruning_report']['speedup']:.2f}x)")
+            bigrams_list = pruned_bigrams_list
+
+        plan = plan_ranking(bigrams_list) if PLANNER_ENABLED else None
+        rank_backend, bigrams_list = plan_rank_memory(bigrams_list, plan["backend"] if plan is not None else None)
+
+        ranking_timer = SingleTimer()
+        word_graph = generate_word_graph(bigrams_list, rank_backend, workers=plan["workers"] if plan is not None else 1)
+        inverse_pagerank_scores = calculate_inverse_pagerank(word_graph)
+        state["sorted_inverse_pagerank_scores"] = m_graph_custom.get_sorted_rank_score(inverse_pagerank_scores)
+
+        trust_rank_scores = calculate_trust_rank(word_graph, state["sorted_inverse_pagerank_scores"], bias_amount=TRUST_RANK_BIAS_AMOUNT, max_iter=MAX_TRUST_RANK_ITERATION)
+        state["sorted_trust_rank_scores"] = m_graph_custom.get_sorted_rank_score(trust_rank_scores)
+
+        if plan is not None:
+            log_plan(state["data_name"], plan, rank_backend, ranking_timer.current_time)
+
+        sentence_index = state.pop("sentence_index")
+        if sentence_index is not None:
+            summarize_ranking(
+                sentence_index,
+                state["sorted_trust_rank_scores"] if SUMMARIZATION_SCORE == "trust_rank" else state["sorted_inverse_pagerank_scores"],
+                f"{OUTPUT_DIR}/summary_{state['data_name']}"
+            )
+
+    state["rank_backend"] = rank_backend
+    state["log"] = log.getvalue()
+    if not OUTPUT_GRAPH:
+        del state["bigrams_list"]
+    return state
+
+
+def pipeline_write_stage(state: Dict[str, any]) -> Dict[str, any]:
+    data_name = state["data_name"]
+
+    if OUTPUT_GRAPH:
+        write_to_file(f"{OUTPUT_DIR}/graph_{data_name}", to_json(state.pop("bigrams_list"), indent=True), overwrite=True)
+
+    if "pruning_report" in state:
+        write_to_file(f"{OUTPUT_DIR}/pruning_report_{data_name}", to_json(state.pop("pruning_report"), indent=True), overwrite=True)
+
+    write_rankings(data_name, state.pop("sorted_inverse_pagerank_scores"), state.pop("sorted_trust_rank_scores"), state["rank_backend"])
+    return state
+
+
+def pipeline_main(data_dir: str, data_file_name: List[str], workers: int, resume: bool = False) -> None:
+    """
+    Calculate all files with overlapped stages.
+
+    File reads and output writes run in threads, preprocessing and graph building + ranking run in
+    process pools of `workers` processes each. The stages are connected by bounded queues, so
+    different files are read, preprocessed, ranked and written at the same time. Graph
+    visualization (SHOW_GRAPH), the rank cache and checkpoints are not supported in this mode
+    (a warning is printed if they are enabled).
+
+    Parameters
+    ----------
+    data_dir : str
+        The directory of the json files
+    data_file_name : List[str]
+        The names of the json files
+    workers : int
+        Number of processes of each CPU-bound stage
+    resume : bool, optional
+        Whether --resume was given (only to warn that it is not supported). Defaults to False.
+
+    Returns
+    -------
+    None
+    """
+    pipeline = m_pipeline.StagedPipeline([
+        m_pipeline.PipelineStage("read", pipeline_read_stage, workers=2),
+        m_pipeline.PipelineStage("preprocess", pipeline_preprocess_stage, workers=workers, use_process=True),
+        m_pipeline.PipelineStage("rank", pipeline_rank_stage, workers=workers, use_process=True),
+        m_pipeline.PipelineStage("write", pipeline_write_stage, workers=2),
+    ], queue_size=max(2, workers))
+
+    print(f"=== Calculating {len(data_file_name)} file(s) (pipelined, {workers} worker(s) per CPU stage) ===\n")
+
+    # The rank cache and the checkpoints are shared on disk by the files, which are ranked at the same time here
+    unsupported = [name for name, enabled in (("rank_cache", RANK_CACHE_ENABLED), ("checkpoint", CHECKPOINT_ENABLED or resume), ("show_graph", SHOW_GRAPH)) if enabled]
+    if len(unsupported) > 0:
+        print(f"Warning: {', '.join(unsupported)} not supported in pipelined mode, ignored\n")
+
+    def print_result(data_name: str, state: Dict[str, any]) -> None:
+        print(f"  Finished {data_name}")
+        print(state["log"], end="")
+
+    pipeline.run(
+        ((data_name, {"data_dir": data_dir, "data_name": data_name}) for data_name in data_file_name),
+        on_result=print_result
+    )
+
+    for data_name, e in pipeline.errors.items():
+        print(f"\nError calculating {data_name} ({type(e)}): {e}")
+    print()
+
+    print("* Stage utilization")
+    for stage_name, stats in pipeline.get_stats().items():
+        print(f"  {stage_name:<12} workers: {stats['workers']:<3} items: {stats['items']:<5} busy: {stats['busy_ms']:>10.2f} ms  starved: {stats['starved_ms']:>10.2f} ms  blocked: {stats['blocked_ms']:>10.2f} ms  utilization: {stats['utilization']:.1%}")
+    print(f"  Bottleneck stage: {pipeline.get_bottleneck()}")
+    print()
+
+
+def corpus_main(data_dir: str, data_file_name: List[str]) -> None:
+    """
+    Corpus calculation function.
+
+    Builds one global weighted graph over all the files (keeping the edge counts of each file as
+    a sparse column, see m_corpus.CorpusGraph) and ranks it once. Each file is then ranked on the
+    shared structure, weighted by its own counts (mixed with the global counts if
+    CORPUS_FILE_WEIGHT < 1) and warm-started from the global scores, instead of building and
+    ranking its own graph.
+
+    The global scores are written to `inverse_pagerank_corpus.json` and `trust_rank_corpus.json`,
+    and the scores of each file to `inverse_pagerank_corpus_{data_name}` and `trust_rank_corpus_{data_name}`.
+
+    Parameters
+    ----------
+    data_dir : str
+        The directory of the json files
+    data_file_name : List[str]
+        The names of the json files
+
+    Returns
+    -------
+    None
+    """
+    running_timer = MultipleTimer(["func"])
+    corpus = m_corpus.CorpusGraph(dtype=MEMORY_SCORE_DTYPE or "float64")
+
+    print(f"=== Calculating corpus of {len(data_file_name)} file(s) (file weight: {CORPUS_FILE_WEIGHT}) ===\n")
+
+    print("* Preprocessing data")
+    for data_name in data_file_name:
+        try:
+            bigrams_list = records_to_weighted_bigrams(read_json(f"{data_dir}/{data_name}"))
+            if PRUNING_ENABLED:
+                bigrams_list = prune_bigrams(bigrams_list)
+        except Exception as e:
+            print(f"  Error preprocessing {data_name} ({type(e)}): {e}")
+            continue
+        corpus.add_file(data_name, bigrams_list)
+        print(f"  {data_name}: {len(bigrams_list)} edges")
+    print(f"  corpus: {corpus.node_count} nodes, {corpus.edge_count} edges, {len(corpus.file_names)} file(s)")
     print_timer(running_timer.timer["func"])
 
+    if len(corpus.file_names) == 0:
+        return
+
+    ranking_parameters = {
+        "bias_amount": TRUST_RANK_BIAS_AMOUNT,
+        "alpha": DAMPING_FACTOR,
+        "epsilon": CALCULATION_THRESHOLD,
+        "max_iter": MAX_CALCULATION_ITERATION,
+        "trust_rank_max_iter": MAX_TRUST_RANK_ITERATION,
+    }
+
+    print("* Ranking global graph")
+    sorted_inverse_pagerank_scores, sorted_trust_rank_scores, iterations = corpus.rank_global(**ranking_parameters)
+    print(f"  iterations: {iterations[0]} (inverse pagerank), {iterations[1]} (trustrank)")
+    write_to_file(f"{OUTPUT_DIR}/inverse_pagerank_corpus.json", to_json(sorted_inverse_pagerank_scores, indent=True), overwrite=True)
+    write_to_file(f"{OUTPUT_DIR}/trust_rank_corpus.json", to_json(sorted_trust_rank_scores, indent=True), overwrite=True)
+    print_timer(running_timer.timer["func"])
 
-    # Inverse-PageRank
-    print("* Calculating inverse pagerank")
-    inverse_pagerank_scores = calculate_inverse_pagerank(word_graph)
-    sorted_inverse_pagerank_scores = m_graph_custom.get_sorted_rank_score(inverse_pagerank_scores)
-    print(f"  Sum: {sum(inverse_pagerank_scores.values()): .4f}")  # Verifying
+    print("* Ranking files (warm start from the global scores)")
+    for file_id, data_name in enumerate(corpus.file_names):
+        sorted_inverse_pagerank_scores, sorted_trust_rank_scores, iterations = corpus.rank_file(file_id, file_weight=CORPUS_FILE_WEIGHT, **ranking_parameters)
+        write_to_file(f"{OUTPUT_DIR}/inverse_pagerank_corpus_{data_name}", to_json(sorted_inverse_pagerank_scores, indent=True), overwrite=True)
+        write_to_file(f"{OUTPUT_DIR}/trust_rank_corpus_{data_name}", to_json(sorted_trust_rank_scores, indent=True), overwrite=True)
+        print(f"  {data_name}: {len(sorted_inverse_pagerank_scores)} nodes, iterations: {iterations[0]} + {iterations[1]}")
     print_timer(running_timer.timer["func"])
-    
 
-    # TODO
-    # TrustRank
-    print("* Calculating trustrank")
-    trust_rank_scores = calculate_trust_rank(word_graph, sorted_inverse_pagerank_scores, bias_amount=TRUST_RANK_BIAS_AMOUNT, max_iter=MAX_TRUST_RANK_ITERATION)
-    sorted_trust_rank_scores = m_graph_custom.get_sorted_rank_score(trust_rank_scores)
-    print(f"  Sum: {sum(trust_rank_scores.values()): .4f}")  # Verifying
+
+def sweep_main(data_dir: str, data_name: str, alphas: List[float], epsilons: List[float], bias_amounts: List[int], workers: Optional[int] = None) -> None:
+    """
+    Parameter sweep function.
+
+    Builds the graph of the json file once and calculates inverse PageRank and TrustRank for every
+    combination of the given parameters in parallel, on a graph shared between the worker processes.
+    The results table is written to `sweep_{data_name}`.
+
+    Parameters
+    ----------
+    data_dir : str
+        The directory of the json file
+    data_name : str
+        The name of the json file
+    alphas : List[float]
+        Damping factor values
+    epsilons : List[float]
+        Calculation threshold values
+    bias_amounts : List[int]
+        TrustRank bias amount values
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    None
+    """
+    running_timer = MultipleTimer(["func"])
+
+    print(f"=== Sweeping {data_name} ({len(alphas) * len(epsilons) * len(bias_amounts)} points) ===\n")
+
+    print("* ", end="")
+    bigrams_list = processed_text(f"{data_dir}/{data_name}", write_to_output=False, logging=True)
+    if PRUNING_ENABLED:
+        bigrams_list = prune_bigrams(bigrams_list, logging=True)
     print_timer(running_timer.timer["func"])
 
+    print("* Running sweep")
+    sweep_results = m_sweep.run_sweep(
+        bigrams_list,
+        alphas=alphas,
+        epsilons=epsilons,
+        bias_amounts=bias_amounts,
+        max_iter=MAX_CALCULATION_ITERATION,
+        trust_rank_max_iter=MAX_TRUST_RANK_ITERATION,
+        workers=workers
+    )
+    for row in sweep_results:
+        top_trust_rank = row["trust_rank"][0][0] if len(row["trust_rank"]) > 0 else "-"
+        print(
+            f"  alpha: {row['alpha']:<6} threshold: {row['calculation_threshold']:<8g} bias: {row['trustrank_bias_amount']:<4} "
+            f"inverse: {row['inverse_pagerank_iterations']:>4} it {'' if row['inverse_pagerank_converged'] else '(not converged) '}{row['inverse_pagerank_ms']:.2f} ms  "
+            f"trust: {row['trust_rank_iterations']:>4} it {'' if row['trust_rank_converged'] else '(not converged) '}{row['trust_rank_ms']:.2f} ms  "
+            f"top: {top_trust_rank}"
+        )
+    print_timer(running_timer.timer["func"])
 
-    # Write inverse-PageRank score to file
     print("* Writing to output")
-    output_file_name = f"inverse_pagerank_nx_{data_name}" if USE_PAGERANK_LIBRARY else f"inverse_pagerank_custom_{data_name}"
     write_to_file(
-        f"{OUTPUT_DIR}/{output_file_name}",
-        to_json(sorted_inverse_pagerank_scores, indent=True), 
+        f"{OUTPUT_DIR}/sweep_{data_name}",
+        to_json(sweep_results, indent=True),
         overwrite=True
     )
+    print_timer(running_timer.timer["func"])
+
+
+def distributed_main(data_dir: str, data_file_name: List[str], cmd_arg: argparse.Namespace) -> None:
+    """
+    Distributed (map/reduce) batch function, run by every node.
+
+    Map: the node converts its deterministic shard of the files (or of the records of every file
+    with --shard-records) to weighted bigrams and writes them as a partial file to the shared directory.
+    Reduce: the first node to take the reduce lock waits for every partial, merges them into one
+    global graph, ranks it and writes `inverse_pagerank_*_{job}.json` and `trust_rank_{job}.json`.
+    Nodes only coordinate through lock/marker files, so a rerun skips the tasks already done.
+
+    Parameters
+    ----------
+    data_dir : str
+        The directory of the json files
+    data_file_name : List[str]
+        The names of the json files (the same list on every node)
+    cmd_arg : argparse.Namespace
+        Command line arguments (shared_dir, shard_index, shard_count, shard_records, job, reduce_timeout, stale_lock)
+
+    Returns
+    -------
+    None
+    """
+    if cmd_arg.shard_index is None or cmd_arg.shard_count is None or not 0 <= cmd_arg.shard_index < cmd_arg.shard_count:
+        raise ValueError("--shared-dir requires --shard-count and a --shard-index between 0 and shard count - 1")
 
-    # Write TrustRank score to file
+    running_timer = MultipleTimer(["func"])
+    coordinator = m_distributed.SharedDirCoordinator(cmd_arg.shared_dir, cmd_arg.job, cmd_arg.shard_count, stale_lock_seconds=cmd_arg.stale_lock)
+    shard_index, shard_count = cmd_arg.shard_index, cmd_arg.shard_count
+
+    print(f"=== Distributed job '{cmd_arg.job}' (node {shard_index + 1}/{shard_count}) ===\n")
+
+    # Map
+    map_task = coordinator.map_task(shard_index)
+    if coordinator.is_done(map_task):
+        print("* Map shard already done, skipping")
+    elif not coordinator.try_lock(map_task):
+        print("* Map shard locked by another node, skipping")
+    else:
+        try:
+            if cmd_arg.shard_records:
+                shard_files = data_file_name
+            else:
+                shard_files = m_distributed.get_file_shard(data_file_name, shard_index, shard_count)
+
+            print(f"* Map: {len(shard_files)} file(s){' (record shard)' if cmd_arg.shard_records else ''}")
+            partial_bigrams_list = []
+            for data_name in shard_files:
+                all_text_data = read_json(f"{data_dir}/{data_name}")
+                if cmd_arg.shard_records:
+                    all_text_data = m_distributed.get_record_shard(all_text_data, shard_index, shard_count)
+                partial_bigrams_list.append(records_to_weighted_bigrams(all_text_data))
+
+            coordinator.write_partial(shard_index, m_distributed.merge_weighted_edges(partial_bigrams_list))
+        finally:
+            coordinator.release_lock(map_task)
+        print_timer(running_timer.timer["func"])
+
+    # Reduce
+    if coordinator.is_done("reduce") or not coordinator.try_lock("reduce"):
+        print("* Reduce done or running on another node")
+        print()
+        return
+
+    try:
+        print(f"* Reduce: waiting for {shard_count} map shard(s)")
+        if not coordinator.wait_for_map(timeout=cmd_arg.reduce_timeout):
+            raise TimeoutError(f"Only {coordinator.map_done_count()}/{shard_count} map shards done")
+
+        bigrams_list = coordinator.read_partials()
+        if PRUNING_ENABLED:
+            bigrams_list = prune_bigrams(bigrams_list, logging=True)
+
+        word_graph = generate_word_graph(bigrams_list)
+        print(f"  nodes: {len(word_graph.nodes)}, edges: {len(word_graph.edges)}")
+
+        inverse_pagerank_scores = calculate_inverse_pagerank(word_graph)
+        sorted_inverse_pagerank_scores = m_graph_custom.get_sorted_rank_score(inverse_pagerank_scores)
+        trust_rank_scores = calculate_trust_rank(word_graph, sorted_inverse_pagerank_scores, bias_amount=TRUST_RANK_BIAS_AMOUNT, max_iter=MAX_TRUST_RANK_ITERATION)
+
+        if OUTPUT_GRAPH:
+            write_to_file(f"{OUTPUT_DIR}/graph_{cmd_arg.job}.json", to_json(bigrams_list, indent=True), overwrite=True)
+        write_rankings(f"{cmd_arg.job}.json", sorted_inverse_pagerank_scores, m_graph_custom.get_sorted_rank_score(trust_rank_scores))
+
+        coordinator.mark_done("reduce")
+    finally:
+        coordinator.release_lock("reduce")
+    print_timer(running_timer.timer["func"])
+
+
+def benchmark_extract_main(data_dir: str, data_file_name: List[str]) -> None:
+    """
+    Compare the extraction throughput of get_from_nested_key and m_extract.KeyPathExtractor on
+    each dataset file, with TARGET_DATA_KEY.
+    """
+    if TARGET_DATA_KEY is None:
+        print("TARGET_DATA_KEY is empty, the records are the texts: nothing to benchmark\n")
+        return
+
+    for data_name in data_file_name:
+        records = read_json(f"{data_dir}/{data_name}")
+        result = m_extract.benchmark_extraction(records, TARGET_DATA_KEY)
+        print(f"=== {data_name} ({result['records']} records) ===")
+        print(f"  decoded records: get_from_nested_key {result['get_from_nested_key']:,.0f} records/s, extractor {result['extractor']:,.0f} records/s ({result['extractor'] / result['get_from_nested_key']:.2f}x)")
+        print(f"  raw JSON records: get_from_nested_key {result['get_from_nested_key_raw']:,.0f} records/s, extractor {result['extractor_raw']:,.0f} records/s ({result['extractor_raw'] / result['get_from_nested_key_raw']:.2f}x)")
+        print()
+
+
+def calibrate_planner_main() -> None:
+    """
+    Fit the cost model of the ranking planner on this host and save it to PLANNER_COST_MODEL_PATH.
+    """
+    print("=== Calibrating planner ===\n")
+    cost_model = m_planner.calibrate_cost_model(logging=True)
+    m_planner.save_cost_model(cost_model, PLANNER_COST_MODEL_PATH)
+    print()
+
+    for term, coefficients in cost_model.items():
+        print(f"  {term:<20}: {coefficients}")
+    print(f"\n  Written to {PLANNER_COST_MODEL_PATH}\n")
+
+
+def load_term_index(data_name: str) -> m_score.TermIndex:
+    """
+    Load the ranked terms written for a dataset file into a TermIndex, from the outputs recorded
+    in its run summary (see write_rankings). Without a run summary (outputs of an older version),
+    the inverse PageRank output is only used if a single backend wrote one.
+    """
+    run_summary_path = pathlib.Path(OUTPUT_DIR) / get_run_summary_file_name(data_name)
+    if run_summary_path.exists():
+        run_summary = read_json(run_summary_path)
+        inverse_pagerank_path = pathlib.Path(OUTPUT_DIR) / run_summary["inverse_pagerank"]
+        trust_rank_path = pathlib.Path(OUTPUT_DIR) / run_summary["trust_rank"]
+    else:
+        output_paths = [pathlib.Path(OUTPUT_DIR) / get_inverse_pagerank_file_name(data_name, backend) for backend in m_planner.BACKENDS]
+        output_paths = [path for path in output_paths if path.exists()]
+        if len(output_paths) > 1:
+            raise FileNotFoundError(f"No run summary of {data_name} in {OUTPUT_DIR} and inverse PageRank scores of several backends (run the calculation on it again)")
+        inverse_pagerank_path = output_paths[0] if len(output_paths) == 1 else None
+        trust_rank_path = pathlib.Path(OUTPUT_DIR) / f"trust_rank_{data_name}"
+
+    if inverse_pagerank_path is None or not inverse_pagerank_path.exists() or not trust_rank_path.exists():
+        raise FileNotFoundError(f"No inverse PageRank and TrustRank scores of {data_name} in {OUTPUT_DIR} (run the calculation on it first)")
+
+    return m_score.TermIndex(
+        {
+            "inverse_pagerank": [tuple(score) for score in read_json(inverse_pagerank_path)],
+            "trust_rank": [tuple(score) for score in read_json(trust_rank_path)],
+        },
+        n=NGRAM_SIZE,
+        skip=NGRAM_SKIP,
+        dtype=MEMORY_SCORE_DTYPE or "float64"
+    )
+
+
+def score_main(source: str, ranked_data_name: str, benchmark: bool = False) -> None:
+    """
+    Document scoring mode: score every record of a JSON file or a JSON Lines stream by the
+    inverse PageRank and TrustRank scores of its n-grams (see m_score.TermIndex).
+
+    Records are scored in batches of SCORING_BATCH_SIZE, by SCORING_WORKERS workers. The score
+    of a record is the sum over its text fields, weighted like the key paths (TARGET_DATA_KEYS).
+    One JSON line per record with text is written to `document_scores_{name}.jsonl`.
+
+    Parameters
+    ----------
+    source : str
+        "-" for stdin, the path of a JSON file (.json), or of a JSON Lines file or FIFO.
+    ranked_data_name : str
+        The name of the dataset file whose rankings are used (calculation_main must have run on it).
+    benchmark : bool, optional
+        Print the scoring throughput instead of writing the scores (see m_score.benchmark_scoring). Defaults to False.
+    """
+    running_timer = MultipleTimer(["func"])
+    source_name = "stdin" if source == "-" else pathlib.Path(source).name
+    print(f"=== Scoring {source_name} with the rankings of {ranked_data_name} ===\n")
+
+    print("* Loading term index")
+    term_index = load_term_index(ranked_data_name)
+    print(f"  terms: {len(term_index)}, words: {len(term_index.vocabulary)}, arrays: {term_index.nbytes / 2**10:.1f} KB")
+    print_timer(running_timer.timer["func"])
+
+    if source != "-" and pathlib.Path(source).suffix == ".json":
+        records = read_json(source)
+    else:
+        records = m_stream.JsonLinesReader(m_stream.open_binary_stream(source), prefilter=TEXT_EXTRACTOR.may_match)
+
+    if benchmark:
+        print("* Benchmarking scoring")
+        texts = [text for text, _ in TEXT_EXTRACTOR.iter_texts(records)]
+        result = m_score.benchmark_scoring(term_index, texts, batch_size=SCORING_BATCH_SIZE, workers=SCORING_WORKERS if SCORING_WORKERS > 1 else None)
+        print(f"  documents: {result['documents']}, workers: {result['workers']}")
+        print(f"  lookups only (preprocessed): {result['lookup']:,.0f} documents/s")
+        print(f"  serial: {result['serial']:,.0f} documents/s, thread pool: {result['thread']:,.0f} documents/s, process pool: {result['process']:,.0f} documents/s")
+        print_timer(running_timer.timer["func"])
+        return
+
+    print("* Scoring documents")
+    owners = collections.deque()  # (record, key path weight) of every text, in the order they are scored
+
+    def iter_texts() -> Iterator[str]:
+        for record_id, record in enumerate(records):
+            for text, weight in TEXT_EXTRACTOR.extract(record):
+                owners.append((record_id, weight))
+                yield text
+
+    columns = term_index.columns
+    scorer = m_score.DocumentScorer(term_index, batch_size=SCORING_BATCH_SIZE, workers=SCORING_WORKERS, pool=SCORING_POOL)
+    output_path = f"{OUTPUT_DIR}/document_scores_{pathlib.Path(source_name).stem}.jsonl"
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    scored_records = 0
+    with open(output_path, "wb") as f:
+        # The texts of a record are consecutive (and may span two batches): a record is written once the next one starts
+        current = None
+        for batch in scorer.score_batches(iter_texts()):
+            batch_columns = [batch[column].tolist() for column in columns]
+            for i, (nodes, matched_nodes) in enumerate(zip(batch["nodes"].tolist(), batch["matched_nodes"].tolist())):
+                record_id, weight = owners.popleft()
+                if current is None or current["record"] != record_id:
+                    if current is not None:
+                        f.write(orjson.dumps(current) + b"\n")
+                        scored_records += 1
+                    current = {"record": record_id, **{column: 0.0 for column in columns}, "nodes": 0, "matched_nodes": 0}
+                for column, scores in zip(columns, batch_columns):
+                    current[column] += weight * scores[i]
+                current["nodes"] += nodes
+                current["matched_nodes"] += matched_nodes
+        if current is not None:
+            f.write(orjson.dumps(current) + b"\n")
+            scored_records += 1
+
+    print(f"  records: {scored_records}")
+    print(f"  Written to {output_path}")
+    print_timer(running_timer.timer["func"])
+
+
+def stream_main(source: str, stream_name: str, emit_every: Optional[int] = None, top_k: int = 10) -> None:
+    """
+    Streaming mode: rank the records of a JSON Lines stream (stdin, a file or a FIFO, optionally gzip).
+
+    Records are read one line at a time and only the weighted edge counts are kept (bounded by
+    heavy_hitters if enabled), so the input is never held in memory. The ranking of the records
+    read so far is written every `emit_every` records (if given) and at the end of the stream.
+
+    With dedup enabled, duplicate texts are detected exactly (by hash, see m_dedup.ExactDeduplicator),
+    separately for each field weight. Near-duplicate detection needs every text at once and is not
+    applied in this mode.
+
+    Parameters
+    ----------
+    source : str
+        "-" for stdin, or the path of a file or FIFO.
+    stream_name : str
+        Name used for the output files.
+    emit_every : int, optional
+        Number of records between two rankings. Defaults to None (end of stream only).
+    top_k : int, optional
+        Number of top words printed at each ranking. Defaults to 10.
+    """
+    running_timer = MultipleTimer(["func"])
+    print(f"=== Streaming {'stdin' if source == '-' else source} ===\n")
+
+    reader = m_stream.JsonLinesReader(m_stream.open_binary_stream(source), prefilter=TEXT_EXTRACTOR.may_match)
+    edge_counter = create_edge_counter()
+    skipped_records = 0
+    rankings = 0
+
+    # Exact deduplication of the texts, for each field weight
+    deduplicators: Dict[int, m_dedup.ExactDeduplicator] = dict()
+    if DEDUP_ENABLED and DEDUP_NEAR_DUPLICATE:
+        print("Warning: near-duplicate detection is not supported in streaming mode, only exact duplicates are detected\n")
+
+    def emit_ranking() -> None:
+        nonlocal rankings
+        print(f"* Ranking after {reader.lines} records ({reader.invalid_lines} invalid lines, {skipped_records + reader.filtered_lines} records without text)")
+        if DEDUP_ENABLED:
+            duplicates = sum(deduplicator.duplicates for deduplicator in deduplicators.values())
+            print(f"  duplicate texts: {duplicates}{' (counted)' if DEDUP_COUNT_DUPLICATES else ' (skipped)'}")
+        bigrams_list = edge_counter_to_weighted_bigrams(edge_counter, logging=True)
+        if PRUNING_ENABLED:
+            bigrams_list = prune_bigrams(bigrams_list)
+        if len(bigrams_list) == 0:
+            print("  No edges yet")
+            print_timer(running_timer.timer["func"])
+            return
+
+        word_graph = generate_word_graph(bigrams_list)
+        print(f"  nodes: {len(word_graph.nodes)}, edges: {len(word_graph.edges)}")
+        sorted_inverse_pagerank_scores = m_graph_custom.get_sorted_rank_score(calculate_inverse_pagerank(word_graph))
+        sorted_trust_rank_scores = m_graph_custom.get_sorted_rank_score(
+            calculate_trust_rank(word_graph, sorted_inverse_pagerank_scores, bias_amount=TRUST_RANK_BIAS_AMOUNT, max_iter=MAX_TRUST_RANK_ITERATION)
+        )
+        print(f"  top {top_k}: {', '.join(word for word, _ in sorted_inverse_pagerank_scores[:top_k])}")
+
+        # Each ranking replaces the previous one
+        if OUTPUT_GRAPH:
+            write_to_file(f"{OUTPUT_DIR}/graph_{stream_name}.json", to_json(bigrams_list, indent=True), overwrite=True)
+        write_rankings(f"{stream_name}.json", sorted_inverse_pagerank_scores, sorted_trust_rank_scores)
+        rankings += 1
+        print_timer(running_timer.timer["func"])
+
+    running_timer.timer["func"].start()
+    last_emission = 0
+    for record in reader:
+        texts = TEXT_EXTRACTOR.extract(record)
+        if len(texts) == 0:
+            skipped_records += 1
+        for text, weight in texts:
+            if DEDUP_ENABLED:
+                deduplicator = deduplicators.setdefault(weight, m_dedup.ExactDeduplicator())
+                if deduplicator.add(text) is not None and not DEDUP_COUNT_DUPLICATES:
+                    continue
+            edge_counter.add_words(m_preprocess_text.preprocess_text(text), weight)
+
+        if emit_every is not None and reader.lines - last_emission >= emit_every:
+            emit_ranking()
+            last_emission = reader.lines
+
+    # Final ranking (unless the last record was just ranked)
+    if rankings == 0 or last_emission != reader.lines:
+        emit_ranking()
+
+
+def window_calculation_main(data_dir: str, data_name: str, window_hours: float, bucket_hours: float, top_k: int) -> None:
+    """
+    Sliding window calculation function.
+
+    Ranks the records of the json file over a sliding time window of their date (DATE_DATA_KEY).
+    The graph and scores are updated incrementally every bucket, and the top scores of each window
+    are written to `window_rank_{data_name}`.
+
+    Parameters
+    ----------
+    data_dir : str
+        The directory of the json file
+    data_name : str
+        The name of the json file
+    window_hours : float
+        The window size in hours
+    bucket_hours : float
+        The bucket size (refresh interval) in hours
+    top_k : int
+        Number of top scores written for each window
+
+    Returns
+    -------
+    None
+    """
+    data_path = f"{data_dir}/{data_name}"
+
+    running_timer = MultipleTimer(["func"])
+
+    print(f"=== Calculating {data_name} (window: {window_hours} h, bucket: {bucket_hours} h) ===\n")
+
+    print("* Ranking windows")
+    ranker = m_window_rank.SlidingWindowRanker(
+        window_size=timedelta(hours=window_hours),
+        bucket_size=timedelta(hours=bucket_hours),
+        bias_amount=TRUST_RANK_BIAS_AMOUNT,
+        alpha=DAMPING_FACTOR,
+        epsilon=CALCULATION_THRESHOLD,
+        max_iter=MAX_CALCULATION_ITERATION,
+        trust_rank_max_iter=MAX_TRUST_RANK_ITERATION,
+    )
+    window_results = list(m_window_rank.rank_windows(
+        read_json(data_path),
+        ranker,
+        extractor=TEXT_EXTRACTOR,
+        date_key=DATE_DATA_KEY,
+        edge_counter=m_ngram.NgramEdgeCounter(n=NGRAM_SIZE, skip=NGRAM_SKIP),
+        dedup=DEDUP_ENABLED and not DEDUP_COUNT_DUPLICATES,
+        top_k=top_k,
+        throw_key_error=True
+    ))
+    print(f"  windows: {len(window_results)}")
+    print_timer(running_timer.timer["func"])
+
+    print("* Writing to output")
     write_to_file(
-        f"{OUTPUT_DIR}/trust_rank_{data_name}",
-        to_json(sorted_trust_rank_scores, indent=True), 
+        f"{OUTPUT_DIR}/window_rank_{data_name}",
+        to_json(window_results, indent=True),
         overwrite=True
     )
     print_timer(running_timer.timer["func"])
 
 
-    running_timer.main.stop()
+def serve_main(cmd_arg: argparse.Namespace) -> None:
+    """
+    Run the ranking service until interrupted.
+    """
+    service = m_rank_service.RankingService(
+        data_dir=DATA_DIR,
+        functions=m_rank_service.ServiceFunctions(service_weighted_bigrams, build_service_graph, rank_word_graph),
+        bias_amount=TRUST_RANK_BIAS_AMOUNT,
+        workers=cmd_arg.workers,
+        max_concurrency=cmd_arg.max_concurrency,
+    )
 
-    # Visualize graph (if SHOW_GRAPH is set to True)
-    if SHOW_GRAPH:
-        print("* Visualizing graph")
-        m_graph_nx.plot_graph(word_graph, node_size=100, weighted=True, with_labels=False)
+    address = cmd_arg.unix_socket if cmd_arg.unix_socket else f"http://{cmd_arg.host}:{cmd_arg.port}"
+    print(f"=== Serving on {address} ({service.workers} workers) ===\n")
+
+    try:
+        asyncio.run(service.serve_forever(cmd_arg.host, cmd_arg.port, cmd_arg.unix_socket))
+    except KeyboardInterrupt:
+        print("\n=== Stopped ===\n")
 
 
 def main() -> None:
     # Get command line arguments
     cmd_arg = get_command_line_arg()
 
+    if cmd_arg.serve:
+        serve_main(cmd_arg)
+        return
+
+    if cmd_arg.calibrate_planner:
+        calibrate_planner_main()
+        return
+
+    if cmd_arg.score is not None:
+        if cmd_arg.score_with is None:
+            print("--score needs --score-with (the name of a ranked dataset file)\n")
+            return
+        main_timer = MultipleTimer()
+        score_main(cmd_arg.score, cmd_arg.score_with, benchmark=cmd_arg.benchmark_score)
+        print(f"Total runtime: {main_timer.main.get_time_and_restart():.2f} ms\n")
+        return
+
+    if cmd_arg.stdin is not None:
+        print_settings()
+        main_timer = MultipleTimer()
+        stream_main(cmd_arg.stdin, cmd_arg.stream_name, emit_every=cmd_arg.emit_every)
+        print(f"Total runtime: {main_timer.main.get_time_and_restart():.2f} ms\n")
+        return
+
     data_file_name = None
 
     if cmd_arg.files:
@@ -274,7 +1750,11 @@ def main() -> None:
 
     # Print calculating file(s)
     print("=== Running ===\n")
-    print("Using networkx library" if USE_PAGERANK_LIBRARY else "Using custom graph", "\n")
+    rank_backend = get_rank_backend()
+    if PLANNER_ENABLED:
+        print("Using the graph planned for each file", "\n")
+    else:
+        print("Using networkx library" if rank_backend == "nx" else "Using custom graph" if rank_backend == "custom" else f"Using sparse graph ({rank_backend} scores)", "\n")
 
     print("Data to calculate:")
     for i, data in enumerate(data_file_name):
@@ -284,9 +1764,53 @@ def main() -> None:
     # Print settings
     print_settings()
 
+    if cmd_arg.benchmark_extract:
+        benchmark_extract_main(DATA_DIR, data_file_name)
+        return
+
+    # Rank cache
+    rank_cache = m_rank_cache.RankCache(RANK_CACHE_DIR, max_size_bytes=int(RANK_CACHE_MAX_SIZE_MB * 1024 * 1024))
+    if cmd_arg.clear_cache:
+        rank_cache.invalidate()
+        print("Rank cache cleared\n")
+    if not RANK_CACHE_ENABLED or cmd_arg.no_cache:
+        rank_cache = None
+
     # Start timer
     main_timer = MultipleTimer()
 
+    if cmd_arg.shared_dir is not None:
+        distributed_main(DATA_DIR, data_file_name, cmd_arg)
+        print(f"Total runtime: {main_timer.main.get_time_and_restart():.2f} ms\n")
+        return
+
+    if cmd_arg.corpus:
+        corpus_main(DATA_DIR, data_file_name)
+        print(f"Total runtime: {main_timer.main.get_time_and_restart():.2f} ms\n")
+        return
+
+    if cmd_arg.pipeline is not None:
+        pipeline_main(DATA_DIR, data_file_name, cmd_arg.pipeline, resume=cmd_arg.resume)
+        print(f"Total runtime: {main_timer.main.get_time_and_restart():.2f} ms\n")
+        return
+
+    # Parameter sweep grid (checked once for all the files, before any of them is preprocessed)
+    sweep = cmd_arg.sweep_alpha or cmd_arg.sweep_threshold or cmd_arg.sweep_bias
+    sweep_alphas = cmd_arg.sweep_alpha or [DAMPING_FACTOR]
+    sweep_epsilons = cmd_arg.sweep_threshold or [CALCULATION_THRESHOLD]
+    sweep_bias_amounts = cmd_arg.sweep_bias or [TRUST_RANK_BIAS_AMOUNT]
+    if sweep:
+        m_sweep.validate_sweep_grid(sweep_alphas, sweep_epsilons, sweep_bias_amounts)
+
+    # Checkpoints (only used by the default calculation mode)
+    checkpoints = None
+    if (CHECKPOINT_ENABLED or cmd_arg.resume) and not sweep and cmd_arg.window is None:
+        checkpoints = m_checkpoint.CheckpointManager(CHECKPOINT_DIR, CONFIG)
+        if checkpoints.start(resume=cmd_arg.resume):
+            print(f"Resuming previous run ({checkpoints.get_completed_count()} file(s) completed)\n")
+        elif cmd_arg.resume:
+            print("No checkpoint of a run with the same configuration, starting over\n")
+
     # Calculate all file(s)
     for i, data in enumerate(data_file_name):
         print(f"({i+1}/{len(data_file_name)}) ", end="")
@@ -294,11 +1818,35 @@ def main() -> None:
         # Time each file runtime
         main_timer.newTimer(data)
 
+        # Deep profiling of every stage (if --profile)
+        profiler = m_profile.StageProfiler(f"{OUTPUT_DIR}/profile_{pathlib.Path(data).stem}", top_n=cmd_arg.profile_top) if cmd_arg.profile else m_profile.NULL_PROFILER
+
         try:
-            calculation_main(DATA_DIR, data)
+            if sweep:
+                sweep_main(
+                    DATA_DIR, data,
+                    alphas=sweep_alphas,
+                    epsilons=sweep_epsilons,
+                    bias_amounts=sweep_bias_amounts,
+                    workers=cmd_arg.workers
+                )
+            elif cmd_arg.window is not None:
+                window_calculation_main(DATA_DIR, data, cmd_arg.window, cmd_arg.window_bucket, cmd_arg.window_top)
+            elif checkpoints is not None:
+                input_hash = m_checkpoint.file_hash(f"{DATA_DIR}/{data}")
+                if checkpoints.is_completed(data, input_hash):
+                    print(f"Skipping {data} (completed in the resumed run)\n")
+                else:
+                    calculation_main(DATA_DIR, data, rank_cache=rank_cache, checkpoint=checkpoints.get_file(data, input_hash), profiler=profiler)
+                    checkpoints.mark_completed(data, input_hash)
+            else:
+                calculation_main(DATA_DIR, data, rank_cache=rank_cache, profiler=profiler)
         except Exception as e:
             print(f"\nError calculating {data} ({type(e)}): {e}\n")
 
+        if cmd_arg.profile and len(profiler.stages) > 0:
+            print_profile(profiler)
+
         main_timer.timer[data].stop()
         print(f"Calculation runtime: {main_timer.timer[data].get_start_to_stop():.2f} ms\n")
 
@@ -0,0 +1,149 @@
+from typing import Dict, Tuple, List, Callable, Optional
+import hashlib
+import os
+import shutil
+import time
+
+import orjson
+
+from helper_script.json_helper import read_json
+
+
+def file_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_key(config: Dict[str, any]) -> str:
+    return hashlib.blake2b(orjson.dumps(config, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+
+
+def write_json_atomic(path: str, data: any) -> None:
+    """
+    Write to a temporary file, flush it to disk and rename it, so a crash never leaves a half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class FileCheckpoint():
+    """
+    Intermediate results of one input file, stored in `directory`:
+    - `{stage}.json`: output of a completed stage (e.g. weighted edges, sorted scores)
+    - `{stage}.snapshot.json`: score vector of an unfinished Markov chain, with its completed iterations
+
+    The weighted edges are the graph: rebuilding the graph from them takes a fraction of the ranking time.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def has_stage(self, stage: str) -> bool:
+        return os.path.exists(self._path(stage))
+
+    def save_stage(self, stage: str, data: any) -> None:
+        write_json_atomic(self._path(stage), data)
+        # The snapshot of a completed stage is no longer needed
+        try:
+            os.remove(self._path(f"{stage}.snapshot"))
+        except FileNotFoundError:
+            pass
+
+    def load_stage(self, stage: str) -> any:
+        return read_json(self._path(stage))
+
+    def load_tuples(self, stage: str) -> List[tuple]:
+        """
+        Load a stage saved as a list of tuples (JSON turns them into lists).
+        """
+        return [tuple(item) for item in self.load_stage(stage)]
+
+    def save_snapshot(self, stage: str, scores: Dict[str, float], iteration: int) -> None:
+        write_json_atomic(self._path(f"{stage}.snapshot"), {"iteration": iteration, "time": time.time(), "scores": scores})
+
+    def load_snapshot(self, stage: str) -> Optional[Tuple[Dict[str, float], int]]:
+        """
+        Return (scores, completed iterations) of the last snapshot of a stage, or None.
+        """
+        path = self._path(f"{stage}.snapshot")
+        if not os.path.exists(path):
+            return None
+        snapshot = read_json(path)
+        return snapshot["scores"], snapshot["iteration"]
+
+    def snapshot_writer(self, stage: str, completed_iterations: int = 0) -> Callable[[Dict[str, float], int], None]:
+        """
+        Return an `on_snapshot` callback for WeightedWordDiGraph.markov_chain. `completed_iterations`
+        is added to the iteration count when continuing from an earlier snapshot.
+        """
+        return lambda scores, iteration: self.save_snapshot(stage, scores, completed_iterations + iteration)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class CheckpointManager():
+    """
+    Tracks the progress of a batch run so it can be resumed after a crash.
+
+    `{checkpoint_dir}/manifest.json` records the key of the configuration used and every completed
+    file with the hash of its content. `{checkpoint_dir}/files/` holds a FileCheckpoint per
+    unfinished file, keyed by file name and content hash, so a file modified in between starts over.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory of the checkpoints.
+    config : Dict[str, any]
+        The configuration of the run. Checkpoints made with a different configuration are discarded.
+    """
+
+    def __init__(self, checkpoint_dir: str, config: Dict[str, any]):
+        self.checkpoint_dir = str(checkpoint_dir)
+        self.manifest_path = os.path.join(self.checkpoint_dir, "manifest.json")
+        self.config_key = config_key(config)
+        self.manifest: Dict[str, any] = {"config": self.config_key, "files": dict()}
+
+    def start(self, resume: bool = False) -> bool:
+        """
+        Load the manifest of the previous run if resuming, or start a new batch.
+        Returns whether a previous run is resumed.
+        """
+        if resume and os.path.exists(self.manifest_path):
+            manifest = read_json(self.manifest_path)
+            if manifest.get("config") == self.config_key:
+                self.manifest = manifest
+                return True
+
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        write_json_atomic(self.manifest_path, self.manifest)
+        return False
+
+    def is_completed(self, data_name: str, input_hash: str) -> bool:
+        return self.manifest["files"].get(data_name, {}).get("hash") == input_hash
+
+    def get_completed_count(self) -> int:
+        return len(self.manifest["files"])
+
+    def get_file(self, data_name: str, input_hash: str) -> FileCheckpoint:
+        return FileCheckpoint(os.path.join(self.checkpoint_dir, "files", f"{data_name}.{input_hash}"))
+
+    def mark_completed(self, data_name: str, input_hash: str) -> None:
+        """
+        Record a file as completed and remove its intermediate results.
+        """
+        self.manifest["files"][data_name] = {"hash": input_hash, "completed": time.time()}
+        write_json_atomic(self.manifest_path, self.manifest)
+        self.get_file(data_name, input_hash).clear()
@@ -0,0 +1,233 @@
+from typing import Dict, Tuple, List, Optional
+
+import numpy as np
+import scipy.sparse as sp # type: ignore
+
+from modules_script import m_graph_sparse
+
+
+class CorpusGraph():
+    """
+    One weighted graph over the edges of many files, keeping the edge counts of every file as a
+    sparse column of an edges x files matrix (`contributions`).
+
+    The global graph is ranked once. The ranking of a file is then a run on the shared structure:
+    the CSR index arrays of the graph and its reverse are built once, and the transition
+    probabilities of a file are computed from its column with a few vectorized operations
+    (see `get_transition`), instead of building the graph of the file from its edge list.
+
+    With `file_weight` 1 (the default of `rank_file`), the edges of a file are weighted by its own
+    counts only and the random jumps land on its own nodes, so its scores are those of ranking
+    the file alone (within the convergence threshold). With a lower `file_weight`, the global
+    counts are mixed in, which smooths the ranking of small files with the corpus.
+
+    Parameters
+    ----------
+    dtype : type, optional
+        np.float64 or np.float32 scores. Defaults to np.float64.
+    """
+
+    def __init__(self, dtype: type = np.float64):
+        self.dtype = np.dtype(dtype)
+        self.node_index: Dict[str, int] = dict()
+        self.node_names: List[str] = []
+        self.edge_index: Dict[Tuple[str, str], int] = dict()
+        self.file_names: List[str] = []
+
+        self._sources: List[int] = []
+        self._targets: List[int] = []
+        self._rows: List[int] = []
+        self._cols: List[int] = []
+        self._counts: List[int] = []
+
+        self._contributions: Optional[sp.csc_matrix] = None
+        self._structures: Dict[bool, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = dict()
+        self.global_inverse_pagerank: Optional[np.ndarray] = None
+        self.global_trust_rank: Optional[np.ndarray] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._sources)
+
+    def add_file(self, file_name: str, weighted_edges: List[Tuple[str, str, int]]) -> int:
+        """
+        Add the weighted edges of a file as a new column, and return the index of the file.
+        """
+        file_id = len(self.file_names)
+        self.file_names.append(file_name)
+
+        node_index, edge_index = self.node_index, self.edge_index
+        for node1, node2, weight in weighted_edges:
+            edge_id = edge_index.get((node1, node2))
+            if edge_id is None:
+                for node in (node1, node2):
+                    if node not in node_index:
+                        node_index[node] = len(self.node_names)
+                        self.node_names.append(node)
+                edge_id = edge_index[(node1, node2)] = len(self._sources)
+                self._sources.append(node_index[node1])
+                self._targets.append(node_index[node2])
+            self._rows.append(edge_id)
+            self._cols.append(file_id)
+            self._counts.append(weight)
+
+        self._contributions = None
+        self._structures.clear()
+        self.global_inverse_pagerank = self.global_trust_rank = None
+        return file_id
+
+    @property
+    def contributions(self) -> sp.csc_matrix:
+        """
+        Edges x files matrix of edge counts (built on first use after the last addition).
+        """
+        if self._contributions is None:
+            self._contributions = sp.csc_matrix(
+                (np.asarray(self._counts, dtype=np.float64), (np.asarray(self._rows, dtype=np.int64), np.asarray(self._cols, dtype=np.int64))),
+                shape=(self.edge_count, len(self.file_names))
+            )
+        return self._contributions
+
+    @property
+    def global_weights(self) -> np.ndarray:
+        return np.asarray(self.contributions.sum(axis=1)).ravel()
+
+    def get_file_weights(self, file_id: int) -> np.ndarray:
+        """
+        Edge counts of one file, by edge index (0 for the edges of the other files).
+        """
+        contributions = self.contributions
+        start, end = contributions.indptr[file_id], contributions.indptr[file_id + 1]
+        weights = np.zeros(self.edge_count, dtype=np.float64)
+        weights[contributions.indices[start:end]] = contributions.data[start:end]  # Duplicates are already summed
+        return weights
+
+    def get_file_nodes(self, file_id: int) -> np.ndarray:
+        """
+        Boolean mask of the nodes of one file.
+        """
+        edges = self.contributions.indices[self.contributions.indptr[file_id]:self.contributions.indptr[file_id + 1]]
+        mask = np.zeros(self.node_count, dtype=bool)
+        mask[self._get_structure(False)[0][edges]] = True  # Sources
+        mask[self._get_structure(True)[0][edges]] = True  # Targets
+        return mask
+
+    def _get_structure(self, reverse: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        CSR structure shared by every weighting of the graph (or its reverse): the source node of
+        each edge, the CSR position of each edge (order), indices and indptr.
+        """
+        if reverse not in self._structures:
+            sources = np.asarray(self._sources, dtype=np.int64)
+            targets = np.asarray(self._targets, dtype=np.int64)
+            if reverse:
+                sources, targets = targets, sources
+
+            # Row v of the transition matrix holds the edges u -> v, by column u
+            order = np.lexsort((sources, targets))
+            indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(targets, minlength=self.node_count), out=indptr[1:])
+            index_dtype = np.int32 if max(self.node_count, self.edge_count) < np.iinfo(np.int32).max else np.int64
+            self._structures[reverse] = (sources, order, sources[order].astype(index_dtype), indptr.astype(index_dtype))
+        return self._structures[reverse]
+
+    def get_transition(self, edge_weights: np.ndarray, reverse: bool = False) -> m_graph_sparse.CSRGraph:
+        """
+        The graph (or its reverse) with the given edge weights (by edge index) on the shared structure.
+        Edges of weight 0 are kept as explicit zeros, so nodes without weighted outgoing edges are dangling.
+        """
+        sources, order, indices, indptr = self._get_structure(reverse)
+        out_weight = np.bincount(sources, weights=edge_weights, minlength=self.node_count)
+        probabilities = np.divide(edge_weights, out_weight[sources], out=np.zeros(self.edge_count, dtype=np.float64), where=out_weight[sources] > 0)
+        return m_graph_sparse.CSRGraph(self.node_names, probabilities[order].astype(self.dtype), indices, indptr, out_weight == 0)
+
+    def _rank(self, edge_weights: np.ndarray, bias_mask: Optional[np.ndarray], bias_amount: int, alpha: float, epsilon: float, max_iter: int, trust_rank_max_iter: int, initial_scores: Tuple[Optional[np.ndarray], Optional[np.ndarray]], workers: int) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int]]:
+        """
+        Inverse PageRank (random jumps to bias_mask, every node if None) and TrustRank (biased
+        towards the bias_amount best inverse PageRank scores within bias_mask).
+        """
+        inverse_pagerank_scores, inverse_pagerank_iterations, _ = self.get_transition(edge_weights, reverse=True).markov_chain(
+            alpha, epsilon, max_iter, bias_mask=bias_mask, initial_scores=initial_scores[0], workers=workers
+        )
+
+        candidates = inverse_pagerank_scores if bias_mask is None else np.where(bias_mask, inverse_pagerank_scores, -np.inf)
+        trust_mask = np.zeros(self.node_count, dtype=bool)
+        trust_mask[m_graph_sparse.get_top_k(candidates, min(max(bias_amount, 1), self.node_count))] = True
+        if bias_mask is not None:
+            trust_mask &= bias_mask
+
+        trust_rank_scores, trust_rank_iterations, _ = self.get_transition(edge_weights).markov_chain(
+            alpha, epsilon, trust_rank_max_iter, bias_mask=trust_mask, initial_scores=initial_scores[1], workers=workers
+        )
+        return inverse_pagerank_scores, trust_rank_scores, (inverse_pagerank_iterations, trust_rank_iterations)
+
+    def rank_global(self, bias_amount: int = 1, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, trust_rank_max_iter: int = 200, workers: int = 1) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]], Tuple[int, int]]:
+        """
+        Rank the global graph (edge counts summed over every file). The scores are kept as the warm
+        start of the file rankings.
+
+        Returns
+        -------
+        Tuple[List[Tuple[str, float]], List[Tuple[str, float]], Tuple[int, int]]
+            The sorted inverse PageRank and TrustRank scores, and the iterations of both rankings.
+        """
+        self.global_inverse_pagerank, self.global_trust_rank, iterations = self._rank(
+            self.global_weights, None, bias_amount, alpha, epsilon, max_iter, trust_rank_max_iter, (None, None), workers
+        )
+        return (
+            m_graph_sparse.get_sorted_rank_score(self.node_names, self.global_inverse_pagerank),
+            m_graph_sparse.get_sorted_rank_score(self.node_names, self.global_trust_rank),
+            iterations
+        )
+
+    def rank_file(self, file_id: int, file_weight: float = 1.0, bias_amount: int = 1, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, trust_rank_max_iter: int = 200, workers: int = 1) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]], Tuple[int, int]]:
+        """
+        Personalized ranking of one file on the shared structure, warm-started from the global scores.
+
+        The edge weights are file_weight * (file counts / file total) + (1 - file_weight) *
+        (global counts / global total), and random jumps land on the nodes of the file.
+
+        Parameters
+        ----------
+        file_id : int
+            Index of the file (see add_file).
+        file_weight : float, optional
+            Share of the file's own counts in the edge weights, between 0 and 1. Defaults to 1.0
+            (the ranking of the file alone).
+        bias_amount, alpha, epsilon, max_iter, trust_rank_max_iter, workers : optional
+            See rank_global.
+
+        Returns
+        -------
+        Tuple[List[Tuple[str, float]], List[Tuple[str, float]], Tuple[int, int]]
+            The sorted inverse PageRank and TrustRank scores of the nodes of the file, and the
+            iterations of both rankings.
+        """
+        if not 0 <= file_weight <= 1:
+            raise ValueError("file_weight must be between 0 and 1")
+        if self.global_inverse_pagerank is None:
+            raise ValueError("The global graph must be ranked first (rank_global)")
+
+        file_weights = self.get_file_weights(file_id)
+        edge_weights = file_weights / max(file_weights.sum(), 1)
+        if file_weight < 1:
+            global_weights = self.global_weights
+            edge_weights = file_weight * edge_weights + (1 - file_weight) * global_weights / max(global_weights.sum(), 1)
+
+        file_nodes = self.get_file_nodes(file_id)
+        inverse_pagerank_scores, trust_rank_scores, iterations = self._rank(
+            edge_weights, file_nodes, bias_amount, alpha, epsilon, max_iter, trust_rank_max_iter,
+            (self.global_inverse_pagerank, self.global_trust_rank), workers
+        )
+
+        node_ids = np.flatnonzero(file_nodes)
+        node_names = [self.node_names[i] for i in node_ids]
+        return (
+            m_graph_sparse.get_sorted_rank_score(node_names, inverse_pagerank_scores[node_ids]),
+            m_graph_sparse.get_sorted_rank_score(node_names, trust_rank_scores[node_ids]),
+            iterations
+        )
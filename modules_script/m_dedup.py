@@ -0,0 +1,192 @@
+from typing import Dict, Tuple, List, Iterable, Optional
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def get_shingles(text: str, shingle_size: int = 3) -> List[str]:
+    """
+    Split text into overlapping word shingles (lowercased, URLs removed). Texts shorter than
+    `shingle_size` words produce a single shingle of the whole text.
+    """
+    words = re.findall(r"\w+", re.sub(r"https?\S+", "", text.lower()))
+    if len(words) <= shingle_size:
+        return [" ".join(words)]
+    return [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+
+class ExactDeduplicator():
+    """
+    Streaming exact deduplication: remembers the hash of every distinct text seen (16 bytes each),
+    so records can be deduplicated one at a time without keeping the texts.
+
+    Each text is recorded with a position (e.g. the time bucket of its record). With `since`, a
+    text last recorded before that position counts as new again, e.g. once it left a sliding window.
+    """
+
+    def __init__(self):
+        self.last_seen: Dict[bytes, int] = dict()
+        self.records = 0
+        self.duplicates = 0
+
+    def add(self, text: str, position: int = 0, since: Optional[int] = None) -> Optional[int]:
+        """
+        Record a text at `position`. Returns None if it is new (not recorded at or after `since`,
+        never if None), or else the position it was last recorded at (the text moves to `position`).
+        """
+        self.records += 1
+        key = text_hash(text)
+        last_position = self.last_seen.get(key)
+        self.last_seen[key] = position
+        if last_position is not None and (since is None or last_position >= since):
+            self.duplicates += 1
+            return last_position
+        return None
+
+
+class MinHashLSH():
+    """
+    MinHash signatures with banded locality-sensitive hashing for near-duplicate detection.
+
+    Each document is reduced to `num_perm` minimum hash values of its shingles. Documents sharing
+    all rows of at least one band become candidates, and candidates whose estimated Jaccard
+    similarity reaches `threshold` are considered near-duplicates.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        generator = np.random.default_rng(seed)
+        self.perm_a = generator.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.perm_b = generator.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = get_shingles(text, self.shingle_size)
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= MERSENNE_PRIME
+
+        # (a * x + b) mod p for every permutation (rows) and shingle (columns), a * x < 2^62
+        permuted = (np.outer(self.perm_a, hashes) + self.perm_b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def find_duplicates(self, texts: List[str]) -> List[int]:
+        """
+        Find near-duplicate texts.
+
+        Returns
+        -------
+        List[int]
+            For each text, the index of the first text of its near-duplicate cluster (itself if unique).
+        """
+        parents = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        signatures = [self.signature(text) for text in texts]
+        band_buckets: Dict[Tuple[int, bytes], int] = dict()
+
+        for i, signature in enumerate(signatures):
+            for band in range(self.bands):
+                key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                first = band_buckets.setdefault(key, i)
+                if first == i:
+                    continue
+
+                root_first, root_i = find(first), find(i)
+                if root_first == root_i:
+                    continue
+
+                similarity = np.count_nonzero(signatures[first] == signature) / self.num_perm
+                if similarity >= self.threshold:
+                    # Keep the earliest text as the representative
+                    parents[max(root_first, root_i)] = min(root_first, root_i)
+
+        return [find(i) for i in range(len(texts))]
+
+
+def dedup_texts(
+        all_texts: Iterable[str],
+        near_duplicate: bool = True,
+        lsh: Optional[MinHashLSH] = None
+    ) -> Tuple[List[str], List[int], Dict[str, any]]:
+    """
+    Collapse duplicate and near-duplicate texts into representative texts.
+
+    Exact duplicates are grouped by text hash. Near-duplicates (MinHash/LSH over word shingles) are then
+    collapsed into the first text of their cluster.
+
+    Parameters
+    ----------
+    all_texts : Iterable[str]
+        The texts of the records (see m_extract.KeyPathExtractor). None values are skipped.
+    near_duplicate : bool, optional
+        Whether to also collapse near-duplicates. Defaults to True.
+    lsh : MinHashLSH, optional
+        The near-duplicate detector. Defaults to MinHashLSH().
+
+    Returns
+    -------
+    Tuple[List[str], List[int], Dict[str, any]]
+        The representative texts, the number of records collapsed into each of them, and a report of the eliminated input volume.
+    """
+    texts: List[str] = []
+    multiplicities: List[int] = []
+    text_index: Dict[bytes, int] = dict()
+    total_records = 0
+    total_chars = 0
+
+    for text_part in all_texts:
+        if text_part is None:
+            continue
+
+        total_records += 1
+        total_chars += len(text_part)
+
+        key = text_hash(text_part)
+        if key in text_index:
+            multiplicities[text_index[key]] += 1
+        else:
+            text_index[key] = len(texts)
+            texts.append(text_part)
+            multiplicities.append(1)
+
+    representatives = list(range(len(texts)))
+    if near_duplicate and len(texts) > 1:
+        representatives = (lsh or MinHashLSH()).find_duplicates(texts)
+
+    cluster_multiplicities: Dict[int, int] = dict()
+    for i, representative in enumerate(representatives):
+        cluster_multiplicities[representative] = cluster_multiplicities.get(representative, 0) + multiplicities[i]
+
+    representative_texts = [texts[representative] for representative in cluster_multiplicities]
+    kept_chars = sum(len(text) for text in representative_texts)
+
+    report = {
+        "records": total_records,
+        "exact_unique": len(texts),
+        "near_unique": len(cluster_multiplicities),
+        "eliminated_records": total_records - len(cluster_multiplicities),
+        "eliminated_ratio": (1 - len(cluster_multiplicities) / total_records) if total_records > 0 else 0.0,
+        "eliminated_chars_ratio": (1 - kept_chars / total_chars) if total_chars > 0 else 0.0,
+    }
+    return representative_texts, list(cluster_multiplicities.values()), report
@@ -0,0 +1,143 @@
+from typing import Dict, Tuple, List, Iterable, Optional
+import operator
+import os
+import socket
+import time
+import zlib
+
+from helper_script.json_helper import read_json, to_json
+
+
+def get_file_shard(file_names: Iterable[str], shard_index: int, shard_count: int) -> List[str]:
+    """
+    Return the files of one shard. Assignment only depends on the file name (stable hash), so every
+    node computes the same partition without any communication.
+    """
+    return sorted(name for name in file_names if zlib.crc32(name.encode("utf-8")) % shard_count == shard_index)
+
+
+def get_record_shard(records: List[any], shard_index: int, shard_count: int) -> List[any]:
+    """
+    Return the records of one shard (every shard_count-th record, starting at shard_index).
+    """
+    return records[shard_index::shard_count]
+
+
+def merge_weighted_edges(weighted_edges_list: Iterable[List[Tuple[str, str, int]]], sort: bool = False) -> List[Tuple[str, str, int]]:
+    """
+    Sum the weights of the same edge across several weighted edge lists.
+    """
+    edge_weights: Dict[Tuple[str, str], int] = dict()
+    for weighted_edges in weighted_edges_list:
+        for node1, node2, weight in weighted_edges:
+            edge_weights[(node1, node2)] = edge_weights.get((node1, node2), 0) + weight
+
+    merged_edges = [(node1, node2, weight) for (node1, node2), weight in edge_weights.items()]
+    return sorted(merged_edges, key=operator.itemgetter(2, 0, 1), reverse=True) if sort else merged_edges
+
+
+class SharedDirCoordinator():
+    """
+    Coordinates map/reduce nodes through lock and marker files in a shared directory (e.g. NFS).
+
+    Layout of `{shared_dir}/{job_name}/`:
+    - `partials/part-{index}-of-{count}.json`: weighted edge counts of each map shard
+    - `locks/{task}.lock`: created exclusively (O_CREAT | O_EXCL) by the node working on a task
+    - `markers/{task}.done`: written once a task's output is complete
+
+    Outputs are written to a temporary file and renamed, so a marker or partial is never seen half-written.
+
+    Parameters
+    ----------
+    shared_dir : str
+        The shared directory.
+    job_name : str
+        Name of the job (separates the files of different runs).
+    shard_count : int
+        Number of map shards.
+    stale_lock_seconds : float, optional
+        Locks older than this (whose task is not done) are considered abandoned by a crashed node
+        and can be taken over. Defaults to None (never).
+    """
+
+    def __init__(self, shared_dir: str, job_name: str, shard_count: int, stale_lock_seconds: Optional[float] = None):
+        self.job_dir = os.path.join(shared_dir, job_name)
+        self.shard_count = shard_count
+        self.stale_lock_seconds = stale_lock_seconds
+        self.node_name = f"{socket.gethostname()}:{os.getpid()}"
+
+        for sub_dir in ("partials", "locks", "markers"):
+            os.makedirs(os.path.join(self.job_dir, sub_dir), exist_ok=True)
+
+    def _path(self, sub_dir: str, name: str) -> str:
+        return os.path.join(self.job_dir, sub_dir, name)
+
+    def _write_atomic(self, path: str, content: str) -> None:
+        tmp_path = f"{path}.{self.node_name.replace(':', '_')}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def map_task(self, shard_index: int) -> str:
+        return f"map-{shard_index:05d}-of-{self.shard_count:05d}"
+
+    def partial_path(self, shard_index: int) -> str:
+        return self._path("partials", f"part-{shard_index:05d}-of-{self.shard_count:05d}.json")
+
+    def is_done(self, task: str) -> bool:
+        return os.path.exists(self._path("markers", f"{task}.done"))
+
+    def mark_done(self, task: str) -> None:
+        self._write_atomic(self._path("markers", f"{task}.done"), self.node_name)
+
+    def try_lock(self, task: str) -> bool:
+        """
+        Try to take the lock of a task. Returns False if another node holds it.
+        """
+        lock_path = self._path("locks", f"{task}.lock")
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if self.stale_lock_seconds is None or self.is_done(task):
+                return False
+            try:
+                if time.time() - os.path.getmtime(lock_path) < self.stale_lock_seconds:
+                    return False
+                # Take over an abandoned lock (rename is atomic, only one node succeeds)
+                os.rename(lock_path, f"{lock_path}.stale.{self.node_name.replace(':', '_')}")
+            except FileNotFoundError:
+                return False
+            return self.try_lock(task)
+
+        with os.fdopen(fd, "w") as f:
+            f.write(self.node_name)
+        return True
+
+    def release_lock(self, task: str) -> None:
+        try:
+            os.remove(self._path("locks", f"{task}.lock"))
+        except FileNotFoundError:
+            pass
+
+    def write_partial(self, shard_index: int, weighted_edges: List[Tuple[str, str, int]]) -> None:
+        self._write_atomic(self.partial_path(shard_index), to_json(weighted_edges))
+        self.mark_done(self.map_task(shard_index))
+
+    def map_done_count(self) -> int:
+        return sum(self.is_done(self.map_task(i)) for i in range(self.shard_count))
+
+    def wait_for_map(self, timeout: Optional[float] = None, poll_interval: float = 1.0) -> bool:
+        """
+        Wait until every map shard is done. Returns False on timeout.
+        """
+        start = time.monotonic()
+        while self.map_done_count() < self.shard_count:
+            if timeout is not None and time.monotonic() - start > timeout:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def read_partials(self) -> List[Tuple[str, str, int]]:
+        return merge_weighted_edges((read_json(self.partial_path(i)) for i in range(self.shard_count)), sort=True)
@@ -0,0 +1,284 @@
+from typing import Dict, Tuple, List, Union, Callable, Optional, Iterable, Iterator
+import operator
+import timeit
+
+import orjson
+
+from helper_script.json_helper import get_from_nested_key
+
+
+WILDCARD = "*"
+LOOKUP_ERRORS = (AttributeError, IndexError, KeyError, TypeError)
+EMPTY: Dict[str, any] = dict()  # Never modified
+
+KeyPath = List[Union[str, int]]
+
+
+def parse_key_path(path: Union[str, KeyPath]) -> KeyPath:
+    """
+    Parse a key path given as a list of keys (e.g. ["data", "full_text"]) or a dotted string
+    (e.g. "data.replies.*.text"). In a dotted string, integer parts are list indices.
+    """
+    if isinstance(path, str):
+        return [int(key) if key.lstrip("-").isdigit() else key for key in path.split(".")]
+    return list(path)
+
+
+def compile_getter(keys: KeyPath) -> Callable[[any], any]:
+    """
+    Compile a path without wildcard into a function chaining one lookup per key: `.get(key, EMPTY)`
+    for a dictionary key (`.get(key)` for the last one), `[key]` for a list index.
+
+    Returns None if a key is missing, and raises one of LOOKUP_ERRORS if a value has the wrong type
+    (e.g. a list where a dictionary is expected) or a list index is out of range.
+    """
+    # The keys are only ever passed as arguments (never turned into code), and missing
+    # intermediate keys give an empty dictionary, so only wrong value types raise.
+    # The common short paths of dictionary keys are chained in one function (no call per key)
+    if all(isinstance(key, str) for key in keys):
+        if len(keys) == 1:
+            key, = keys
+            return lambda record: record.get(key)
+        if len(keys) == 2:
+            key1, key2 = keys
+            return lambda record: record.get(key1, EMPTY).get(key2)
+        if len(keys) == 3:
+            key1, key2, key3 = keys
+            return lambda record: record.get(key1, EMPTY).get(key2, EMPTY).get(key3)
+
+    steps = []
+    for i, key in enumerate(keys):
+        if not isinstance(key, str):
+            steps.append(operator.itemgetter(key))
+        elif i < len(keys) - 1:
+            steps.append(operator.methodcaller("get", key, EMPTY))
+        else:
+            steps.append(operator.methodcaller("get", key))
+
+    def getter(record: any) -> any:
+        for step in steps:
+            record = step(record)
+        return record
+    return getter
+
+
+def compile_key_path(path: Union[str, KeyPath]) -> Callable[[any], List[any]]:
+    """
+    Compile a key path into a function returning every value it matches in a record.
+
+    A wildcard ("*") matches every item of a list (or every value of a dictionary). Missing keys
+    match nothing instead of raising.
+    """
+    keys = parse_key_path(path)
+    for key in keys:
+        if not isinstance(key, (str, int)):
+            raise TypeError(f"Invalid key in key path {path}: {key!r}")
+
+    # Split into the fixed parts between wildcards
+    segments: List[KeyPath] = [[]]
+    for key in keys:
+        if key == WILDCARD:
+            segments.append([])
+        else:
+            segments[-1].append(key)
+    getters = [compile_getter(segment) for segment in segments]
+
+    if len(getters) == 1:
+        getter = getters[0]
+
+        def extract(record: any) -> List[any]:
+            try:
+                return [getter(record)]
+            except LOOKUP_ERRORS:
+                return []
+        return extract
+
+    def extract_wildcard(record: any) -> List[any]:
+        values = [record]
+        for i, getter in enumerate(getters):
+            if i > 0:
+                expanded = []
+                for value in values:
+                    if isinstance(value, list):
+                        expanded.extend(value)
+                    elif isinstance(value, dict):
+                        expanded.extend(value.values())
+                values = expanded
+
+            matched = []
+            for value in values:
+                try:
+                    matched.append(getter(value))
+                except LOOKUP_ERRORS:
+                    pass
+            values = matched
+        return values
+    return extract_wildcard
+
+
+class KeyPathExtractor():
+    """
+    Precompiled extraction of the text fields of records, over one or more key paths.
+
+    Each key path has an integer weight: every text it matches counts `weight` times in the edge
+    weights (e.g. 2 for the main text and 1 for quoted texts). Only string values are extracted.
+    Without any key path, the record itself is the text.
+
+    Use `iter_texts` on decoded records, or `iter_texts_bytes` on raw JSON records (e.g. lines of
+    a JSON Lines file): raw records that cannot contain any key path are skipped without being
+    decoded. Both loop over the records in a single function, so the per-record cost is one
+    chained lookup for the common single path case.
+
+    Records without any text field (e.g. missing the target key) are skipped; their number in the
+    last run of `iter_texts` or `iter_texts_bytes` is kept in `skipped_records`.
+
+    Parameters
+    ----------
+    key_paths : List[Union[str, List, Dict[str, any]]], optional
+        The key paths, either as a path (list of keys or dotted string) or as
+        {"path": path, "weight": weight}.
+    """
+
+    def __init__(self, key_paths: Optional[List[Union[str, KeyPath, Dict[str, any]]]] = None):
+        self.paths: List[Tuple[KeyPath, int]] = []
+        for key_path in key_paths or []:
+            if isinstance(key_path, dict):
+                path, weight = parse_key_path(key_path["path"]), key_path.get("weight", 1)
+            else:
+                path, weight = parse_key_path(key_path), 1
+            if not isinstance(weight, int) or weight <= 0:
+                raise ValueError(f"Weight of key path {path} must be a positive integer")
+            self.paths.append((path, weight))
+
+        self._extractors = [(compile_key_path(path), weight) for path, weight in self.paths]
+        self.skipped_records = 0
+
+        # Common case: a single path without wildcard, extracted with one compiled getter
+        self._single_getter = None
+        if len(self.paths) == 1 and WILDCARD not in self.paths[0][0]:
+            self._single_getter = compile_getter(self.paths[0][0])
+
+        # Byte patterns of the last (non-wildcard) key of each path, used to skip raw records that cannot match
+        last_keys = [next((key for key in reversed(path) if isinstance(key, str) and key != WILDCARD), None) for path, _ in self.paths]
+        self._key_patterns = None if None in last_keys or len(last_keys) == 0 else [orjson.dumps(key) for key in set(last_keys)]
+
+    @classmethod
+    def from_target_key(cls, target_key: Optional[List[str]]) -> "KeyPathExtractor":
+        """
+        Extractor equivalent to get_from_nested_key with a single target key (the record itself if None).
+        """
+        return cls([target_key] if target_key else None)
+
+    def extract(self, record: any) -> List[Tuple[str, int]]:
+        """
+        Return the (text, weight) of every text field of one record. A record given as a string or
+        bytes is decoded first (unless there is no key path, in which case it is the text).
+        """
+        if len(self._extractors) == 0:
+            return [(record, 1)] if isinstance(record, str) else []
+
+        if isinstance(record, (str, bytes)):
+            record = orjson.loads(record)
+
+        texts = []
+        for extract, weight in self._extractors:
+            for value in extract(record):
+                if isinstance(value, str):
+                    texts.append((value, weight))
+        return texts
+
+    def may_match(self, raw_record: bytes) -> bool:
+        """
+        Cheap test on a raw (undecoded) JSON record: False if no key path can match, so the record
+        does not need to be decoded. Keys are searched as written, so a key spelled with escapes
+        (e.g. "\\u0074ext") in the raw JSON is not found.
+        """
+        if self._key_patterns is None:
+            return True
+        # bytes.find is used rather than `in`, which first tries to interpret its argument as an integer
+        for pattern in self._key_patterns:
+            if raw_record.find(pattern) >= 0:
+                return True
+        return False
+
+    def iter_texts(self, records: Iterable[any]) -> Iterator[Tuple[str, int]]:
+        """
+        Yield the (text, weight) of every text field of the records. Records given as strings or
+        bytes are decoded first (see extract).
+        """
+        self.skipped_records = 0
+        getter = self._single_getter
+        if getter is None:
+            for record in records:
+                texts = self.extract(record)
+                if len(texts) == 0:
+                    self.skipped_records += 1
+                yield from texts
+            return
+
+        loads = orjson.loads
+        weight = self.paths[0][1]
+        for record in records:
+            try:
+                value = getter(loads(record) if isinstance(record, (str, bytes)) else record)
+            except LOOKUP_ERRORS:
+                self.skipped_records += 1
+                continue
+            if value.__class__ is str:
+                yield value, weight
+            else:
+                self.skipped_records += 1
+
+    def iter_texts_bytes(self, raw_records: Iterable[bytes]) -> Iterator[Tuple[str, int]]:
+        """
+        Yield the (text, weight) of every text field of raw JSON records. Records that cannot match
+        are skipped without being decoded. Raises orjson.JSONDecodeError on invalid JSON.
+        """
+        self.skipped_records = 0
+        loads = orjson.loads
+        getter = self._single_getter
+        if getter is None or self._key_patterns is None:
+            for raw_record in raw_records:
+                texts = self.extract(loads(raw_record)) if self.may_match(raw_record) else []
+                if len(texts) == 0:
+                    self.skipped_records += 1
+                yield from texts
+            return
+
+        pattern = self._key_patterns[0]
+        weight = self.paths[0][1]
+        for raw_record in raw_records:
+            if raw_record.find(pattern) < 0:
+                self.skipped_records += 1
+                continue
+            try:
+                value = getter(loads(raw_record))
+            except LOOKUP_ERRORS:
+                self.skipped_records += 1
+                continue
+            if value.__class__ is str:
+                yield value, weight
+            else:
+                self.skipped_records += 1
+
+
+def benchmark_extraction(records: List[any], target_key: List[str], repeat: int = 5) -> Dict[str, float]:
+    """
+    Compare the extraction throughput (records per second, best of `repeat`) of get_from_nested_key
+    and KeyPathExtractor over the same records, decoded and as raw JSON.
+    """
+    extractor = KeyPathExtractor.from_target_key(target_key)
+    raw_records = [orjson.dumps(record) for record in records]
+
+    def best_rate(function: Callable[[], any]) -> float:
+        best = min(timeit.repeat(function, number=1, repeat=repeat))
+        return len(records) / best if best > 0 else float("inf")
+
+    return {
+        "records": len(records),
+        "get_from_nested_key": best_rate(lambda: [get_from_nested_key(record, target_key) for record in records]),
+        "extractor": best_rate(lambda: list(extractor.iter_texts(records))),
+        # get_from_nested_key decodes string records itself, raw records only need to be turned into strings
+        "get_from_nested_key_raw": best_rate(lambda: [get_from_nested_key(record.decode("utf-8"), target_key) for record in raw_records]),
+        "extractor_raw": best_rate(lambda: list(extractor.iter_texts_bytes(raw_records))),
+    }
@@ -1,4 +1,4 @@
-from typing import Dict, Tuple, List, Set, Union, Optional
+from typing import Dict, Tuple, List, Set, Union, Optional, Callable
 import networkx as nx # type: ignore
 import operator
 
@@ -11,6 +11,10 @@ class WeightedWordDiGraph():
         self.neighbors: Dict[str, List[Tuple[str, int]]] = dict()
         self.edges: List[Tuple[str, str, int]] = []  # For easier way to reverse graph
 
+        # Lazily built indexes, only needed when edges are updated in place (see update_edge)
+        self._edge_position: Optional[Dict[Tuple[str, str], int]] = None
+        self._in_degree: Optional[Dict[str, int]] = None
+
         if edge_list is not None:
             self.add_edge_from_list(edge_list)
 
@@ -29,8 +33,15 @@ class WeightedWordDiGraph():
         else:
             self.nodes_total_out_weight[node1] += weight
 
+        if self._edge_position is not None:
+            # Constant-time membership once the edge index is built (see update_edge)
+            if (node1, node2) not in self._edge_position:
+                self.edges.append(weighted_edge)
+                self._edge_position[(node1, node2)] = len(self.edges) - 1
+                self._in_degree[node2] = self._in_degree.get(node2, 0) + 1
+
         # If the edge=(node1, node2, weight) is duplicate, but the weight is different, this condition will not work
-        if weighted_edge not in self.edges:
+        elif weighted_edge not in self.edges:
             self.edges.append(weighted_edge)
 
         if node1 not in self.neighbors:
@@ -45,12 +56,77 @@ class WeightedWordDiGraph():
         for edge in edge_list:
             self.add_edge(edge)
     
+    def _build_edge_index(self) -> None:
+        self._edge_position = {}
+        self._in_degree = {node: 0 for node in self.nodes}
+        for i, (node1, node2, _) in enumerate(self.edges):
+            self._edge_position[(node1, node2)] = i
+            self._in_degree[node2] += 1
+
+    def update_edge(self, node1: str, node2: str, delta: int) -> None:
+        """
+        Add `delta` to the weight of the edge (node1, node2) in place.
+
+        The edge is created if it does not exist and removed once its weight drops to 0 or below.
+        Nodes left without any incoming or outgoing edge are removed as well, so the graph is
+        always identical to one built from scratch with the resulting edge list.
+
+        Parameters
+        ----------
+        node1 : str
+            The source node.
+        node2 : str
+            The target node.
+        delta : int
+            The weight to add (negative to subtract).
+        """
+        if delta == 0:
+            return
+
+        if self._edge_position is None:
+            self._build_edge_index()
+
+        position = self._edge_position.get((node1, node2))
+        if position is None:
+            if delta > 0:
+                self.add_edge((node1, node2, delta))
+            return
+
+        old_weight = self.edges[position][2]
+        new_weight = old_weight + delta
+        neighbors = self.neighbors[node1]
+        neighbor_index = next(i for i, (neighbor, _) in enumerate(neighbors) if neighbor == node2)
+
+        if new_weight > 0:
+            self.edges[position] = (node1, node2, new_weight)
+            neighbors[neighbor_index] = (node2, new_weight)
+            self.nodes_total_out_weight[node1] += delta
+            return
+
+        # Remove the edge (swap with the last edge to keep removal O(1))
+        last_edge = self.edges.pop()
+        if position < len(self.edges):
+            self.edges[position] = last_edge
+            self._edge_position[(last_edge[0], last_edge[1])] = position
+        del self._edge_position[(node1, node2)]
+
+        neighbors.pop(neighbor_index)
+        self.nodes_total_out_weight[node1] -= old_weight
+        self._in_degree[node2] -= 1
+
+        for node in (node1, node2):
+            if node in self.nodes and len(self.neighbors[node]) == 0 and self._in_degree.get(node, 0) == 0:
+                self.nodes.discard(node)
+                self.neighbors.pop(node, None)
+                self.nodes_total_out_weight.pop(node, None)
+                self._in_degree.pop(node, None)
+
     def get_reversed_digraph(self) -> "WeightedWordDiGraph":
         new_graph = WeightedWordDiGraph()
         new_graph.add_edge_from_list(self.reversed_edges)
         return new_graph
     
-    def markov_chain(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, bias_set: Optional[Set[str]] = None) -> Dict[str, float]:
+    def markov_chain(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, bias_set: Optional[Set[str]] = None, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
         """
         Markov Chain algorithm is a base algorithm for PageRank and TrustRank algorithms.
 
@@ -64,6 +140,15 @@ class WeightedWordDiGraph():
             The maximum number of iterations. Defaults to 200.
         bias_set : Set[str], optional
             The set of nodes to bias the PageRank scores. If not provided, all nodes are biased equally (i.e. pagerank algorithm).
+        initial_scores : Dict[str, float], optional
+            Scores to start the iteration from (warm start), e.g. the result of a previous run on a slightly different graph.
+            Nodes missing from it start at the default score, and the starting vector is normalized to sum to 1.
+        snapshot_interval : int, optional
+            Call on_snapshot every snapshot_interval iterations. Defaults to 0 (never).
+        on_snapshot : Callable[[Dict[str, float], int], None], optional
+            Receives the current scores and the number of completed iterations, e.g. to persist them.
+            A run can be continued from a snapshot by passing its scores as initial_scores and
+            max_iter minus the completed iterations.
 
         Returns
         -------
@@ -80,12 +165,20 @@ class WeightedWordDiGraph():
         # If bias_set is not provided, assume no nodes are biased (by making every node a bias equally) -> pagerank algorithm
         if bias_set is None or len(bias_set) == 0:
             bias_set = set(self.nodes)
-        
+        if len(bias_set) == 0:
+            raise ValueError("Cannot rank an empty graph")
+
         # Normalized bias factor for biased nodes
         n = len(bias_set)
         starting_score = 1 / n
         scores = {node: starting_score if node in bias_set else 0 for node in self.nodes}
 
+        if initial_scores:
+            scores = {node: initial_scores.get(node, scores[node]) for node in self.nodes}
+            total_score = sum(scores.values())
+            if total_score > 0:
+                scores = {node: score / total_score for node, score in scores.items()}
+
 
         based_score = (1 - alpha) / n
 
@@ -120,17 +213,20 @@ class WeightedWordDiGraph():
             # Update scores for the next iteration
             scores = new_scores
 
+            if on_snapshot is not None and snapshot_interval > 0 and (i + 1) % snapshot_interval == 0:
+                on_snapshot(scores, i + 1)
+
         # return [(node, scores) for node, scores in sorted(scores.items(), key=operator.itemgetter(1), reverse=True)]
         return scores
 
-    def get_pagerank(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200) -> Dict[str, float]:
-        return self.markov_chain(alpha, epsilon, max_iter, bias_set=None)
+    def get_pagerank(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
+        return self.markov_chain(alpha, epsilon, max_iter, bias_set=None, initial_scores=initial_scores, snapshot_interval=snapshot_interval, on_snapshot=on_snapshot)
     
-    def get_inverse_pagerank(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200) -> Dict[str, float]:
+    def get_inverse_pagerank(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
         reversed_graph = self.get_reversed_digraph()
-        return reversed_graph.get_pagerank(alpha, epsilon, max_iter)
+        return reversed_graph.get_pagerank(alpha, epsilon, max_iter, initial_scores=initial_scores, snapshot_interval=snapshot_interval, on_snapshot=on_snapshot)
 
-    def get_trust_rank(self, bias_amount: int, inverse_pagerank_scores: Union[ Dict[str, float], List[Tuple[str, float]], None ] = None , alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200) -> Dict[str, float]:
+    def get_trust_rank(self, bias_amount: int, inverse_pagerank_scores: Union[ Dict[str, float], List[Tuple[str, float]], None ] = None , alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
         if bias_amount <= 0:
             raise ValueError("Bias amount must be greater than 0")
 
@@ -144,7 +240,7 @@ class WeightedWordDiGraph():
             inverse_pagerank_scores = get_sorted_rank_score(inverse_pagerank_scores)
 
         bias_set = set([sorted_score[0] for sorted_score in inverse_pagerank_scores[: bias_amount]])
-        return self.markov_chain(alpha, epsilon, max_iter, bias_set)
+        return self.markov_chain(alpha, epsilon, max_iter, bias_set, initial_scores=initial_scores, snapshot_interval=snapshot_interval, on_snapshot=on_snapshot)
  
     def __repr__(self) -> str:
         return f"WordWeightedDiGraph({self.neighbors})"
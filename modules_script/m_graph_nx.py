@@ -1,7 +1,11 @@
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
+from timeit import default_timer as timer
 
+import numpy as np
 import networkx as nx # type: ignore
 import matplotlib.pyplot as plt # type: ignore
+from matplotlib.figure import Figure # type: ignore
+from matplotlib.backends.backend_agg import FigureCanvasAgg # type: ignore
 
 def generate_graph(bigrams_list, weighted=False) -> nx.DiGraph:
     word_graph = nx.DiGraph()
@@ -14,12 +18,16 @@ def generate_graph(bigrams_list, weighted=False) -> nx.DiGraph:
 def reverse_graph(graph: nx.DiGraph) -> nx.DiGraph:
     return nx.reverse(graph)
 
-def get_inverse_pagerank(graph: nx.DiGraph, alpha=0.85, max_iter=200) -> Dict[any, float]:
+def get_inverse_pagerank(graph: nx.DiGraph, alpha=0.85, max_iter=200, initial_scores: Optional[Dict[any, float]] = None) -> Dict[any, float]:
     # Reverse the graph
     reversed_graph = reverse_graph(graph)
 
+    # Only keep starting scores of existing nodes (networkx requires nstart to be a subset of the nodes)
+    if initial_scores:
+        initial_scores = {node: score for node, score in initial_scores.items() if node in reversed_graph}
+
     # Compute PageRank on the reversed graph
-    scores = nx.pagerank(reversed_graph, alpha=alpha, max_iter=max_iter)
+    scores = nx.pagerank(reversed_graph, alpha=alpha, max_iter=max_iter, nstart=initial_scores or None)
     return dict(scores)
 
 def plot_graph(word_graph: nx.DiGraph, node_size=1500, with_labels=True, weighted=False) -> None:
@@ -32,6 +40,84 @@ def plot_graph(word_graph: nx.DiGraph, node_size=1500, with_labels=True, weighte
         nx.draw_networkx_edge_labels(word_graph, pos, edge_labels, font_size=5)
     plt.show()
 
+def select_nodes(sorted_scores: List[Tuple[str, float]], k: int, weighted_sample: bool = False, seed: int = 0) -> List[str]:
+    """
+    Select k nodes to render: the k highest ranked nodes, or a sample of k nodes drawn (without
+    replacement) with probability proportional to their score.
+    """
+    k = min(k, len(sorted_scores))
+    if not weighted_sample or k == len(sorted_scores):
+        return [node for node, _ in sorted_scores[:k]]
+
+    scores = np.array([score for _, score in sorted_scores], dtype=np.float64)
+    if scores.sum() <= 0:
+        scores = np.ones(len(scores))
+    rng = np.random.default_rng(seed)
+    index = rng.choice(len(scores), size=k, replace=False, p=scores / scores.sum())
+    return [sorted_scores[i][0] for i in sorted(index)]
+
+def get_induced_subgraph(weighted_edges: List[Tuple[str, str, int]], nodes: List[str]) -> nx.DiGraph:
+    """
+    Build the subgraph induced by the given nodes directly from the weighted edge list (the full graph is never built).
+    """
+    node_set = set(nodes)
+    subgraph = nx.DiGraph()
+    subgraph.add_nodes_from(nodes)
+    subgraph.add_weighted_edges_from((node1, node2, weight) for node1, node2, weight in weighted_edges if node1 in node_set and node2 in node_set)
+    return subgraph
+
+def get_layout(graph: nx.DiGraph, layout: str = "spring", iterations: int = 50, seed: int = 0) -> Dict[any, np.ndarray]:
+    if layout == "spring":
+        return nx.spring_layout(graph, iterations=iterations, seed=seed)
+    if layout == "kamada_kawai":  # O(n^2) memory, only for small subgraphs
+        return nx.kamada_kawai_layout(graph)
+    if layout == "circular":
+        return nx.circular_layout(graph)
+    if layout == "random":
+        return nx.random_layout(graph, seed=seed)
+    raise ValueError(f"Unknown layout: {layout}")
+
+def render_graph(graph: nx.DiGraph, output_path: str, scores: Optional[Dict[any, float]] = None, layout: str = "spring", layout_iterations: int = 50, edge_labels: bool = False, dpi: int = 150) -> Dict[str, float]:
+    """
+    Draw a (small) graph and save it to output_path (PNG or SVG, from the extension) without a GUI.
+
+    The figure is drawn on an Agg canvas directly, so rendering works headlessly whatever the
+    matplotlib backend. Node sizes follow the given scores and edge widths follow the weights.
+
+    Returns
+    -------
+    Dict[str, float]
+        Layout and drawing time (ms).
+    """
+    start = timer()
+    pos = get_layout(graph, layout=layout, iterations=layout_iterations)
+    layout_time = timer() - start
+
+    start = timer()
+    figure = Figure(figsize=(12, 12))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.set_axis_off()
+
+    node_size = 300
+    if scores:
+        node_scores = np.array([scores.get(node, 0) for node in graph.nodes], dtype=np.float64)
+        node_size = 50 + 950 * node_scores / max(node_scores.max(), 1e-12)
+
+    weights = np.array([weight for _, _, weight in graph.edges(data="weight", default=1)], dtype=np.float64)
+    width = 0.5 + 3.5 * weights / weights.max() if len(weights) > 0 else 1.0
+
+    nx.draw_networkx_edges(graph, pos, ax=ax, width=width, edge_color="gray", alpha=0.6, arrowsize=8, node_size=node_size)
+    nx.draw_networkx_nodes(graph, pos, ax=ax, node_size=node_size, node_color="skyblue")
+    nx.draw_networkx_labels(graph, pos, ax=ax, font_size=7)
+    if edge_labels:
+        nx.draw_networkx_edge_labels(graph, pos, nx.get_edge_attributes(graph, "weight"), ax=ax, font_size=5)
+
+    figure.savefig(output_path, dpi=dpi, bbox_inches="tight")
+    draw_time = timer() - start
+
+    return {"layout_ms": layout_time * 1e3, "draw_ms": draw_time * 1e3}
+
 def test_graph(size=100) -> None:
     from helper_script.cache_helper import read_from_file
     from helper_script.json_helper import read_json
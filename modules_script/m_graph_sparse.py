@@ -0,0 +1,301 @@
+from typing import Dict, Tuple, List, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp # type: ignore
+
+try:
+    # y += A @ x into a preallocated y (the public `A @ x` allocates a new vector)
+    from scipy.sparse._sparsetools import csr_matvec # type: ignore
+except ImportError:
+    csr_matvec = None
+
+
+def _matvec_rows(block: Tuple[int, int, np.ndarray, np.ndarray, np.ndarray], x: np.ndarray, y: np.ndarray) -> None:
+    """
+    y[row_start:row_end] = A[row_start:row_end] @ x, for one row block of a CSR matrix (see CSRGraph.get_row_blocks).
+    """
+    row_start, row_end, indptr, indices, data = block
+    y_block = y[row_start:row_end]
+    y_block.fill(0)
+    csr_matvec(row_end - row_start, len(x), indptr, indices, data, x, y_block)
+
+
+class CSRGraph():
+    """
+    Weighted directed graph stored as the CSR arrays of its column-stochastic transition matrix.
+
+    Row v of the matrix holds, for every edge u -> v, the probability weight(u, v) / total_out_weight(u),
+    so one Markov chain step is a single sparse matrix-vector product. Nodes without outgoing
+    edges are marked in `dangling`. Node indices follow the order of first appearance in the edge
+    list, so a graph and its reverse built from the same edges share the same node order.
+
+    Parameters
+    ----------
+    node_names : List[str]
+        Names of the nodes, by index.
+    data, indices, indptr : np.ndarray
+        CSR arrays of the transition matrix (shape: nodes x nodes). They are used as is (no copy),
+        e.g. they can be views on shared memory.
+    dangling : np.ndarray
+        Boolean mask of the nodes without outgoing edges.
+    """
+
+    def __init__(self, node_names: List[str], data: np.ndarray, indices: np.ndarray, indptr: np.ndarray, dangling: np.ndarray):
+        self.node_names = node_names
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.dangling = dangling
+        self.transition = sp.csr_matrix((data, indices, indptr), shape=(len(dangling), len(dangling)), copy=False)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.dangling)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.data)
+
+    @classmethod
+    def from_weighted_edges(cls, weighted_edges: List[Tuple[str, str, int]], reverse: bool = False, dtype: type = np.float64) -> "CSRGraph":
+        """
+        Build the graph (or its reverse if `reverse` is True) of a weighted edge list. Duplicate edges are summed.
+        """
+        node_index: Dict[str, int] = dict()
+        for node1, node2, _ in weighted_edges:
+            node_index.setdefault(node1, len(node_index))
+            node_index.setdefault(node2, len(node_index))
+
+        edge_count = len(weighted_edges)
+        node_count = len(node_index)
+        # 32-bit node indices (the CSR index arrays stay 32-bit too) unless the graph is too large
+        index_dtype = np.int32 if max(node_count, edge_count) < np.iinfo(np.int32).max else np.int64
+        sources = np.fromiter((node_index[edge[0]] for edge in weighted_edges), dtype=index_dtype, count=edge_count)
+        targets = np.fromiter((node_index[edge[1]] for edge in weighted_edges), dtype=index_dtype, count=edge_count)
+        weights = np.fromiter((edge[2] for edge in weighted_edges), dtype=np.float64, count=edge_count)
+
+        if reverse:
+            sources, targets = targets, sources
+
+        out_weight = np.bincount(sources, weights=weights, minlength=node_count)
+        weights /= out_weight[sources]
+
+        transition = sp.csr_matrix(
+            (weights.astype(dtype, copy=False), (targets, sources)),
+            shape=(node_count, node_count)
+        )
+        transition.sum_duplicates()
+
+        return cls(list(node_index), transition.data, transition.indices, transition.indptr, out_weight == 0)
+
+    def get_row_blocks(self, blocks: int) -> List[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Split the rows of the transition matrix into `blocks` contiguous blocks of about the same
+        number of nonzeros, as (row_start, row_end, indptr, indices, data). The indptr of a block
+        is rebased to 0, the indices and data are views.
+        """
+        boundaries = np.searchsorted(self.indptr, np.linspace(0, self.edge_count, blocks + 1))
+        boundaries[0], boundaries[-1] = 0, self.node_count
+
+        row_blocks = []
+        for row_start, row_end in zip(boundaries[:-1], boundaries[1:]):
+            if row_end <= row_start:
+                continue
+            start, end = self.indptr[row_start], self.indptr[row_end]
+            indptr = self.indptr[row_start:row_end + 1] - start
+            row_blocks.append((int(row_start), int(row_end), indptr, self.indices[start:end], self.data[start:end]))
+        return row_blocks
+
+    def markov_chain(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, bias_mask: Optional[np.ndarray] = None, initial_scores: Optional[np.ndarray] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[np.ndarray, int], None]] = None, workers: int = 1) -> Tuple[np.ndarray, int, bool]:
+        """
+        Vectorized version of m_graph_custom.WeightedWordDiGraph.markov_chain (same iteration and
+        convergence rule, so the results match).
+
+        The scores are kept in the dtype of the transition matrix (float32 halves the memory of
+        the graph and the score vectors). Two score buffers are allocated once and swapped every
+        iteration (ping-pong), so the iterations do not allocate any node-sized array.
+
+        Parameters
+        ----------
+        alpha : float, optional
+            The damping factor. Defaults to 0.85.
+        epsilon : float, optional
+            The convergence threshold. Defaults to 1e-5.
+        max_iter : int, optional
+            The maximum number of iterations. Defaults to 200.
+        bias_mask : np.ndarray, optional
+            Boolean mask of the biased nodes. Defaults to all nodes (i.e. pagerank algorithm).
+        initial_scores : np.ndarray, optional
+            Scores to start the iteration from (warm start). Normalized to sum to 1.
+        snapshot_interval : int, optional
+            Call on_snapshot every snapshot_interval iterations. Defaults to 0 (never).
+        on_snapshot : Callable[[np.ndarray, int], None], optional
+            Receives the current scores (a buffer reused by the next iterations, copy it to keep it)
+            and the number of completed iterations.
+        workers : int, optional
+            Number of threads of the matrix-vector product (row blocks, see get_row_blocks).
+            The product releases the GIL, so the blocks run in parallel. Defaults to 1.
+
+        Returns
+        -------
+        Tuple[np.ndarray, int, bool]
+            The scores by node index, the number of iterations and whether the scores converged.
+        """
+        dtype = self.data.dtype
+        if self.node_count == 0:
+            return np.empty(0, dtype=dtype), 0, True
+
+        if bias_mask is None or not bias_mask.any():
+            bias_mask = np.ones(self.node_count, dtype=bool)
+
+        n = np.count_nonzero(bias_mask)
+        all_biased = n == self.node_count
+
+        # Preallocated buffers: scores and new_scores are swapped every iteration, difference is scratch space
+        scores = np.where(bias_mask, 1 / n, 0).astype(dtype)
+        if initial_scores is not None and initial_scores.sum() > 0:
+            scores = (initial_scores / initial_scores.sum()).astype(dtype)
+        new_scores = np.empty_like(scores)
+        difference = np.empty_like(scores)
+
+        based_scores = np.where(bias_mask, (1 - alpha) / n, 0).astype(dtype)
+        dangling_weights = self.dangling.astype(dtype)  # Dot product with the scores gives the dangling sum without a copy
+        node_count = self.node_count
+
+        executor = None
+        if workers > 1 and csr_matvec is not None:
+            row_blocks = self.get_row_blocks(workers)
+            executor = ThreadPoolExecutor(max_workers=len(row_blocks))
+
+        iterations = 0
+        converged = False
+        for iterations in range(1, max_iter + 1):
+            if executor is not None:
+                for future in [executor.submit(_matvec_rows, block, scores, new_scores) for block in row_blocks]:
+                    future.result()
+            elif csr_matvec is not None:
+                new_scores.fill(0)
+                csr_matvec(node_count, node_count, self.indptr, self.indices, self.data, scores, new_scores)
+            else:
+                new_scores[:] = self.transition @ scores
+            new_scores *= alpha
+            new_scores += based_scores
+
+            dangling_sum = scores @ dangling_weights
+            if dangling_sum != 0:
+                if all_biased:
+                    new_scores += alpha * dangling_sum / n
+                else:
+                    np.add(new_scores, alpha * dangling_sum / n, out=new_scores, where=bias_mask)
+
+            # Check for convergence
+            np.subtract(new_scores, scores, out=difference)
+            np.abs(difference, out=difference)
+            if difference.max() < epsilon:
+                converged = True
+                break
+
+            scores, new_scores = new_scores, scores
+
+            if on_snapshot is not None and snapshot_interval > 0 and iterations % snapshot_interval == 0:
+                on_snapshot(scores, iterations)
+
+        if executor is not None:
+            executor.shutdown()
+
+        return scores, iterations, converged
+
+    def to_score_dict(self, scores: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.node_names, scores.tolist()))
+
+    def get_pagerank(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200) -> Dict[str, float]:
+        scores, _, _ = self.markov_chain(alpha, epsilon, max_iter)
+        return self.to_score_dict(scores)
+
+
+def get_top_k(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Return the indices of the k highest scores, highest first (all indices if k is None).
+    """
+    if k is None or k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def get_sorted_rank_score(node_names: List[str], scores: np.ndarray, k: Optional[int] = None) -> List[Tuple[str, float]]:
+    return [(node_names[i], float(scores[i])) for i in get_top_k(scores, k)]
+
+
+class SparseWordGraph():
+    """
+    Compact numeric counterpart of m_graph_custom.WeightedWordDiGraph (same methods and results):
+    the graph and its reverse are CSRGraphs sharing the same node order, and scores are float32 or
+    float64 arrays instead of dictionaries of Python floats. Dictionaries are only built for the
+    results (and the snapshots).
+
+    Parameters
+    ----------
+    weighted_edges : List[Tuple[str, str, int]]
+        The weighted edges (node1, node2, weight).
+    dtype : type, optional
+        np.float64 or np.float32. Defaults to np.float64.
+    workers : int, optional
+        Number of threads of the power iteration. Defaults to 1.
+    """
+
+    def __init__(self, weighted_edges: List[Tuple[str, str, int]], dtype: type = np.float64, workers: int = 1):
+        self.edges = weighted_edges
+        self.dtype = np.dtype(dtype)
+        self.workers = workers
+        self.graph = CSRGraph.from_weighted_edges(weighted_edges, dtype=dtype)
+        self.reversed_graph = CSRGraph.from_weighted_edges(weighted_edges, reverse=True, dtype=dtype)
+
+    @property
+    def nodes(self) -> List[str]:
+        return self.graph.node_names
+
+    def _to_vector(self, scores: Dict[str, float], default: np.ndarray) -> np.ndarray:
+        """
+        Scores by node index (nodes missing from `scores` keep their `default` score).
+        """
+        vector = default.astype(self.dtype)
+        for i, node in enumerate(self.graph.node_names):
+            score = scores.get(node)
+            if score is not None:
+                vector[i] = score
+        return vector
+
+    def _markov_chain(self, graph: CSRGraph, alpha: float, epsilon: float, max_iter: int, bias_mask: np.ndarray, initial_scores: Optional[Dict[str, float]], snapshot_interval: int, on_snapshot: Optional[Callable[[Dict[str, float], int], None]]) -> Dict[str, float]:
+        initial_vector = None
+        if initial_scores:
+            initial_vector = self._to_vector(initial_scores, np.where(bias_mask, 1 / np.count_nonzero(bias_mask), 0))
+
+        to_score_dict = self.graph.to_score_dict
+        scores, _, _ = graph.markov_chain(
+            alpha,
+            epsilon,
+            max_iter,
+            bias_mask=bias_mask,
+            initial_scores=initial_vector,
+            snapshot_interval=snapshot_interval,
+            on_snapshot=(lambda scores, iteration: on_snapshot(to_score_dict(scores), iteration)) if on_snapshot is not None else None,
+            workers=self.workers
+        )
+        return to_score_dict(scores)
+
+    def get_inverse_pagerank(self, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
+        bias_mask = np.ones(self.graph.node_count, dtype=bool)
+        return self._markov_chain(self.reversed_graph, alpha, epsilon, max_iter, bias_mask, initial_scores, snapshot_interval, on_snapshot)
+
+    def get_trust_rank(self, bias_amount: int, inverse_pagerank_scores: List[Tuple[str, float]], alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, initial_scores: Optional[Dict[str, float]] = None, snapshot_interval: int = 0, on_snapshot: Optional[Callable[[Dict[str, float], int], None]] = None) -> Dict[str, float]:
+        """
+        TrustRank biased towards the `bias_amount` first nodes of the sorted inverse PageRank scores.
+        """
+        if bias_amount <= 0:
+            raise ValueError("Bias amount must be greater than 0")
+
+        bias_nodes = set(node for node, _ in inverse_pagerank_scores[:bias_amount])
+        bias_mask = np.fromiter((node in bias_nodes for node in self.graph.node_names), dtype=bool, count=self.graph.node_count)
+        return self._markov_chain(self.graph, alpha, epsilon, max_iter, bias_mask, initial_scores, snapshot_interval, on_snapshot)
@@ -0,0 +1,157 @@
+from typing import Dict, Tuple, List, Hashable, Optional
+import heapq
+import operator
+
+import numpy as np
+
+from modules_script import m_ngram
+
+
+class SpaceSaving():
+    """
+    Space-Saving heavy hitter counter with a fixed number of counters.
+
+    Keeps at most `capacity` items. When a new item arrives and all counters are taken, the item
+    with the smallest count is replaced and the new item inherits that count as its error.
+
+    Guarantees (N = total weight added):
+    - For every tracked item: count - error <= true count <= count.
+    - The error of any item is at most N / capacity, so every item with a true count above
+      N / capacity is tracked.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("Capacity must be greater than 0")
+
+        self.capacity = capacity
+        self.total = 0
+        self.counters: Dict[Hashable, List[int]] = dict()  # item -> [count, error]
+        self._heap: List[Tuple[int, int, Hashable]] = []   # (count, tie breaker, item), may contain stale entries
+        self._push_count = 0
+
+    def __len__(self) -> int:
+        return len(self.counters)
+
+    def _push(self, item: Hashable, count: int) -> None:
+        self._push_count += 1
+        heapq.heappush(self._heap, (count, self._push_count, item))
+
+    def _pop_min(self) -> Tuple[Hashable, int]:
+        # Skip stale heap entries (items whose count changed or that were evicted)
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is None:
+                continue
+            if counter[0] != count:
+                self._push(item, counter[0])
+                continue
+            return item, count
+
+    def _rebuild_heap(self) -> None:
+        self._heap = []
+        self._push_count = 0
+        for item, (count, _) in self.counters.items():
+            self._push(item, count)
+
+    def add(self, item: Hashable, weight: int = 1) -> None:
+        self.total += weight
+
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            self._push(item, weight)
+            return
+
+        evicted_item, min_count = self._pop_min()
+        del self.counters[evicted_item]
+        self.counters[item] = [min_count + weight, min_count]
+        self._push(item, min_count + weight)
+
+        # Stale entries are pushed back lazily, keep the heap from growing without bound
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    @property
+    def max_error(self) -> float:
+        return self.total / self.capacity
+
+    def top(self, m: Optional[int] = None, guaranteed_only: bool = False) -> List[Tuple[Hashable, int, int]]:
+        """
+        Return the (item, count, error) of the m heaviest items, by count.
+
+        If guaranteed_only is True, only items whose guaranteed count (count - error) is at least the
+        count of the (m + 1)-th item are returned, i.e. items certain to belong to the true top-m.
+        """
+        ordered = sorted(((item, count, error) for item, (count, error) in self.counters.items()), key=operator.itemgetter(1), reverse=True)
+        if m is None or m >= len(ordered):
+            return ordered
+
+        top_items = ordered[:m]
+        if guaranteed_only:
+            threshold = ordered[m][1]
+            top_items = [(item, count, error) for item, count, error in top_items if count - error >= threshold]
+        return top_items
+
+
+class HeavyHitterEdgeCounter():
+    """
+    Approximate, bounded-memory version of m_ngram.NgramEdgeCounter for unbounded streams.
+
+    Edges are extracted the same way (integer n-gram node ids), but counted with Space-Saving, so
+    only the `capacity` heaviest edges are kept whatever the stream length. Only the vocabulary
+    of words grows with the input.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of edge counters.
+    n : int, optional
+        Number of words per node. Defaults to 2.
+    skip : int, optional
+        Number of skipped words between the words of a node. Defaults to 0.
+    """
+
+    def __init__(self, capacity: int, n: int = 2, skip: int = 0, vocabulary: Optional[m_ngram.TokenVocabulary] = None):
+        self.ngram_counter = m_ngram.NgramEdgeCounter(n=n, skip=skip, vocabulary=vocabulary)
+        self.sketch = SpaceSaving(capacity)
+
+    def add_words(self, words: List[str], multiplicity: int = 1) -> None:
+        edges = self.ngram_counter.document_edges(words)
+        if len(edges) == 0:
+            return
+
+        unique_edges, counts = np.unique(edges, axis=0, return_counts=True)
+        for (node1, node2), count in zip(unique_edges.tolist(), counts.tolist()):
+            self.sketch.add((node1, node2), count * multiplicity)
+
+    def top_edges(self, m: Optional[int] = None, guaranteed_only: bool = False) -> List[Tuple[str, str, int, int]]:
+        """
+        Return the m heaviest edges as (node1, node2, count, error). The true weight of each edge is
+        between count - error and count (see SpaceSaving).
+        """
+        top_items = self.sketch.top(m, guaranteed_only=guaranteed_only)
+        if len(top_items) == 0:
+            return []
+
+        node_ids = np.array([item for item, _, _ in top_items], dtype=np.int64)
+        unique_nodes, inverse = np.unique(node_ids, return_inverse=True)
+        node_names = self.ngram_counter.decode_nodes(unique_nodes)
+        inverse = inverse.reshape(node_ids.shape)
+
+        return [
+            (node_names[node1], node_names[node2], count, error)
+            for (node1, node2), (_, count, error) in zip(inverse.tolist(), top_items)
+        ]
+
+    def weighted_edges(self, m: Optional[int] = None, sort: bool = False, guaranteed_only: bool = False) -> List[Tuple[str, str, int]]:
+        """
+        Return the m heaviest edges as (node1, node2, weight), usable as input of WeightedWordDiGraph.
+        """
+        weighted_edges = [(node1, node2, count) for node1, node2, count, _ in self.top_edges(m, guaranteed_only=guaranteed_only)]
+        return sorted(weighted_edges, key=operator.itemgetter(2, 0, 1), reverse=True) if sort else weighted_edges
@@ -0,0 +1,143 @@
+from typing import Dict, Tuple, List, Optional
+import operator
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class TokenVocabulary():
+    """
+    Interns words into consecutive integer ids (in order of first appearance).
+    """
+
+    def __init__(self):
+        self.index: Dict[str, int] = dict()
+        self._words: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def encode(self, words: List[str]) -> np.ndarray:
+        index = self.index
+        # setdefault evaluates len(index) before inserting, so a new word gets the next id
+        return np.fromiter((index.setdefault(word, len(index)) for word in words), dtype=np.int64, count=len(words))
+
+    @property
+    def words(self) -> List[str]:
+        if len(self._words) != len(self.index):
+            self._words = list(self.index)
+        return self._words
+
+
+def ngram_windows(token_ids: np.ndarray, n: int = 2, skip: int = 0) -> np.ndarray:
+    """
+    Return the n-grams of a token id array as a (count, n) strided view (no copy).
+
+    With skip > 0, consecutive tokens of an n-gram are `skip + 1` positions apart (skip-grams).
+    """
+    span = (n - 1) * (skip + 1) + 1
+    if len(token_ids) < span:
+        return np.empty((0, n), dtype=token_ids.dtype)
+    return sliding_window_view(token_ids, span)[:, ::skip + 1]
+
+
+class NgramEdgeCounter():
+    """
+    Count weighted edges between consecutive n-grams of documents, using integer node ids.
+
+    Each n-gram of n token ids is packed into a single int64 node id, and the edges of a
+    document are the pairs (n-gram i, n-gram i + 1), so a document is converted with a few
+    vectorized operations instead of building strings. Edge counts are reduced periodically
+    to keep memory bounded, and strings are only built for the unique nodes of the output.
+
+    With n = 2 and skip = 0, the result is the same as
+    m_process_text.pair_word_to_bigram + bigrams_to_weighted_bigrams.
+
+    Parameters
+    ----------
+    n : int, optional
+        Number of words per node. Defaults to 2.
+    skip : int, optional
+        Number of skipped words between the words of a node. Defaults to 0.
+    vocabulary : TokenVocabulary, optional
+        Shared vocabulary. Defaults to a new one.
+    compact_threshold : int, optional
+        Number of pending edges before they are reduced to unique edge counts. Defaults to 1,000,000.
+    """
+
+    def __init__(self, n: int = 2, skip: int = 0, vocabulary: Optional[TokenVocabulary] = None, compact_threshold: int = 1_000_000):
+        if n < 1 or skip < 0:
+            raise ValueError("n must be at least 1 and skip must not be negative")
+
+        self.n = n
+        self.skip = skip
+        self.vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
+        self.compact_threshold = compact_threshold
+
+        self.bits = 63 // n
+        self.shifts = np.arange(n - 1, -1, -1, dtype=np.int64) * self.bits
+
+        self.edges = np.empty((0, 2), dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._pending_edges: List[np.ndarray] = []
+        self._pending_counts: List[np.ndarray] = []
+        self._pending_size = 0
+
+    def document_edges(self, words: List[str]) -> np.ndarray:
+        """
+        Return the (count, 2) array of node id edges of one preprocessed document.
+        """
+        token_ids = self.vocabulary.encode(words)
+        if len(self.vocabulary) > (1 << self.bits):
+            raise ValueError(f"Vocabulary too large for {self.n}-gram node ids ({len(self.vocabulary)} > {1 << self.bits} words)")
+
+        nodes = (ngram_windows(token_ids, self.n, self.skip) << self.shifts).sum(axis=1)
+        return np.stack([nodes[:-1], nodes[1:]], axis=1)
+
+    def add_words(self, words: List[str], multiplicity: int = 1) -> None:
+        edges = self.document_edges(words)
+        if len(edges) == 0:
+            return
+
+        self._pending_edges.append(edges)
+        self._pending_counts.append(np.full(len(edges), multiplicity, dtype=np.int64))
+        self._pending_size += len(edges)
+
+        if self._pending_size >= self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Reduce all counted edges to unique edges with their total counts.
+        """
+        if self._pending_size == 0:
+            return
+
+        all_edges = np.concatenate([self.edges] + self._pending_edges)
+        all_counts = np.concatenate([self.counts] + self._pending_counts)
+        self.edges, inverse = np.unique(all_edges, axis=0, return_inverse=True)
+        self.counts = np.bincount(inverse.reshape(-1), weights=all_counts, minlength=len(self.edges)).astype(np.int64)
+
+        self._pending_edges, self._pending_counts, self._pending_size = [], [], 0
+
+    def decode_nodes(self, node_ids: np.ndarray) -> List[str]:
+        token_ids = (node_ids[:, None] >> self.shifts) & ((1 << self.bits) - 1)
+        words = self.vocabulary.words
+        return [" ".join([words[token_id] for token_id in row]) for row in token_ids.tolist()]
+
+    def weighted_edges(self, sort: bool = False) -> List[Tuple[str, str, int]]:
+        """
+        Return the counted edges as (node1, node2, weight), sorted like
+        m_process_text.bigrams_to_weighted_bigrams if `sort` is True.
+        """
+        self.compact()
+
+        unique_nodes, inverse = np.unique(self.edges, return_inverse=True)
+        node_names = self.decode_nodes(unique_nodes)
+        inverse = inverse.reshape(self.edges.shape)
+
+        weighted_edges = [
+            (node_names[node1], node_names[node2], count)
+            for (node1, node2), count in zip(inverse.tolist(), self.counts.tolist())
+        ]
+        return sorted(weighted_edges, key=operator.itemgetter(2, 0, 1), reverse=True) if sort else weighted_edges
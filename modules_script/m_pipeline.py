@@ -0,0 +1,192 @@
+from typing import Dict, Tuple, List, Callable, Iterable, Optional
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from timeit import default_timer as timer
+
+
+_STOP = object()
+
+
+class PipelineStage():
+    """
+    One stage of a StagedPipeline.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage (used in the statistics).
+    func : Callable
+        Function applied to each item. Must be picklable (top-level function or functools.partial) if use_process is True.
+    workers : int, optional
+        Number of items processed concurrently. Defaults to 1.
+    use_process : bool, optional
+        Run `func` in a process pool (for CPU-bound stages) instead of the stage threads. Defaults to False.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, use_process: bool = False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.use_process = use_process
+
+        self.items = 0
+        self.busy_time = 0.0     # Time spent running func
+        self.starved_time = 0.0  # Time spent waiting for input
+        self.blocked_time = 0.0  # Time spent waiting for space in the output queue (backpressure)
+        self._lock = threading.Lock()
+
+    def add_stats(self, busy: float, starved: float, blocked: float) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_time += busy
+            self.starved_time += starved
+            self.blocked_time += blocked
+
+
+class StagedPipeline():
+    """
+    Run items through a sequence of stages concurrently, connected by bounded queues.
+
+    Each stage has `workers` threads taking items from its input queue. Thread stages run the
+    function directly (suited to I/O), process stages hand it to their own process pool (suited to
+    CPU-bound work). Bounded queues between the stages make a fast stage wait for a slow one
+    instead of buffering the whole dataset in memory.
+
+    An item that raises in a stage skips the remaining stages and is reported in `errors`.
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 2):
+        if len(stages) == 0:
+            raise ValueError("Pipeline needs at least one stage")
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self.errors: Dict[str, Exception] = dict()
+        self.wall_time = 0.0
+
+    def _run_stage(self, stage: PipelineStage, input_queue: queue.Queue, output_queue: queue.Queue, executor: Optional[Executor]) -> None:
+        while True:
+            start = timer()
+            item = input_queue.get()
+            starved = timer() - start
+
+            if item is _STOP:
+                return
+
+            key, value = item
+            busy_start = timer()
+            try:
+                if executor is not None:
+                    value = executor.submit(stage.func, value).result()
+                else:
+                    value = stage.func(value)
+            except Exception as e:
+                self.errors[key] = e
+                stage.add_stats(timer() - busy_start, starved, 0.0)
+                continue
+            busy = timer() - busy_start
+
+            put_start = timer()
+            output_queue.put((key, value))
+            stage.add_stats(busy, starved, timer() - put_start)
+
+    def run(self, items: Iterable[Tuple[str, any]], on_result: Optional[Callable[[str, any], None]] = None) -> Dict[str, any]:
+        """
+        Run all items through the pipeline.
+
+        Parameters
+        ----------
+        items : Iterable[Tuple[str, any]]
+            (key, value) pairs. Keys must be unique and identify the items in the results and errors.
+        on_result : Callable[[str, any], None], optional
+            Called (from the collecting thread) with each result of the last stage as soon as it is ready.
+
+        Returns
+        -------
+        Dict[str, any]
+            Results of the last stage by key (items that failed are in `errors` instead).
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        # The last queue only feeds the collector, so it must not block the final stage
+        queues[-1] = queue.Queue()
+
+        executors: List[Optional[Executor]] = [
+            ProcessPoolExecutor(max_workers=stage.workers) if stage.use_process else None
+            for stage in self.stages
+        ]
+
+        results: Dict[str, any] = dict()
+        start = timer()
+
+        try:
+            stage_threads: List[List[threading.Thread]] = []
+            for i, stage in enumerate(self.stages):
+                threads = [
+                    threading.Thread(target=self._run_stage, args=(stage, queues[i], queues[i + 1], executors[i]), daemon=True)
+                    for _ in range(stage.workers)
+                ]
+                for thread in threads:
+                    thread.start()
+                stage_threads.append(threads)
+
+            def close_stages() -> None:
+                # Stop each stage once the previous one has drained
+                for i, stage in enumerate(self.stages):
+                    if i > 0:
+                        for thread in stage_threads[i - 1]:
+                            thread.join()
+                    for _ in range(stage.workers):
+                        queues[i].put(_STOP)
+                for thread in stage_threads[-1]:
+                    thread.join()
+                queues[-1].put(_STOP)
+
+            def feed() -> None:
+                for item in items:
+                    queues[0].put(item)
+                close_stages()
+
+            feeder = threading.Thread(target=feed, daemon=True)
+            feeder.start()
+
+            while True:
+                item = queues[-1].get()
+                if item is _STOP:
+                    break
+                key, value = item
+                results[key] = value
+                if on_result is not None:
+                    on_result(key, value)
+
+            feeder.join()
+
+        finally:
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown()
+            self.wall_time = timer() - start
+
+        return results
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage statistics of the last run. Utilization is the busy time over the available worker time
+        (wall time x workers); the stage with the highest utilization is the bottleneck.
+        """
+        stats = dict()
+        for stage in self.stages:
+            available_time = self.wall_time * stage.workers
+            stats[stage.name] = {
+                "workers": stage.workers,
+                "items": stage.items,
+                "busy_ms": stage.busy_time * 1e3,
+                "starved_ms": stage.starved_time * 1e3,
+                "blocked_ms": stage.blocked_time * 1e3,
+                "utilization": stage.busy_time / available_time if available_time > 0 else 0.0,
+            }
+        return stats
+
+    def get_bottleneck(self) -> str:
+        stats = self.get_stats()
+        return max(stats, key=lambda name: stats[name]["utilization"])
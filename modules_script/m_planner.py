@@ -0,0 +1,365 @@
+from typing import Dict, Tuple, List, Callable, Optional, Iterable
+from timeit import default_timer as timer
+import os
+
+import numpy as np
+import orjson
+import scipy.sparse as sp # type: ignore
+from scipy.optimize import nnls # type: ignore
+from scipy.sparse.csgraph import connected_components # type: ignore
+
+from modules_script import m_graph_custom
+from modules_script import m_graph_nx
+from modules_script import m_graph_sparse
+from modules_script import m_memory
+
+
+BACKENDS = ("nx", "custom", "float64", "float32")
+SPARSE_BACKENDS = ("float64", "float32")
+# Construction path and solver of each backend
+BACKEND_PATHS: Dict[str, Tuple[str, str]] = {
+    "nx": ("networkx DiGraph", "nx.pagerank (TrustRank on a custom graph)"),
+    "custom": ("adjacency dictionaries (WeightedWordDiGraph.add_edge)", "power iteration over dictionaries"),
+    "float64": ("CSR arrays", "sparse matrix-vector power iteration"),
+    "float32": ("CSR arrays", "sparse matrix-vector power iteration"),
+}
+
+# Features of each term of the cost model, from the node count n and the edge count e
+COST_FEATURES: Dict[str, Callable[[int, int], Tuple[float, ...]]] = {
+    "custom": lambda n, e: (1, n, e, e * e),  # Build and both rankings (add_edge scans the edge list: quadratic)
+    "nx": lambda n, e: (1, n, e, e * e),  # Build, nx.pagerank, and TrustRank on a custom graph
+    "build_float64": lambda n, e: (1, n, e),  # The graph and its reverse
+    "build_float32": lambda n, e: (1, n, e),
+    "iteration_float64": lambda n, e: (1, n, e),  # One power iteration
+    "iteration_float32": lambda n, e: (1, n, e),
+    "finalize": lambda n, e: (1, n),  # Score dictionary and sorting of one ranking
+}
+
+# Coefficients (seconds) of the cost model, fitted by calibrate_cost_model on 64-bit CPython 3.11
+# and a single core (graphs of 41-67k nodes and 500-200k edges). "iterations" is the mean number of
+# power iterations per ranking, "dispatch" the overhead of one thread block per iteration.
+# Run `main.py --calibrate-planner` to fit them on the host.
+DEFAULT_COST_MODEL: Dict[str, any] = {
+    "custom": [0.0, 1.8e-04, 0.0, 4.3e-08],
+    "nx": [0.0, 3.3e-05, 2.2e-05, 1.6e-08],
+    "build_float64": [0.0, 2.0e-06, 2.1e-06],
+    "build_float32": [0.0, 6.1e-06, 1.2e-06],
+    "iteration_float64": [2.7e-05, 1.3e-08, 1.0e-09],
+    "iteration_float32": [9.4e-06, 1.3e-08, 1.6e-09],
+    "finalize": [0.0, 9.4e-07],
+    "iterations": 7.9,
+    "dispatch": 1.6e-05,
+}
+
+
+def get_cpu_count() -> int:
+    """
+    Number of CPUs this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_available_memory() -> Optional[int]:
+    """
+    Memory available to new allocations (in bytes), or None if unknown.
+    """
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def inspect_graph(weighted_edges: List[Tuple[str, str, int]]) -> Dict[str, any]:
+    """
+    Statistics of a weighted edge list used to plan its ranking: node and edge counts, fraction of
+    dangling nodes (without outgoing edges), weakly connected components, and the CPUs and memory
+    available on the host.
+    """
+    node_index: Dict[str, int] = dict()
+    for node1, node2, _ in weighted_edges:
+        node_index.setdefault(node1, len(node_index))
+        node_index.setdefault(node2, len(node_index))
+
+    node_count = len(node_index)
+    edge_count = len(weighted_edges)
+    sources = np.fromiter((node_index[edge[0]] for edge in weighted_edges), dtype=np.int64, count=edge_count)
+    targets = np.fromiter((node_index[edge[1]] for edge in weighted_edges), dtype=np.int64, count=edge_count)
+
+    components = 0
+    largest_component = 0
+    if node_count > 0:
+        adjacency = sp.csr_matrix((np.ones(edge_count, dtype=np.int8), (sources, targets)), shape=(node_count, node_count))
+        components, labels = connected_components(adjacency, directed=True, connection="weak")
+        largest_component = int(np.bincount(labels).max())
+
+    return {
+        "nodes": node_count,
+        "edges": edge_count,
+        "dangling_fraction": 1 - len(np.unique(sources)) / node_count if node_count > 0 else 0.0,
+        "components": int(components),
+        "largest_component_fraction": largest_component / node_count if node_count > 0 else 0.0,
+        "cpus": get_cpu_count(),
+        "available_memory_bytes": get_available_memory(),
+    }
+
+
+def predict_term(cost_model: Dict[str, any], term: str, node_count: int, edge_count: int) -> float:
+    return float(np.dot(cost_model[term], COST_FEATURES[term](node_count, edge_count)))
+
+
+def predict_cost(cost_model: Dict[str, any], backend: str, node_count: int, edge_count: int, workers: int = 1, cpus: int = 1, max_iter: int = 200, trust_rank_max_iter: int = 200) -> float:
+    """
+    Predicted time (in seconds) of building the graph and running both rankings (inverse PageRank
+    and TrustRank) with a backend and number of worker threads.
+    """
+    if backend in ("nx", "custom"):
+        return predict_term(cost_model, backend, node_count, edge_count)
+
+    cost = predict_term(cost_model, f"build_{backend}", node_count, edge_count)
+    cost += 2 * predict_term(cost_model, "finalize", node_count, edge_count)
+
+    iterations = min(cost_model["iterations"], max_iter) + min(cost_model["iterations"], trust_rank_max_iter)
+    iteration = predict_term(cost_model, f"iteration_{backend}", node_count, edge_count)
+    if workers > 1:
+        # Threads beyond the available CPUs only add their dispatch overhead
+        iteration = iteration / min(workers, cpus) + cost_model["dispatch"] * workers
+    return cost + iterations * iteration
+
+
+def get_worker_counts(cpus: int, max_workers: Optional[int] = None) -> List[int]:
+    """
+    Worker counts to consider: 1 and the powers of 2 up to the number of CPUs (and max_workers).
+    Threads need the GIL-free matrix-vector product of m_graph_sparse.
+    """
+    limit = min(cpus, max_workers) if max_workers is not None else cpus
+    if m_graph_sparse.csr_matvec is None:
+        return [1]
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= limit:
+        worker_counts.append(worker_counts[-1] * 2)
+    return worker_counts
+
+
+def plan_ranking(stats: Dict[str, any], cost_model: Optional[Dict[str, any]] = None, max_iter: int = 200, trust_rank_max_iter: int = 200, memory_limit_bytes: Optional[int] = None, backends: Iterable[str] = BACKENDS, max_workers: Optional[int] = None) -> Dict[str, any]:
+    """
+    Choose the backend (and so the construction path and solver, see BACKEND_PATHS) and the number
+    of worker threads with the lowest predicted time for a graph.
+
+    Candidates whose estimated peak memory (m_memory.estimate_peak_memory) exceeds the memory
+    limit or the available memory are excluded. If none fits, the most compact backend is planned
+    (the memory stage then prunes the graph or refuses it, see m_memory.plan_memory).
+
+    Parameters
+    ----------
+    stats : Dict[str, any]
+        The statistics of the graph (see inspect_graph).
+    cost_model : Dict[str, any], optional
+        The cost model (see calibrate_cost_model). Defaults to DEFAULT_COST_MODEL.
+    max_iter, trust_rank_max_iter : int, optional
+        The maximum numbers of iterations of the rankings. Default to 200.
+    memory_limit_bytes : int, optional
+        The memory budget. Defaults to None (only the available memory).
+    backends : Iterable[str], optional
+        The backends to consider. Defaults to BACKENDS.
+    max_workers : int, optional
+        The maximum number of worker threads. Defaults to None (the number of CPUs).
+
+    Returns
+    -------
+    Dict[str, any]
+        The plan: backend, construction, solver, workers, predicted_s, estimated_bytes, and every
+        candidate considered (fastest first).
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    node_count, edge_count, cpus = stats["nodes"], stats["edges"], stats["cpus"]
+
+    limits = [limit for limit in (memory_limit_bytes, stats.get("available_memory_bytes")) if limit is not None]
+    memory_limit = min(limits) if len(limits) > 0 else None
+
+    candidates = []
+    for backend in backends:
+        estimated_bytes = m_memory.estimate_peak_memory(node_count, edge_count, backend)
+        for workers in (get_worker_counts(cpus, max_workers) if backend in SPARSE_BACKENDS else [1]):
+            candidates.append({
+                "backend": backend,
+                "workers": workers,
+                "predicted_s": predict_cost(cost_model, backend, node_count, edge_count, workers, cpus, max_iter, trust_rank_max_iter),
+                "estimated_bytes": estimated_bytes,
+                "fits": memory_limit is None or estimated_bytes <= memory_limit,
+            })
+    candidates.sort(key=lambda candidate: candidate["predicted_s"])
+
+    # float32 scores are less precise, so they are only planned when float64 does not fit
+    fitting = [candidate for candidate in candidates if candidate["fits"]]
+    fitting = [candidate for candidate in fitting if candidate["backend"] != "float32"] or fitting
+    if len(fitting) > 0:
+        chosen = fitting[0]
+    else:
+        chosen = min(candidates, key=lambda candidate: (candidate["estimated_bytes"], candidate["predicted_s"]))
+
+    construction, solver = BACKEND_PATHS[chosen["backend"]]
+    return {
+        "backend": chosen["backend"],
+        "construction": construction,
+        "solver": solver,
+        "workers": chosen["workers"],
+        "predicted_s": chosen["predicted_s"],
+        "estimated_bytes": chosen["estimated_bytes"],
+        "candidates": candidates,
+    }
+
+
+def load_cost_model(path: str) -> Dict[str, any]:
+    """
+    Load a cost model written by calibrate_cost_model (DEFAULT_COST_MODEL if the file does not
+    exist). Terms missing from the file keep their default coefficients.
+    """
+    cost_model = dict(DEFAULT_COST_MODEL)
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            cost_model.update(orjson.loads(f.read()))
+    return cost_model
+
+
+def save_cost_model(cost_model: Dict[str, any], path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(cost_model, option=orjson.OPT_INDENT_2))
+
+
+def append_log(path: str, record: Dict[str, any]) -> None:
+    """
+    Append a plan and its predicted and actual times to a JSON Lines log.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+
+
+def format_plan(plan: Dict[str, any], top_n: int = 3) -> str:
+    lines = [f"  plan: {plan['backend']} backend ({plan['construction']}, {plan['solver']}), {plan['workers']} worker(s)"]
+    for candidate in plan["candidates"][:top_n]:
+        memory = "" if candidate["fits"] else " (over memory)"
+        lines.append(f"    {candidate['predicted_s'] * 1e3:>10.2f} ms  {candidate['backend']}, {candidate['workers']} worker(s){memory}")
+    return "\n".join(lines)
+
+
+def synthetic_word_edges(node_count: int, edge_count: int, seed: int = 0) -> List[Tuple[str, str, int]]:
+    """
+    Random weighted edges with the skewed degrees of a word graph (node popularity following a
+    power law), used to calibrate the cost model.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, node_count + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    pairs: Dict[Tuple[int, int], None] = dict()
+    while len(pairs) < edge_count:
+        sources = rng.choice(node_count, size=edge_count, p=popularity)
+        targets = rng.choice(node_count, size=edge_count, p=popularity)
+        pairs.update(dict.fromkeys(zip(sources.tolist(), targets.tolist())))
+
+    weights = rng.geometric(0.5, size=edge_count).tolist()
+    return [(f"w{source}", f"w{target}", weight) for (source, target), weight in zip(list(pairs)[:edge_count], weights)]
+
+
+def _best_time(function: Callable[[], any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = timer()
+        function()
+        best = min(best, timer() - start)
+    return best
+
+
+def _rank_custom(word_graph: m_graph_custom.WeightedWordDiGraph, bias_amount: int) -> None:
+    sorted_inverse_pagerank_scores = m_graph_custom.get_sorted_rank_score(word_graph.get_inverse_pagerank())
+    m_graph_custom.get_sorted_rank_score(word_graph.get_trust_rank(bias_amount, sorted_inverse_pagerank_scores))
+
+
+def _rank_nx(weighted_edges: List[Tuple[str, str, int]], bias_amount: int) -> None:
+    word_graph = m_graph_nx.generate_graph(weighted_edges, weighted=True)
+    sorted_inverse_pagerank_scores = m_graph_custom.get_sorted_rank_score(m_graph_nx.get_inverse_pagerank(word_graph))
+    custom_graph = m_graph_custom.WeightedWordDiGraph([(n1, n2, p["weight"]) for n1, n2, p in word_graph.edges(data=True)])
+    m_graph_custom.get_sorted_rank_score(custom_graph.get_trust_rank(bias_amount, sorted_inverse_pagerank_scores))
+
+
+def fit_term(term: str, samples: List[Tuple[int, int, float]]) -> List[float]:
+    """
+    Non-negative least squares fit of the coefficients of a cost term on (nodes, edges, seconds) samples.
+    """
+    features = np.array([COST_FEATURES[term](node_count, edge_count) for node_count, edge_count, _ in samples], dtype=np.float64)
+    seconds = np.array([sample[2] for sample in samples], dtype=np.float64)
+
+    # Features range from 1 to e^2, so columns are scaled for the fit
+    scale = features.max(axis=0)
+    scale[scale == 0] = 1
+    coefficients, _ = nnls(features / scale, seconds)
+    return (coefficients / scale).tolist()
+
+
+def calibrate_cost_model(
+        sparse_sizes: Iterable[int] = (2000, 10000, 50000, 200000),
+        dict_sizes: Iterable[int] = (500, 1500, 3000, 6000),
+        edges_per_node: Iterable[int] = (3, 12),
+        bias_amount: int = 1,
+        repeat: int = 2,
+        logging: bool = False
+    ) -> Dict[str, any]:
+    """
+    Fit the cost model on this host by benchmarking every backend on synthetic word graphs.
+
+    The dictionary backends are quadratic in the number of edges, so they are benchmarked on
+    smaller graphs (dict_sizes edges) than the sparse backends (sparse_sizes edges). Every size
+    is run with several edge to node ratios, so the node and edge terms can be told apart.
+    """
+    samples: Dict[str, List[Tuple[int, int, float]]] = {term: [] for term in COST_FEATURES}
+    iteration_counts = []
+
+    def graphs(sizes: Iterable[int]) -> Iterable[Tuple[int, int, List[Tuple[str, str, int]]]]:
+        for edge_count in sizes:
+            for ratio in edges_per_node:
+                node_count = max(edge_count // ratio, 2)
+                yield node_count, edge_count, synthetic_word_edges(node_count, edge_count)
+
+    for node_count, edge_count, weighted_edges in graphs(dict_sizes):
+        samples["custom"].append((node_count, edge_count, _best_time(lambda: _rank_custom(m_graph_custom.WeightedWordDiGraph(weighted_edges), bias_amount), repeat)))
+        samples["nx"].append((node_count, edge_count, _best_time(lambda: _rank_nx(weighted_edges, bias_amount), repeat)))
+        if logging:
+            print(f"  dictionary backends: {node_count} nodes, {edge_count} edges")
+
+    largest_graph = None
+    for node_count, edge_count, weighted_edges in graphs(sparse_sizes):
+        for dtype in SPARSE_BACKENDS:
+            samples[f"build_{dtype}"].append((node_count, edge_count, _best_time(lambda: m_graph_sparse.SparseWordGraph(weighted_edges, dtype=dtype), repeat)))
+
+            graph = m_graph_sparse.SparseWordGraph(weighted_edges, dtype=dtype).reversed_graph
+            start = timer()
+            scores, iterations, _ = graph.markov_chain()
+            samples[f"iteration_{dtype}"].append((node_count, edge_count, (timer() - start) / max(iterations, 1)))
+            iteration_counts.append(iterations)
+
+        samples["finalize"].append((node_count, edge_count, _best_time(lambda: m_graph_sparse.get_sorted_rank_score(graph.node_names, scores), repeat)))
+        largest_graph = graph
+        if logging:
+            print(f"  sparse backends: {node_count} nodes, {edge_count} edges ({iterations} iterations)")
+
+    cost_model = {term: fit_term(term, term_samples) for term, term_samples in samples.items()}
+    cost_model["iterations"] = float(np.mean(iteration_counts))
+
+    # Thread dispatch overhead: time of 2 workers beyond the ideal split of the single thread time
+    single = _best_time(lambda: largest_graph.markov_chain(epsilon=0, max_iter=20), repeat) / 20
+    double = _best_time(lambda: largest_graph.markov_chain(epsilon=0, max_iter=20, workers=2), repeat) / 20
+    cost_model["dispatch"] = max(double - single / min(2, get_cpu_count()), 0.0) / 2
+    return cost_model
@@ -1,4 +1,5 @@
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, FrozenSet
+from functools import lru_cache
 import string 
 import re
 import nltk # type: ignore
@@ -73,9 +74,14 @@ def remove_url(text: str) -> str:
     return text
 
 
+@lru_cache(maxsize=None)
+def get_stopwords() -> FrozenSet[str]:
+    # Loaded once per process and kept resident
+    return frozenset(stopwords.words("english")).union(ADDITIONAL_STOPWORDS)
+
+
 def remove_stopwords(words: List[str]) -> List[str]:
-    stop_words = set(stopwords.words("english"))
-    stop_words = stop_words.union(ADDITIONAL_STOPWORDS)
+    stop_words = get_stopwords()
     return [word for word in words if word.lower() not in stop_words]
 
 
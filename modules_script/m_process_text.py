@@ -1,4 +1,4 @@
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Union, Optional
 import operator
 
 from helper_script.json_helper import *
@@ -19,6 +19,29 @@ def pair_word_to_bigram(preprocessed_words: List[str]) -> List[Tuple[str, str]]:
     return [(f"{preprocessed_words[i]} {preprocessed_words[i + 1]}", f"{preprocessed_words[i+1]} {preprocessed_words[i + 2]}") for i in range(len(preprocessed_words)-2) ]
     # return  [f"{preprocessed_words[i]} {preprocessed_words[i + 1]}" for i in range(len(preprocessed_words)-1) ]
 
+def record_to_bigrams(data: Union[Dict[str, any], str], target_key: Optional[List[str]], throw_key_error: bool = False) -> Optional[List[Tuple[str, str]]]:
+    """Extract the target text of a single record and convert it to bigrams
+
+    Args:
+        data (dict | str): A single record of the dataset
+        target_key (list): Keys to the text inside the record (None if the record is the text itself)
+        throw_key_error (bool): Raise KeyError if the target key is missing
+
+    Returns:
+        list: List of bigrams, or None if the record has no target text
+    """
+    text_part = get_from_nested_key(data, target_key, throw_key_error=throw_key_error) if target_key is not None else data
+
+    if text_part is None:
+        return None
+
+    # preprocess the text to get a list of words
+    words = preprocess_text(text_part)
+
+    # create bigrams from the preprocessed words
+    return pair_word_to_bigram(words)
+
+
 # TODO
 def json_to_bigrams(all_data: List[Dict[str, any]], target_key: List[str], throw_key_error: bool = False) -> List[List[Tuple[str, str]]]:
 
@@ -26,17 +49,11 @@ def json_to_bigrams(all_data: List[Dict[str, any]], target_key: List[str], throw
 
     # loop through each tweet in the list
     for data in all_data:
-        text_part = get_from_nested_key(data, target_key, throw_key_error=throw_key_error) if target_key is not None else data
+        bigram_words = record_to_bigrams(data, target_key, throw_key_error=throw_key_error)
 
-        if text_part is None:
+        if bigram_words is None:
             continue
 
-        # preprocess the text to get a list of words
-        words = preprocess_text(text_part)
-
-        # create bigrams from the preprocessed words
-        bigram_words = pair_word_to_bigram(words)
-        
         # add the bigrams to the result list
         all_bigrams.append(bigram_words)
 
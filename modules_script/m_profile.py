@@ -0,0 +1,142 @@
+from typing import Dict, Tuple, List, Iterator, Optional
+from contextlib import contextmanager, nullcontext
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+
+import orjson
+
+
+def format_function(function: Tuple[str, int, str]) -> str:
+    """
+    Short name of a pstats function key, e.g. "m_graph_custom.py:26(add_edge)" or "<method 'count' of 'list' objects>".
+    """
+    file_name, line_number, function_name = function
+    if file_name == "~":  # Built-in
+        return function_name
+    return f"{os.path.basename(file_name)}:{line_number}({function_name})"
+
+
+def get_hot_functions(profile: cProfile.Profile, stage_seconds: float, top_n: int = 10) -> List[Dict[str, any]]:
+    """
+    Return the `top_n` functions with the most self time (excluding their callees), with their
+    share of the stage wall time.
+    """
+    stats = pstats.Stats(profile).stats
+    hot_functions = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+    return [
+        {
+            "function": format_function(function),
+            "calls": calls,
+            "self_s": self_time,
+            "cumulative_s": cumulative_time,
+            "share": self_time / stage_seconds if stage_seconds > 0 else 0.0,
+        }
+        for function, (_, calls, self_time, cumulative_time, _) in hot_functions
+    ]
+
+
+class StageProfiler():
+    """
+    Deep profiling of the stages of a run (--profile).
+
+    Each stage runs under cProfile and tracemalloc. Written to `{output_dir}/`:
+    - `{stage}.pstats`: the cProfile statistics (e.g. `python -m pstats`, snakeviz)
+    - `{stage}.allocations.txt`: the top source lines by memory allocated during the stage and still alive at its end
+    - `summary.json`: wall time, peak traced memory and hottest functions of every stage
+
+    Use `NULL_PROFILER` when profiling is off: its stages are a shared no-op context, so the
+    profiled code runs unchanged.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory of the reports.
+    top_n : int, optional
+        Number of hot functions and allocation lines reported per stage. Defaults to 10.
+    trace_frames : int, optional
+        Number of frames stored per allocation traceback. Defaults to 1 (the allocating line).
+    """
+
+    def __init__(self, output_dir: str, top_n: int = 10, trace_frames: int = 1):
+        self.output_dir = str(output_dir)
+        self.top_n = top_n
+        self.trace_frames = trace_frames
+        self.stages: List[Dict[str, any]] = []
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Only allocations of this stage are traced, so the peak and the snapshot are the stage's own
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(self.trace_frames)
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stage_seconds = time.perf_counter() - start
+
+            peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+            snapshot = tracemalloc.take_snapshot()
+            if not was_tracing:
+                tracemalloc.stop()
+
+            profile.dump_stats(os.path.join(self.output_dir, f"{stage}.pstats"))
+            self._write_allocations(stage, snapshot)
+            self.stages.append({
+                "stage": stage,
+                "wall_s": stage_seconds,
+                "peak_traced_bytes": peak_memory,
+                "hot_functions": get_hot_functions(profile, stage_seconds, self.top_n),
+            })
+
+    def _write_allocations(self, stage: str, snapshot: tracemalloc.Snapshot) -> None:
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        allocations = snapshot.statistics("lineno")
+        total_size = sum(allocation.size for allocation in allocations)
+
+        lines = [f"Top {self.top_n} of {len(allocations)} allocating lines ({total_size / 2**20:.2f} MB alive at the end of {stage})", ""]
+        for i, allocation in enumerate(allocations[:self.top_n], 1):
+            frame = allocation.traceback[0]
+            lines.append(f"{i:>3}. {allocation.size / 2**10:>12.1f} KB {allocation.count:>10} blocks  {frame.filename}:{frame.lineno}")
+        with open(os.path.join(self.output_dir, f"{stage}.allocations.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def write_summary(self) -> None:
+        with open(os.path.join(self.output_dir, "summary.json"), "wb") as f:
+            f.write(orjson.dumps(self.stages, option=orjson.OPT_INDENT_2))
+
+    def format_summary(self, top_n: Optional[int] = None) -> str:
+        """
+        Ranked summary of the hottest functions of every stage, with their share of the stage time.
+        """
+        lines = []
+        for stage in self.stages:
+            lines.append(f"  {stage['stage']}: {stage['wall_s'] * 1e3:.2f} ms, peak traced memory: {stage['peak_traced_bytes'] / 2**20:.2f} MB")
+            for function in stage["hot_functions"][:top_n]:
+                lines.append(f"    {function['share']:>6.1%} {function['self_s'] * 1e3:>10.2f} ms {function['calls']:>10} calls  {function['function']}")
+        return "\n".join(lines)
+
+
+class NullProfiler():
+    """
+    Profiler used when profiling is off: stages are a no-op.
+    """
+
+    _null_stage = nullcontext()
+
+    def stage(self, stage: str) -> nullcontext:
+        return self._null_stage
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,149 @@
+from typing import Dict, Tuple, List, Callable, Optional
+from timeit import default_timer as timer
+
+
+def get_node_frequency(weighted_edges: List[Tuple[str, str, int]]) -> Dict[str, int]:
+    """
+    Approximate the number of occurrences of each node as the larger of its total incoming and
+    total outgoing edge weight (a node in the middle of a text has both).
+    """
+    in_weight: Dict[str, int] = dict()
+    out_weight: Dict[str, int] = dict()
+    for node1, node2, weight in weighted_edges:
+        out_weight[node1] = out_weight.get(node1, 0) + weight
+        in_weight[node2] = in_weight.get(node2, 0) + weight
+
+    nodes = in_weight.keys() | out_weight.keys()
+    return {node: max(in_weight.get(node, 0), out_weight.get(node, 0)) for node in nodes}
+
+
+def k_core_edges(weighted_edges: List[Tuple[str, str, int]], k: int) -> List[Tuple[str, str, int]]:
+    """
+    Keep only the edges of the k-core: repeatedly remove nodes with fewer than k distinct neighbors
+    (ignoring edge direction and self-loops).
+    """
+    neighbors: Dict[str, set] = dict()
+    for node1, node2, _ in weighted_edges:
+        if node1 == node2:
+            continue
+        neighbors.setdefault(node1, set()).add(node2)
+        neighbors.setdefault(node2, set()).add(node1)
+
+    removing = [node for node, adjacent in neighbors.items() if len(adjacent) < k]
+    removed = set(removing)
+    while removing:
+        node = removing.pop()
+        for neighbor in neighbors[node]:
+            if neighbor in removed:
+                continue
+            neighbors[neighbor].discard(node)
+            if len(neighbors[neighbor]) < k:
+                removed.add(neighbor)
+                removing.append(neighbor)
+
+    return [edge for edge in weighted_edges if edge[0] in neighbors and edge[1] in neighbors and edge[0] not in removed and edge[1] not in removed]
+
+
+def prune_weighted_edges(
+        weighted_edges: List[Tuple[str, str, int]],
+        min_edge_weight: int = 1,
+        min_node_frequency: int = 1,
+        max_vocabulary: Optional[int] = None,
+        k_core: int = 0
+    ) -> Tuple[List[Tuple[str, str, int]], Dict[str, any]]:
+    """
+    Prune a weighted edge list before graph construction.
+
+    Filters are applied in order: minimum edge weight, minimum node frequency, vocabulary cap
+    (most frequent nodes) and k-core degree filtering.
+
+    Parameters
+    ----------
+    weighted_edges : List[Tuple[str, str, int]]
+        The weighted edges (node1, node2, weight).
+    min_edge_weight : int, optional
+        Remove edges with a lower weight. Defaults to 1 (keep all).
+    min_node_frequency : int, optional
+        Remove edges touching a node with a lower frequency (see get_node_frequency). Defaults to 1 (keep all).
+    max_vocabulary : int, optional
+        Keep only the edges between the `max_vocabulary` most frequent nodes. Defaults to None (no cap).
+    k_core : int, optional
+        Keep only the k-core of the graph (see k_core_edges). Defaults to 0 (keep all).
+
+    Returns
+    -------
+    Tuple[List[Tuple[str, str, int]], Dict[str, any]]
+        The pruned edges (in their original order) and a report of the node/edge reduction.
+    """
+    original_nodes = len(get_node_frequency(weighted_edges))
+    original_edges = len(weighted_edges)
+
+    pruned_edges = [edge for edge in weighted_edges if edge[2] >= min_edge_weight]
+
+    if min_node_frequency > 1 or max_vocabulary is not None:
+        node_frequency = get_node_frequency(pruned_edges)
+        kept_nodes = {node for node, frequency in node_frequency.items() if frequency >= min_node_frequency}
+
+        if max_vocabulary is not None and len(kept_nodes) > max_vocabulary:
+            kept_nodes = set(sorted(kept_nodes, key=lambda node: (-node_frequency[node], node))[:max_vocabulary])
+
+        pruned_edges = [edge for edge in pruned_edges if edge[0] in kept_nodes and edge[1] in kept_nodes]
+
+    if k_core > 0:
+        pruned_edges = k_core_edges(pruned_edges, k_core)
+
+    pruned_nodes = len(get_node_frequency(pruned_edges))
+    report = {
+        "nodes_before": original_nodes,
+        "nodes_after": pruned_nodes,
+        "edges_before": original_edges,
+        "edges_after": len(pruned_edges),
+        "node_reduction": (1 - pruned_nodes / original_nodes) if original_nodes > 0 else 0.0,
+        "edge_reduction": (1 - len(pruned_edges) / original_edges) if original_edges > 0 else 0.0,
+    }
+    return pruned_edges, report
+
+
+def evaluate_pruning(
+        weighted_edges: List[Tuple[str, str, int]],
+        pruned_edges: List[Tuple[str, str, int]],
+        rank_function: Callable[[List[Tuple[str, str, int]]], List[Tuple[str, float]]],
+        top_k: int = 20
+    ) -> Dict[str, float]:
+    """
+    Compare the ranking of the pruned graph with the ranking of the unpruned graph.
+
+    Parameters
+    ----------
+    weighted_edges : List[Tuple[str, str, int]]
+        The unpruned weighted edges.
+    pruned_edges : List[Tuple[str, str, int]]
+        The pruned weighted edges.
+    rank_function : Callable[[List[Tuple[str, str, int]]], List[Tuple[str, float]]]
+        Builds the graph of an edge list and returns its sorted scores.
+    top_k : int, optional
+        Number of top nodes to compare. Defaults to 20.
+
+    Returns
+    -------
+    Dict[str, float]
+        Ranking time of both graphs (ms), the speedup, and the overlap of their top-k nodes (0 to 1).
+    """
+    start = timer()
+    unpruned_scores = rank_function(weighted_edges)
+    unpruned_time = timer() - start
+
+    start = timer()
+    pruned_scores = rank_function(pruned_edges)
+    pruned_time = timer() - start
+
+    unpruned_top = {node for node, _ in unpruned_scores[:top_k]}
+    pruned_top = {node for node, _ in pruned_scores[:top_k]}
+
+    return {
+        "unpruned_ms": unpruned_time * 1e3,
+        "pruned_ms": pruned_time * 1e3,
+        "speedup": unpruned_time / pruned_time if pruned_time > 0 else float("inf"),
+        "top_k": top_k,
+        "top_k_overlap": len(unpruned_top & pruned_top) / len(unpruned_top) if len(unpruned_top) > 0 else 1.0,
+    }
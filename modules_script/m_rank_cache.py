@@ -0,0 +1,142 @@
+from typing import Dict, Tuple, List, Optional
+import hashlib
+import os
+import shutil
+import time
+
+import orjson
+
+from helper_script.json_helper import read_json
+
+
+def fingerprint_weighted_edges(weighted_edges: List[Tuple[str, str, int]]) -> str:
+    """
+    Order-independent fingerprint of a weighted edge list.
+
+    Every edge is hashed separately and the hashes are summed (mod 2^64), so the same edges in
+    any order give the same fingerprint. The edge count is included to tell apart lists whose
+    hash sums collide by accident.
+    """
+    total = 0
+    for node1, node2, weight in weighted_edges:
+        edge_hash = hashlib.blake2b(f"{node1}\x00{node2}\x00{weight}".encode("utf-8"), digest_size=8).digest()
+        total = (total + int.from_bytes(edge_hash, "little")) & 0xFFFFFFFFFFFFFFFF
+    return f"{total:016x}-{len(weighted_edges)}"
+
+
+def parameters_key(parameters: Dict[str, any]) -> str:
+    return hashlib.blake2b(orjson.dumps(parameters, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+
+
+class RankCache():
+    """
+    On-disk cache of ranking results, keyed by graph fingerprint and ranking parameters.
+
+    Layout: `{cache_dir}/{fingerprint}/{parameters key}.json`, each holding the parameters and the
+    sorted inverse PageRank and TrustRank scores. The least recently used entries are evicted
+    once the cache grows over `max_size_bytes`.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory of the cache.
+    max_size_bytes : int, optional
+        Maximum total size of the cache. Defaults to 256 MB.
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = str(cache_dir)
+        self.max_size_bytes = max_size_bytes
+
+    def _entry_path(self, fingerprint: str, parameters: Dict[str, any]) -> str:
+        return os.path.join(self.cache_dir, fingerprint, f"{parameters_key(parameters)}.json")
+
+    def get(self, fingerprint: str, parameters: Dict[str, any]) -> Optional[Dict[str, any]]:
+        """
+        Return the cached result of the exact same graph and parameters, or None.
+        """
+        path = self._entry_path(fingerprint, parameters)
+        if not os.path.exists(path):
+            return None
+
+        os.utime(path)  # Mark as recently used
+        return read_json(path)
+
+    def get_warm_start(self, fingerprint: str, backend: Optional[str] = None) -> Optional[Dict[str, any]]:
+        """
+        Return the most recently used cached result of the same graph (with other parameters), or None.
+        Its scores are a good starting point when only the parameters changed.
+        If `backend` is given, only results ranked with the same backend are considered.
+        """
+        entry_dir = os.path.join(self.cache_dir, fingerprint)
+        if not os.path.isdir(entry_dir):
+            return None
+
+        entries = [os.path.join(entry_dir, name) for name in os.listdir(entry_dir) if name.endswith(".json")]
+        for path in sorted(entries, key=os.path.getmtime, reverse=True):
+            entry = read_json(path)
+            if backend is None or entry["parameters"].get("backend") == backend:
+                return entry
+        return None
+
+    def put(self, fingerprint: str, parameters: Dict[str, any], sorted_inverse_pagerank_scores: List[Tuple[str, float]], sorted_trust_rank_scores: List[Tuple[str, float]]) -> None:
+        path = self._entry_path(fingerprint, parameters)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({
+                "parameters": parameters,
+                "created": time.time(),
+                "inverse_pagerank": sorted_inverse_pagerank_scores,
+                "trust_rank": sorted_trust_rank_scores,
+            }))
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def get_entries(self) -> List[Tuple[str, int, float]]:
+        """
+        Return (path, size, last used time) of every cached entry.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for fingerprint in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, fingerprint)
+            if not os.path.isdir(entry_dir):
+                continue
+            for name in os.listdir(entry_dir):
+                path = os.path.join(entry_dir, name)
+                if name.endswith(".json"):
+                    stat = os.stat(path)
+                    entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries until the cache fits in max_size_bytes. Returns the number of removed entries.
+        """
+        entries = sorted(self.get_entries(), key=lambda entry: entry[2])
+        total_size = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for path, size, _ in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            os.remove(path)
+            total_size -= size
+            removed += 1
+
+            entry_dir = os.path.dirname(path)
+            if len(os.listdir(entry_dir)) == 0:
+                os.rmdir(entry_dir)
+        return removed
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> None:
+        """
+        Remove the cached results of one graph, or the whole cache if fingerprint is None.
+        """
+        path = self.cache_dir if fingerprint is None else os.path.join(self.cache_dir, fingerprint)
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,335 @@
+from typing import Dict, Tuple, List, Union, Optional, Callable, NamedTuple
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import orjson
+
+from helper_script.json_helper import read_json
+from modules_script import m_preprocess_text
+
+
+HTTP_STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+ROUTES = ("/rank", "/metrics", "/health")
+
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+# ==== Worker side (runs in the process pool) ====
+
+class ServiceFunctions(NamedTuple):
+    """
+    The edge building, graph building and ranking of the batch mode, sent to the workers.
+    Must be module-level functions (picklable), e.g. those of main (see main.serve_main).
+    """
+    # Weighted bigrams of records, given key paths (None: the configured ones)
+    weighted_bigrams: Callable[[List[Union[Dict[str, any], str]], Optional[List[any]]], List[Tuple[str, str, int]]]
+    # Graph of weighted bigrams, with the configured (or planned) backend
+    build_graph: Callable[[List[Tuple[str, str, int]]], any]
+    # Sorted inverse PageRank and TrustRank scores of a graph, given the TrustRank bias amount
+    rank_graph: Callable[[any, int], Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]]
+
+
+# Graphs of the datasets resident in each worker, by (path, modification time), least recently used first
+_resident_graphs: "OrderedDict[Tuple[str, float], any]" = OrderedDict()
+
+
+def warm_up_worker() -> None:
+    """
+    Process pool initializer: load the stopwords once so they stay resident in every worker.
+    """
+    m_preprocess_text.get_stopwords()
+
+
+def rank_graph(functions: ServiceFunctions, word_graph: any, bias_amount: int, top_k: Optional[int] = None) -> Dict[str, any]:
+    """
+    Calculate the top-k inverse PageRank and TrustRank scores of a graph.
+    """
+    start = time.perf_counter()
+    sorted_inverse_pagerank_scores, sorted_trust_rank_scores = functions.rank_graph(word_graph, bias_amount)
+
+    return {
+        "nodes": len(word_graph.nodes),
+        "edges": len(word_graph.edges),
+        "inverse_pagerank": sorted_inverse_pagerank_scores[:top_k],
+        "trust_rank": sorted_trust_rank_scores[:top_k],
+        "compute_ms": (time.perf_counter() - start) * 1e3,
+    }
+
+
+def rank_dataset(functions: ServiceFunctions, data_path: str, modified: float, cache_size: int, bias_amount: int, top_k: Optional[int] = None) -> Dict[str, any]:
+    """
+    Rank a dataset file. Its graph is built on first use and stays resident in the worker (up to
+    `cache_size` datasets), so later requests only run the rankings. The file is read in the
+    worker, so the event loop is not blocked by the read and the records are not sent to the worker.
+    """
+    key = (data_path, modified)
+    word_graph = _resident_graphs.get(key)
+    if word_graph is None:
+        word_graph = functions.build_graph(functions.weighted_bigrams(read_json(data_path), None))
+        _resident_graphs[key] = word_graph
+        while len(_resident_graphs) > cache_size:
+            _resident_graphs.popitem(last=False)
+    else:
+        _resident_graphs.move_to_end(key)
+
+    return rank_graph(functions, word_graph, bias_amount, top_k)
+
+
+def rank_records(functions: ServiceFunctions, records: List[Union[Dict[str, any], str]], key_paths: Optional[List[any]], bias_amount: int, top_k: Optional[int] = None) -> Dict[str, any]:
+    word_graph = functions.build_graph(functions.weighted_bigrams(records, key_paths))
+    return rank_graph(functions, word_graph, bias_amount, top_k)
+
+
+# ==== Server side ====
+
+class LatencyMetrics():
+    """
+    Request counters and latency percentiles (in ms) over the most recent requests of each route.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.count: Dict[str, int] = dict()
+        self.errors: Dict[str, int] = dict()
+        self.latencies: Dict[str, deque] = dict()
+
+    def record(self, route: str, latency_ms: float, error: bool = False) -> None:
+        self.count[route] = self.count.get(route, 0) + 1
+        if error:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        self.latencies.setdefault(route, deque(maxlen=self.window)).append(latency_ms)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = dict()
+        for route, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            result[route] = {
+                "count": self.count[route],
+                "errors": self.errors.get(route, 0),
+                "p50_ms": ordered[len(ordered) // 2],
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max_ms": ordered[-1],
+            }
+        return result
+
+
+class RankingService():
+    """
+    Long-running local ranking service.
+
+    Serves a minimal HTTP/1.1 JSON API over TCP (localhost) or a Unix socket. Stopwords and the worker
+    processes stay warm between requests, and ranking runs in a process pool. The graphs of datasets
+    stay resident in the workers (by file modification time), so a repeated dataset request only
+    runs the rankings.
+
+    Routes
+    ------
+    POST /rank
+        Body: {"documents": [...]} or {"dataset": "name.json"}, with optional "top_k", "bias_amount"
+        and "target_key" (defaults to the configured target key(s) for datasets and dictionary documents).
+        Returns the top-k inverse PageRank and TrustRank scores.
+    GET /metrics
+        Per-route request counts and latency percentiles.
+    GET /health
+        Liveness check.
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory of the datasets.
+    functions : ServiceFunctions
+        The edge building, graph building and ranking of the batch mode (see main.serve_main), so a
+        dataset ranks the same way as in the batch mode.
+    bias_amount : int
+        Default TrustRank bias amount of the requests.
+    dataset_cache_size : int, optional
+        Number of dataset graphs resident in each worker. Defaults to 16.
+    """
+
+    def __init__(
+            self,
+            data_dir: str,
+            functions: ServiceFunctions,
+            bias_amount: int,
+            top_k: int = 20,
+            workers: Optional[int] = None,
+            max_concurrency: int = 4,
+            max_pending: int = 64,
+            dataset_cache_size: int = 16
+        ):
+        self.data_dir = data_dir
+        self.functions = functions
+        self.bias_amount = bias_amount
+        self.top_k = top_k
+
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.dataset_cache_size = dataset_cache_size
+
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.metrics = LatencyMetrics()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None) -> asyncio.AbstractServer:
+        warm_up_worker()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up_worker)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Fork the workers before accepting connections, otherwise a worker started for a request
+        # inherits the open client sockets and keeps them open after the response
+        await asyncio.gather(*[self.run_in_pool(os.getpid) for _ in range(self.workers)])
+
+        if unix_socket is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+        return await asyncio.start_server(self.handle_connection, host=host, port=port)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None) -> None:
+        server = await self.start(host, port, unix_socket)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    async def run_in_pool(self, func, *args) -> any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def get_dataset_path(self, dataset: str) -> str:
+        # Only plain file names inside the dataset directory are allowed
+        if not isinstance(dataset, str) or os.path.basename(dataset) != dataset or not dataset.endswith(".json"):
+            raise ValueError(f"Invalid dataset name: {dataset}")
+
+        data_path = os.path.join(self.data_dir, dataset)
+        if not os.path.isfile(data_path):
+            raise FileNotFoundError(f"Dataset {dataset} not found")
+        return data_path
+
+    async def rank(self, request: Dict[str, any]) -> Dict[str, any]:
+        top_k = request.get("top_k", self.top_k)
+        bias_amount = request.get("bias_amount", self.bias_amount)
+
+        if "dataset" in request:
+            data_path = self.get_dataset_path(request["dataset"])
+            return await self.run_in_pool(rank_dataset, self.functions, data_path, os.path.getmtime(data_path), self.dataset_cache_size, bias_amount, top_k)
+
+        if "documents" in request:
+            documents = request["documents"]
+            if not isinstance(documents, list):
+                raise ValueError("'documents' must be a list")
+            # A target key given in the request replaces the configured ones, plain string documents are the texts
+            if "target_key" in request:
+                key_paths = [request["target_key"]] if request["target_key"] else []
+            else:
+                key_paths = None if any(isinstance(document, dict) for document in documents) else []
+            return await self.run_in_pool(rank_records, self.functions, documents, key_paths, bias_amount, top_k)
+
+        raise ValueError("Request must contain either 'documents' or 'dataset'")
+
+    async def handle_request(self, method: str, path: str, body: bytes) -> Tuple[int, any]:
+        if path == "/health":
+            return 200, {"status": "ok"}
+
+        if path == "/metrics":
+            return 200, {
+                "in_flight": self.pending,
+                "max_concurrency": self.max_concurrency,
+                "routes": self.metrics.summary(),
+            }
+
+        if path != "/rank":
+            return 404, {"error": f"Unknown route {path}"}
+
+        if method != "POST":
+            return 405, {"error": "Use POST for /rank"}
+
+        request = orjson.loads(body)
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object")
+
+        # Concurrency limit: at most max_concurrency rankings at once, and max_pending waiting requests
+        if self.pending >= self.max_concurrency + self.max_pending:
+            return 503, {"error": "Too many pending requests"}
+
+        self.pending += 1
+        try:
+            queued_at = time.perf_counter()
+            async with self.semaphore:
+                queue_ms = (time.perf_counter() - queued_at) * 1e3
+                result = await self.rank(request)
+            result["queue_ms"] = queue_ms
+            return 200, result
+        finally:
+            self.pending -= 1
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        start = time.perf_counter()
+        route = "invalid"
+        status = 500
+
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) < 2:
+                status, response = 400, {"error": "Malformed request line"}
+            else:
+                method, route = request_line[0].upper(), request_line[1].split("?")[0]
+
+                headers = dict()
+                while True:
+                    line = (await reader.readline()).decode("latin-1").strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                content_length = int(headers.get("content-length", 0))
+                if content_length > MAX_BODY_SIZE:
+                    status, response = 413, {"error": "Request body too large"}
+                else:
+                    body = await reader.readexactly(content_length) if content_length > 0 else b""
+                    try:
+                        status, response = await self.handle_request(method, route, body)
+                    except (ValueError, KeyError, TypeError, orjson.JSONDecodeError) as e:
+                        status, response = 400, {"error": str(e)}
+                    except FileNotFoundError as e:
+                        status, response = 404, {"error": str(e)}
+
+        except Exception as e:
+            status, response = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        latency_ms = (time.perf_counter() - start) * 1e3
+        if isinstance(response, dict) and route == "/rank":
+            response["latency_ms"] = latency_ms
+
+        payload = orjson.dumps(response)
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+        self.metrics.record(route if route in ROUTES else "other", latency_ms, error=status >= 400)
@@ -0,0 +1,239 @@
+from typing import Dict, Tuple, List, Iterable, Iterator, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from collections import deque
+from timeit import default_timer as timer
+import os
+
+import numpy as np
+
+from modules_script import m_preprocess_text
+from modules_script.m_ngram import ngram_windows
+
+
+class TermIndex():
+    """
+    Compact lookup table of ranked terms (graph nodes, e.g. "climate change") for scoring documents.
+
+    The words of the terms are interned into integer ids, and each term is packed into a single
+    int64 key from its word ids (like m_ngram.NgramEdgeCounter). The keys are sorted and the
+    scores kept in an aligned (terms x score tables) array, so the n-grams of a whole batch of
+    documents are looked up with one np.searchsorted instead of one dictionary lookup per
+    n-gram string. Only the word dictionary holds strings.
+
+    Parameters
+    ----------
+    score_tables : Dict[str, List[Tuple[str, float]]]
+        Ranked term tables by name, e.g. {"inverse_pagerank": [(term, score), ...], "trust_rank": [...]}
+        (the sorted scores written by calculation_main). A term missing from a table scores 0 in it.
+    n : int, optional
+        Number of words per term. Defaults to 2.
+    skip : int, optional
+        Number of skipped words between the words of a term. Defaults to 0.
+    dtype : type, optional
+        dtype of the scores. Defaults to np.float64.
+    """
+
+    def __init__(self, score_tables: Dict[str, List[Tuple[str, float]]], n: int = 2, skip: int = 0, dtype: type = np.float64):
+        self.n = n
+        self.skip = skip
+        self.columns = list(score_tables)
+        self.bits = 63 // n
+        self.shifts = np.arange(n - 1, -1, -1, dtype=np.int64) * self.bits
+
+        self.vocabulary: Dict[str, int] = dict()
+        term_rows: Dict[str, int] = dict()
+        term_words: List[List[int]] = []
+        for table in score_tables.values():
+            for term, _ in table:
+                if term in term_rows:
+                    continue
+                words = term.split(" ")
+                if len(words) != n:
+                    raise ValueError(f"Term {term!r} does not have {n} words (ranked with another ngram_size?)")
+                term_rows[term] = len(term_words)
+                term_words.append([self.vocabulary.setdefault(word, len(self.vocabulary)) for word in words])
+
+        if len(self.vocabulary) > (1 << self.bits):
+            raise ValueError(f"Vocabulary too large for {n}-gram keys ({len(self.vocabulary)} > {1 << self.bits} words)")
+
+        scores = np.zeros((len(term_words), len(self.columns)), dtype=dtype)
+        for column, table in enumerate(score_tables.values()):
+            rows = np.fromiter((term_rows[term] for term, _ in table), dtype=np.int64, count=len(table))
+            scores[rows, column] = np.fromiter((score for _, score in table), dtype=np.float64, count=len(table))
+
+        keys = (np.array(term_words, dtype=np.int64).reshape(-1, n) << self.shifts).sum(axis=1)
+        order = np.argsort(keys)
+        self.keys = keys[order]
+        self.scores = scores[order]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the key and score arrays (the word dictionary not included).
+        """
+        return self.keys.nbytes + self.scores.nbytes
+
+    def score_words(self, documents: List[List[str]]) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of preprocessed documents: the score of a document in each table is the sum
+        of the scores of its n-grams (counting repeats), as for sentences in m_summarize.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            The scores of every document for each table, with "nodes" (number of n-grams of each
+            document) and "matched_nodes" (number of them found in the index).
+        """
+        lengths = np.fromiter((len(words) for words in documents), dtype=np.int64, count=len(documents))
+        vocabulary_get = self.vocabulary.get
+        token_ids = np.fromiter((vocabulary_get(word, -1) for words in documents for word in words), dtype=np.int64, count=int(lengths.sum()))
+        token_documents = np.repeat(np.arange(len(documents)), lengths)
+
+        # N-grams of the concatenated batch, without the ones spanning two documents
+        span = (self.n - 1) * (self.skip + 1) + 1
+        windows = ngram_windows(token_ids, self.n, self.skip)
+        window_documents = token_documents[:len(windows)]
+        within_document = window_documents == token_documents[span - 1:span - 1 + len(windows)]
+        window_documents = window_documents[within_document]
+        windows = windows[within_document]
+
+        # Unknown words (id -1) cannot be part of a term
+        known = (windows >= 0).all(axis=1)
+        keys = (windows[known] << self.shifts).sum(axis=1)
+        positions = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        matched = self.keys[positions] == keys if len(self.keys) > 0 else np.zeros(len(keys), dtype=bool)
+        matched_documents = window_documents[known][matched]
+        matched_scores = self.scores[positions[matched]]
+
+        result = {
+            column: np.bincount(matched_documents, weights=matched_scores[:, i], minlength=len(documents))
+            for i, column in enumerate(self.columns)
+        }
+        result["nodes"] = np.bincount(window_documents, minlength=len(documents))
+        result["matched_nodes"] = np.bincount(matched_documents, minlength=len(documents))
+        return result
+
+    def score_texts(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Preprocess a batch of texts (m_preprocess_text.preprocess_text, as for ranking) and score them.
+        """
+        return self.score_words([m_preprocess_text.preprocess_text(text) for text in texts])
+
+
+# ==== Worker pools ====
+
+# Index of the process pool workers, unpickled once per worker (see DocumentScorer)
+_worker_index: Optional[TermIndex] = None
+
+
+def _attach_worker(index: TermIndex) -> None:
+    global _worker_index
+    _worker_index = index
+
+
+def _score_batch(texts: List[str]) -> Dict[str, np.ndarray]:
+    return _worker_index.score_texts(texts)
+
+
+def iter_batches(texts: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    batch = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+class DocumentScorer():
+    """
+    Score a stream of documents against a TermIndex in batches, optionally in a pool of workers.
+
+    Preprocessing holds the GIL, so threads mostly overlap the vectorized lookups with it, while
+    processes scale with the CPUs (the index is sent once to each worker, not with every batch).
+    Batches are submitted ahead by at most twice the number of workers, so memory stays bounded
+    on unbounded streams, and results come back in the order of the documents.
+
+    Parameters
+    ----------
+    index : TermIndex
+        The ranked terms.
+    batch_size : int, optional
+        Number of documents per batch. Defaults to 1024.
+    workers : int, optional
+        Number of workers. Defaults to 1 (score in the calling thread).
+    pool : str, optional
+        "thread" or "process". Defaults to "process".
+    """
+
+    def __init__(self, index: TermIndex, batch_size: int = 1024, workers: int = 1, pool: str = "process"):
+        if pool not in ("thread", "process"):
+            raise ValueError(f"Unknown pool: {pool} (expected \"thread\" or \"process\")")
+
+        self.index = index
+        self.batch_size = batch_size
+        self.workers = workers
+        self.pool = pool
+
+    def _create_executor(self) -> Tuple[any, Callable[[List[str]], Dict[str, np.ndarray]]]:
+        if self.pool == "process":
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_attach_worker, initargs=(self.index,)), _score_batch
+        return ThreadPoolExecutor(max_workers=self.workers), self.index.score_texts
+
+    def score_batches(self, texts: Iterable[str]) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Yield the scores (see TermIndex.score_words) of every batch of documents, in order.
+        """
+        if self.workers <= 1:
+            for batch in iter_batches(texts, self.batch_size):
+                yield self.index.score_texts(batch)
+            return
+
+        executor, score_batch = self._create_executor()
+        with executor:
+            pending: deque[Future] = deque()
+            for batch in iter_batches(texts, self.batch_size):
+                pending.append(executor.submit(score_batch, batch))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def score(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Scores of all the documents (concatenated batches).
+        """
+        batches = list(self.score_batches(texts))
+        columns = self.index.columns + ["nodes", "matched_nodes"]
+        if len(batches) == 0:
+            return {column: np.empty(0) for column in columns}
+        return {column: np.concatenate([batch[column] for batch in batches]) for column in columns}
+
+
+def benchmark_scoring(index: TermIndex, texts: List[str], batch_size: int = 1024, workers: Optional[int] = None) -> Dict[str, float]:
+    """
+    Scoring throughput (documents per second) over the same documents: lookups of preprocessed
+    documents only, then end to end (preprocessing included) serially, with a thread pool and
+    with a process pool of `workers` workers (defaults to the number of CPUs).
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def rate(function: Callable[[], any]) -> float:
+        start = timer()
+        function()
+        seconds = timer() - start
+        return len(texts) / seconds if seconds > 0 else float("inf")
+
+    documents = [m_preprocess_text.preprocess_text(text) for text in texts]
+    return {
+        "documents": len(texts),
+        "workers": workers,
+        "lookup": rate(lambda: [index.score_words(documents[i:i + batch_size]) for i in range(0, len(documents), batch_size)]),
+        "serial": rate(lambda: DocumentScorer(index, batch_size).score(texts)),
+        "thread": rate(lambda: DocumentScorer(index, batch_size, workers, pool="thread").score(texts)),
+        "process": rate(lambda: DocumentScorer(index, batch_size, workers, pool="process").score(texts)),
+    }
@@ -0,0 +1,66 @@
+from typing import Iterator, BinaryIO, Callable, Optional
+import gzip
+import io
+import sys
+
+import orjson
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_binary_stream(source: str = "-") -> BinaryIO:
+    """
+    Open stdin ("-"), a file or a FIFO for reading, transparently decompressing gzip.
+
+    The compression is detected from the first bytes (not the file name), so it also works on
+    pipes. Nothing is read ahead beyond the stream buffer.
+    """
+    raw = sys.stdin.buffer if source == "-" else open(source, "rb")
+    stream = raw if isinstance(raw, io.BufferedReader) else io.BufferedReader(raw)
+
+    if stream.peek(len(GZIP_MAGIC))[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+
+class JsonLinesReader():
+    """
+    Iterate over the records of a JSON Lines stream, one line at a time (constant memory).
+
+    Blank lines are ignored. Invalid lines are counted and skipped, or raise a ValueError if
+    skip_invalid is False. Lines rejected by `prefilter` (called on the raw line, e.g.
+    m_extract.KeyPathExtractor.may_match) are counted and skipped without being yielded; they are
+    still decoded, so an invalid line is counted as invalid rather than filtered.
+    """
+
+    def __init__(self, stream: BinaryIO, skip_invalid: bool = True, prefilter: Optional[Callable[[bytes], bool]] = None):
+        self.stream = stream
+        self.skip_invalid = skip_invalid
+        self.prefilter = prefilter
+        self.lines = 0
+        self.records = 0
+        self.invalid_lines = 0
+        self.filtered_lines = 0
+
+    def __iter__(self) -> Iterator[any]:
+        for line_number, line in enumerate(self.stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            self.lines += 1
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                if not self.skip_invalid:
+                    raise ValueError(f"Invalid JSON on line {line_number}")
+                self.invalid_lines += 1
+                continue
+
+            if self.prefilter is not None and not self.prefilter(line):
+                self.filtered_lines += 1
+                continue
+
+            self.records += 1
+            yield record
@@ -0,0 +1,190 @@
+from typing import Dict, Tuple, List, Iterable, Optional
+import re
+
+import numpy as np
+import scipy.sparse as sp # type: ignore
+
+from modules_script import m_preprocess_text
+
+
+# A sentence ends with ".", "!" or "?" (possibly followed by a closing quote or bracket) before whitespace, or at a line break
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|(?<=[.!?][\"')\]])\s+|\s*\n\s*")
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split a text into sentences. Boundaries are always at whitespace, so preprocessing the
+    sentences one by one gives the same words as preprocessing the whole text.
+    """
+    return [sentence for sentence in (part.strip() for part in SENTENCE_BOUNDARY.split(text)) if sentence]
+
+
+def words_to_nodes(words: List[str], n: int = 2, skip: int = 0) -> List[str]:
+    """
+    Return the graph nodes (n-grams, as named by m_ngram.NgramEdgeCounter) of preprocessed words.
+    """
+    step = skip + 1
+    span = (n - 1) * step + 1
+    return [" ".join(words[i:i + span:step]) for i in range(len(words) - span + 1)]
+
+
+class SentenceIndex():
+    """
+    Inverted index from graph nodes (n-grams) to the source sentences containing them.
+
+    Sentences are indexed once (exact repeats, e.g. retweets, only increase their count), and
+    stored as a sparse sentence x node matrix of occurrence counts. Scoring every sentence
+    against a ranking is then one sparse matrix-vector product (see `rank`), and the node
+    columns of the matrix are the postings lists used for term queries.
+
+    Parameters
+    ----------
+    n : int, optional
+        Number of words per node. Defaults to 2.
+    skip : int, optional
+        Number of skipped words between the words of a node. Defaults to 0.
+    min_sentence_words : int, optional
+        Sentences with fewer words are not indexed. Defaults to 3.
+    """
+
+    def __init__(self, n: int = 2, skip: int = 0, min_sentence_words: int = 3):
+        self.n = n
+        self.skip = skip
+        self.min_sentence_words = min_sentence_words
+
+        self.sentences: List[str] = []
+        self.sentence_words: List[int] = []  # Length of each sentence (in words of the original text)
+        self.sentence_counts: List[int] = []  # Number of occurrences of each sentence
+        self.node_index: Dict[str, int] = dict()
+        self.node_names: List[str] = []
+
+        self._sentence_ids: Dict[str, int] = dict()
+        self._rows: List[int] = []
+        self._cols: List[int] = []
+        self._matrix: Optional[sp.csr_matrix] = None
+        self._postings: Optional[sp.csc_matrix] = None
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+    def add_text(self, text: str, multiplicity: int = 1) -> List[str]:
+        """
+        Index the sentences of a text, and return the preprocessed words of the whole text
+        (so the text does not need to be preprocessed again to count its edges).
+        """
+        all_words = []
+        for sentence in split_sentences(text):
+            words = m_preprocess_text.preprocess_text(sentence)
+            all_words.extend(words)
+
+            sentence_id = self._sentence_ids.get(sentence)
+            if sentence_id is not None:
+                self.sentence_counts[sentence_id] += multiplicity
+                continue
+
+            word_count = len(sentence.split())
+            nodes = words_to_nodes(words, self.n, self.skip)
+            if word_count < self.min_sentence_words or len(nodes) == 0:
+                continue
+
+            sentence_id = len(self.sentences)
+            self._sentence_ids[sentence] = sentence_id
+            self.sentences.append(sentence)
+            self.sentence_words.append(word_count)
+            self.sentence_counts.append(multiplicity)
+
+            node_index = self.node_index
+            for node in nodes:
+                node_id = node_index.get(node)
+                if node_id is None:
+                    node_id = node_index[node] = len(self.node_names)
+                    self.node_names.append(node)
+                self._rows.append(sentence_id)
+                self._cols.append(node_id)
+
+        self._matrix = None
+        return all_words
+
+    def add_texts(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self.add_text(text)
+
+    @property
+    def matrix(self) -> sp.csr_matrix:
+        """
+        Sentence x node matrix of occurrence counts (built on first use after the last addition).
+        """
+        if self._matrix is None:
+            rows = np.asarray(self._rows, dtype=np.int64)
+            cols = np.asarray(self._cols, dtype=np.int64)
+            # Duplicate (sentence, node) pairs are summed into counts
+            self._matrix = sp.csr_matrix(
+                (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+                shape=(len(self.sentences), len(self.node_names))
+            )
+            self._postings = self._matrix.tocsc()
+        return self._matrix
+
+    def get_postings(self, node: str) -> np.ndarray:
+        """
+        Return the ids of the sentences containing a node.
+        """
+        node_id = self.node_index.get(node)
+        if node_id is None:
+            return np.empty(0, dtype=np.int64)
+
+        self.matrix  # Make sure the postings are up to date
+        postings = self._postings
+        return postings.indices[postings.indptr[node_id]:postings.indptr[node_id + 1]]
+
+    def rank(self, scores: Dict[str, float]) -> "SentenceRanking":
+        """
+        Score every sentence by the sum of the scores of its nodes (counting repeated nodes).
+        """
+        node_scores = np.fromiter((scores.get(node, 0.0) for node in self.node_names), dtype=np.float64, count=len(self.node_names))
+        return SentenceRanking(self, self.matrix @ node_scores)
+
+
+class SentenceRanking():
+    """
+    Scores of the sentences of a SentenceIndex for one ranking, sorted once so every summary is
+    read off the sorted order: a summary without query terms only visits the sentences it
+    selects (and the ones too long for the remaining budget), independently of the corpus size.
+    """
+
+    def __init__(self, index: SentenceIndex, sentence_scores: np.ndarray):
+        self.index = index
+        self.sentence_scores = sentence_scores
+        # Stable sort: sentences with equal scores keep their order of appearance
+        self.order = np.argsort(-sentence_scores, kind="stable")
+        self._rank_of = np.empty(len(self.order), dtype=np.int64)
+        self._rank_of[self.order] = np.arange(len(self.order))
+
+    def summarize(self, max_words: int, terms: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Select the highest scored sentences whose total length fits in `max_words` words.
+
+        If `terms` (graph nodes, e.g. "climate change") are given, only sentences containing
+        one of them are candidates. Sentences are returned as (sentence, score) in their order
+        of appearance in the source.
+        """
+        if terms is None:
+            candidates = self.order
+        else:
+            postings = [self.index.get_postings(term) for term in terms]
+            candidate_ids = np.unique(np.concatenate(postings)) if len(postings) > 0 else np.empty(0, dtype=np.int64)
+            candidates = candidate_ids[np.argsort(self._rank_of[candidate_ids], kind="stable")]
+
+        sentence_words = self.index.sentence_words
+        selected = []
+        remaining = max_words
+        for sentence_id in map(int, candidates):  # Lazy: only the visited sentences are converted
+            if remaining < self.index.min_sentence_words:
+                break
+            if self.sentence_scores[sentence_id] <= 0:
+                break  # Sorted by score: no remaining sentence contains a scored node
+            if sentence_words[sentence_id] <= remaining:
+                selected.append(sentence_id)
+                remaining -= sentence_words[sentence_id]
+
+        return [(self.index.sentences[sentence_id], float(self.sentence_scores[sentence_id])) for sentence_id in sorted(selected)]
@@ -0,0 +1,204 @@
+from typing import Dict, Tuple, List, Iterable, Optional
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from timeit import default_timer as timer
+
+import numpy as np
+
+from modules_script import m_graph_sparse
+
+
+SHARED_ARRAYS = ("data", "indices", "indptr", "dangling")
+
+
+class SharedCSRGraph():
+    """
+    Places the CSR arrays of an m_graph_sparse.CSRGraph in multiprocessing.shared_memory, so worker
+    processes can attach to the same graph without copying it.
+
+    Use `descriptor` (small and picklable) to attach from a worker with `attach`, and call `close`
+    (and `unlink` in the creating process) when done.
+    """
+
+    def __init__(self, segments: Dict[str, shared_memory.SharedMemory], descriptor: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+        self.segments = segments
+        self.descriptor = descriptor
+
+    @classmethod
+    def create(cls, graph: m_graph_sparse.CSRGraph) -> "SharedCSRGraph":
+        segments = dict()
+        descriptor = dict()
+        try:
+            for name in SHARED_ARRAYS:
+                array = getattr(graph, name)
+                segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+
+                segments[name] = segment
+                descriptor[name] = (segment.name, array.shape, array.dtype.str)
+        except Exception:
+            for segment in segments.values():
+                segment.close()
+                segment.unlink()
+            raise
+
+        return cls(segments, descriptor)
+
+    @classmethod
+    def attach(cls, descriptor: Dict[str, Tuple[str, Tuple[int, ...], str]]) -> Tuple["SharedCSRGraph", m_graph_sparse.CSRGraph]:
+        """
+        Attach to shared arrays created by another process and return a CSRGraph viewing them (no copy).
+        Node names are not shared; results refer to nodes by index.
+        """
+        segments = dict()
+        arrays = dict()
+        for name, (segment_name, shape, dtype) in descriptor.items():
+            try:
+                # Only the creating process owns (and unlinks) the segment
+                segment = shared_memory.SharedMemory(name=segment_name, track=False)
+            except TypeError:  # Python < 3.13
+                segment = shared_memory.SharedMemory(name=segment_name)
+            segments[name] = segment
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+        graph = m_graph_sparse.CSRGraph(None, arrays["data"], arrays["indices"], arrays["indptr"], arrays["dangling"])
+        return cls(segments, descriptor), graph
+
+    def close(self) -> None:
+        for segment in self.segments.values():
+            segment.close()
+
+    def unlink(self) -> None:
+        for segment in self.segments.values():
+            segment.unlink()
+
+
+# ==== Worker side ====
+
+_worker_graphs: Dict[str, m_graph_sparse.CSRGraph] = dict()
+_worker_shared: List[SharedCSRGraph] = []
+
+
+def _attach_worker(descriptors: Dict[str, Dict[str, Tuple[str, Tuple[int, ...], str]]]) -> None:
+    for graph_name, descriptor in descriptors.items():
+        shared, graph = SharedCSRGraph.attach(descriptor)
+        _worker_shared.append(shared)
+        _worker_graphs[graph_name] = graph
+
+
+def _run_sweep_point(alpha: float, epsilon: float, bias_amounts: List[int], max_iter: int, trust_rank_max_iter: int, top_k: int) -> List[Dict[str, any]]:
+    """
+    Calculate inverse PageRank once for (alpha, epsilon), then TrustRank for every bias amount.
+    """
+    word_graph = _worker_graphs["word_graph"]
+    reversed_graph = _worker_graphs["reversed_graph"]
+
+    start = timer()
+    inverse_pagerank_scores, inverse_iterations, inverse_converged = reversed_graph.markov_chain(alpha, epsilon, max_iter)
+    inverse_time = timer() - start
+    sorted_inverse_index = m_graph_sparse.get_top_k(inverse_pagerank_scores, max(max(bias_amounts), top_k))
+
+    rows = []
+    for bias_amount in bias_amounts:
+        start = timer()
+        bias_mask = np.zeros(word_graph.node_count, dtype=bool)
+        bias_mask[sorted_inverse_index[:bias_amount]] = True
+        trust_rank_scores, trust_iterations, trust_converged = word_graph.markov_chain(alpha, epsilon, trust_rank_max_iter, bias_mask=bias_mask)
+        trust_time = timer() - start
+
+        top_trust_index = m_graph_sparse.get_top_k(trust_rank_scores, top_k)
+        rows.append({
+            "alpha": alpha,
+            "calculation_threshold": epsilon,
+            "trustrank_bias_amount": bias_amount,
+            "inverse_pagerank_iterations": inverse_iterations,
+            "inverse_pagerank_converged": inverse_converged,
+            "inverse_pagerank_ms": inverse_time * 1e3,
+            "trust_rank_iterations": trust_iterations,
+            "trust_rank_converged": trust_converged,
+            "trust_rank_ms": trust_time * 1e3,
+            "inverse_pagerank": [(int(i), float(inverse_pagerank_scores[i])) for i in sorted_inverse_index[:top_k]],
+            "trust_rank": [(int(i), float(trust_rank_scores[i])) for i in top_trust_index],
+        })
+    return rows
+
+
+# ==== Sweep runner ====
+
+def validate_sweep_grid(alphas: Iterable[float], epsilons: Iterable[float], bias_amounts: Iterable[int]) -> None:
+    """
+    Raise a ValueError if a parameter of the grid is out of range, so a sweep fails before any
+    graph is built rather than on one of its points.
+    """
+    if any(not 0 <= alpha < 1 for alpha in alphas):
+        raise ValueError("Alpha must be between 0 (inclusive) and 1 (exclusive)")
+    if any(epsilon <= 0 for epsilon in epsilons):
+        raise ValueError("Calculation threshold must be greater than 0")
+    if any(bias_amount <= 0 for bias_amount in bias_amounts):
+        raise ValueError("Bias amount must be greater than 0")
+
+
+def run_sweep(
+        weighted_edges: List[Tuple[str, str, int]],
+        alphas: Iterable[float],
+        epsilons: Iterable[float],
+        bias_amounts: Iterable[int],
+        max_iter: int = 200,
+        trust_rank_max_iter: int = 200,
+        top_k: int = 10,
+        workers: Optional[int] = None
+    ) -> List[Dict[str, any]]:
+    """
+    Run inverse PageRank + TrustRank for every combination of the given parameters.
+
+    The graph and its reverse are built once and their CSR arrays are placed in shared memory.
+    Every worker process attaches to them once (no per-worker graph copy) and calculates the grid
+    points (one task per (alpha, epsilon), covering every bias amount).
+
+    Returns
+    -------
+    List[Dict[str, any]]
+        One row per grid point: parameters, iterations, convergence, timings (ms) and the top-k
+        inverse PageRank and TrustRank scores.
+
+    Raises
+    ------
+    ValueError
+        If a parameter of the grid is out of range (see validate_sweep_grid).
+    """
+    alphas, epsilons, bias_amounts = list(alphas), list(epsilons), list(bias_amounts)
+    validate_sweep_grid(alphas, epsilons, bias_amounts)
+
+    word_graph = m_graph_sparse.CSRGraph.from_weighted_edges(weighted_edges)
+    reversed_graph = m_graph_sparse.CSRGraph.from_weighted_edges(weighted_edges, reverse=True)
+    node_names = word_graph.node_names
+
+    shared_graphs = {
+        "word_graph": SharedCSRGraph.create(word_graph),
+        "reversed_graph": SharedCSRGraph.create(reversed_graph),
+    }
+    del word_graph, reversed_graph
+
+    rows = []
+    try:
+        descriptors = {name: shared.descriptor for name, shared in shared_graphs.items()}
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_attach_worker, initargs=(descriptors,)) as executor:
+            futures = [
+                executor.submit(_run_sweep_point, alpha, epsilon, bias_amounts, max_iter, trust_rank_max_iter, top_k)
+                for alpha, epsilon in itertools.product(alphas, epsilons)
+            ]
+            for future in futures:
+                rows.extend(future.result())
+    finally:
+        for shared in shared_graphs.values():
+            shared.close()
+            shared.unlink()
+
+    # Map node indices back to names
+    for row in rows:
+        row["inverse_pagerank"] = [(node_names[i], score) for i, score in row["inverse_pagerank"]]
+        row["trust_rank"] = [(node_names[i], score) for i, score in row["trust_rank"]]
+
+    return rows
@@ -0,0 +1,267 @@
+from typing import Dict, Tuple, List, Iterable, Iterator, Union, Optional
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import math
+
+from helper_script.json_helper import get_from_nested_key
+from modules_script import m_dedup
+from modules_script import m_extract
+from modules_script import m_graph_custom
+from modules_script import m_ngram
+from modules_script import m_preprocess_text
+
+
+# Supported date formats of the record date field (ISO 8601 strings are tried first)
+DATE_FORMATS = [
+    "%a %b %d %H:%M:%S %z %Y",  # Twitter API format, e.g. "Wed Oct 10 20:19:24 +0000 2018"
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+]
+
+
+def parse_record_date(value: Union[str, int, float, datetime]) -> datetime:
+    """
+    Parse the date field of a record into a timezone-aware datetime (naive dates are treated as UTC).
+
+    Accepts ISO 8601 strings, the formats in DATE_FORMATS, unix timestamps (in seconds) and datetime objects.
+    """
+    if isinstance(value, datetime):
+        date = value
+    elif isinstance(value, (int, float)):
+        date = datetime.fromtimestamp(value, tz=timezone.utc)
+    else:
+        date = None
+        try:
+            date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            for date_format in DATE_FORMATS:
+                try:
+                    date = datetime.strptime(value, date_format)
+                    break
+                except ValueError:
+                    continue
+
+        if date is None:
+            raise ValueError(f"Unknown date format: {value}")
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+class SlidingWindowRanker():
+    """
+    Incremental inverse PageRank and TrustRank over a sliding time window.
+
+    Weighted edge counts are kept per time bucket. Adding records to a bucket or expiring a bucket
+    only applies the bucket's edge count deltas to the (forward and reversed) graphs, and each ranking
+    is warm-started from the scores of the previous window.
+    """
+
+    def __init__(self, window_size: timedelta, bucket_size: timedelta, bias_amount: int, alpha: float = 0.85, epsilon: float = 1e-5, max_iter: int = 200, trust_rank_max_iter: int = 200):
+        if bucket_size.total_seconds() <= 0 or window_size < bucket_size:
+            raise ValueError("Bucket size must be positive and not larger than the window size")
+
+        self.bucket_seconds: float = bucket_size.total_seconds()
+        self.window_buckets: int = math.ceil(window_size.total_seconds() / self.bucket_seconds)
+
+        self.bias_amount = bias_amount
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.max_iter = max_iter
+        self.trust_rank_max_iter = trust_rank_max_iter
+
+        self.buckets: Dict[int, Counter] = dict()
+        self.latest_bucket: Optional[int] = None
+
+        self.word_graph = m_graph_custom.WeightedWordDiGraph()
+        self.reversed_graph = m_graph_custom.WeightedWordDiGraph()
+
+        self.inverse_pagerank_scores: Dict[str, float] = dict()
+        self.trust_rank_scores: Dict[str, float] = dict()
+
+    def bucket_of(self, date: datetime) -> int:
+        return math.floor(date.timestamp() / self.bucket_seconds)
+
+    def bucket_start(self, bucket: int) -> datetime:
+        return datetime.fromtimestamp(bucket * self.bucket_seconds, tz=timezone.utc)
+
+    @property
+    def window_start(self) -> Optional[datetime]:
+        if self.latest_bucket is None:
+            return None
+        return self.bucket_start(self.latest_bucket - self.window_buckets + 1)
+
+    @property
+    def window_end(self) -> Optional[datetime]:
+        if self.latest_bucket is None:
+            return None
+        return self.bucket_start(self.latest_bucket + 1)
+
+    def _apply_delta(self, edge_counts: Counter, sign: int) -> None:
+        for (node1, node2), count in edge_counts.items():
+            self.word_graph.update_edge(node1, node2, sign * count)
+            self.reversed_graph.update_edge(node2, node1, sign * count)
+
+    def add(self, date: datetime, weighted_edges: Iterable[Tuple[str, str, int]]) -> bool:
+        """
+        Add the weighted edges of one record to the bucket of its date, sliding the window forward if needed.
+
+        Returns False (and ignores the record) if the record is older than the current window.
+        """
+        bucket = self.bucket_of(date)
+
+        if self.latest_bucket is not None and bucket <= self.latest_bucket - self.window_buckets:
+            return False
+
+        if self.latest_bucket is None or bucket > self.latest_bucket:
+            self.advance(bucket)
+
+        edge_counts = Counter()
+        for node1, node2, weight in weighted_edges:
+            edge_counts[(node1, node2)] += weight
+        self.buckets.setdefault(bucket, Counter()).update(edge_counts)
+        self._apply_delta(edge_counts, 1)
+        return True
+
+    def move(self, from_bucket: int, to_bucket: int, weighted_edges: Iterable[Tuple[str, str, int]]) -> None:
+        """
+        Move edge counts from one bucket of the window to another (e.g. the edges of a duplicate
+        text counted once per window to the bucket of its latest copy). The graph is unchanged.
+        """
+        for node1, node2, weight in weighted_edges:
+            self.buckets[from_bucket][(node1, node2)] -= weight
+            if self.buckets[from_bucket][(node1, node2)] <= 0:
+                del self.buckets[from_bucket][(node1, node2)]
+            self.buckets.setdefault(to_bucket, Counter())[(node1, node2)] += weight
+
+    def advance(self, bucket: int) -> None:
+        """
+        Slide the window so that it ends at `bucket`, expiring every bucket that falls out of it.
+        """
+        self.latest_bucket = bucket
+        oldest_bucket = bucket - self.window_buckets + 1
+
+        for expired_bucket in [b for b in self.buckets if b < oldest_bucket]:
+            self._apply_delta(self.buckets.pop(expired_bucket), -1)
+
+    def rank(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Calculate inverse PageRank and TrustRank of the current window, warm-started from the previous window.
+
+        Returns
+        -------
+        Tuple[Dict[str, float], Dict[str, float]]
+            The inverse PageRank scores and the TrustRank scores.
+        """
+        if len(self.word_graph.nodes) == 0:
+            self.inverse_pagerank_scores, self.trust_rank_scores = dict(), dict()
+            return self.inverse_pagerank_scores, self.trust_rank_scores
+
+        # PageRank of the reversed graph is the inverse PageRank of the graph
+        self.inverse_pagerank_scores = self.reversed_graph.get_pagerank(
+            self.alpha, self.epsilon, self.max_iter,
+            initial_scores=self.inverse_pagerank_scores
+        )
+        self.trust_rank_scores = self.word_graph.get_trust_rank(
+            self.bias_amount,
+            self.inverse_pagerank_scores,
+            alpha=self.alpha, epsilon=self.epsilon, max_iter=self.trust_rank_max_iter,
+            initial_scores=self.trust_rank_scores
+        )
+        return self.inverse_pagerank_scores, self.trust_rank_scores
+
+
+def document_weighted_edges(edge_counter: m_ngram.NgramEdgeCounter, words: List[str], weight: int = 1) -> List[Tuple[str, str, int]]:
+    """
+    Weighted edges between the consecutive n-grams of one preprocessed document, with the node
+    names of the batch mode (see m_ngram.NgramEdgeCounter.document_edges).
+    """
+    edges = edge_counter.document_edges(words)
+    if len(edges) == 0:
+        return []
+    nodes = edge_counter.decode_nodes(edges.reshape(-1))
+    return [(nodes[i], nodes[i + 1], weight) for i in range(0, len(nodes), 2)]
+
+
+def rank_windows(all_data: Iterable[Dict[str, any]], ranker: SlidingWindowRanker, extractor: m_extract.KeyPathExtractor, date_key: List[str], edge_counter: Optional[m_ngram.NgramEdgeCounter] = None, dedup: bool = False, top_k: Optional[int] = None, throw_key_error: bool = False) -> Iterator[Dict[str, any]]:
+    """
+    Feed records to a SlidingWindowRanker in date order and yield the ranking after each non-empty bucket.
+
+    The edges of a record are built as in the batch mode: its text fields are extracted with their
+    weights, preprocessed, and turned into edges between consecutive n-grams.
+
+    Parameters
+    ----------
+    all_data : Iterable[Dict[str, any]]
+        The records of the dataset.
+    ranker : SlidingWindowRanker
+        The ranker holding the window state.
+    extractor : m_extract.KeyPathExtractor
+        The text fields of each record, with their weights.
+    date_key : List[str]
+        Keys to the date inside each record. Records without a date are skipped.
+    edge_counter : m_ngram.NgramEdgeCounter, optional
+        The n-gram size and skip of the nodes (only used to build edges). Defaults to bigrams.
+    dedup : bool, optional
+        Whether to count a text only once per window (exact duplicates, separately for each field
+        weight, see m_dedup.ExactDeduplicator). The count follows the latest copy, so it stays in
+        the window as long as a copy does. Defaults to False.
+    top_k : int, optional
+        Number of top scores to include in each result. Defaults to all.
+
+    Yields
+    ------
+    Dict[str, any]
+        Window start/end (ISO 8601), graph size and the sorted inverse PageRank and TrustRank scores.
+    """
+    edge_counter = edge_counter or m_ngram.NgramEdgeCounter()
+    deduplicators: Dict[int, m_dedup.ExactDeduplicator] = dict()
+
+    dated_data = []
+    for data in all_data:
+        date = get_from_nested_key(data, date_key, throw_key_error=throw_key_error)
+        if date is None:
+            continue
+        dated_data.append((parse_record_date(date), data))
+    dated_data.sort(key=lambda dated: dated[0])
+
+    def window_result() -> Dict[str, any]:
+        inverse_pagerank_scores, trust_rank_scores = ranker.rank()
+        return {
+            "window_start": ranker.window_start.isoformat(),
+            "window_end": ranker.window_end.isoformat(),
+            "nodes": len(ranker.word_graph.nodes),
+            "edges": len(ranker.word_graph.edges),
+            "inverse_pagerank": m_graph_custom.get_sorted_rank_score(inverse_pagerank_scores)[:top_k],
+            "trust_rank": m_graph_custom.get_sorted_rank_score(trust_rank_scores)[:top_k],
+        }
+
+    current_bucket = None
+    for date, data in dated_data:
+        bucket = ranker.bucket_of(date)
+        if current_bucket is not None and bucket != current_bucket:
+            yield window_result()
+        current_bucket = bucket
+
+        weighted_edges, moved_edges = [], []
+        for text, weight in extractor.extract(data):
+            # A duplicate of a text still in the window is not counted again, its count moves to this bucket
+            previous_bucket = None
+            if dedup:
+                previous_bucket = deduplicators.setdefault(weight, m_dedup.ExactDeduplicator()).add(text, bucket, since=bucket - ranker.window_buckets + 1)
+            if previous_bucket == bucket:
+                continue
+
+            text_edges = document_weighted_edges(edge_counter, m_preprocess_text.preprocess_text(text), weight)
+            if previous_bucket is None:
+                weighted_edges.extend(text_edges)
+            else:
+                moved_edges.append((previous_bucket, text_edges))
+
+        ranker.add(date, weighted_edges)
+        for previous_bucket, text_edges in moved_edges:
+            ranker.move(previous_bucket, bucket, text_edges)
+
+    if current_bucket is not None:
+        yield window_result()
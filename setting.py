@@ -16,7 +16,10 @@ CONFIG_STRUCTURE = """{
     "parameters": {
         "calculation_threshold": 1e-5,
         "max_calculation_iteration": 200,
-        "max_summarize_length": 20
+        "max_trust_rank_iteration": 200,
+        "max_summarize_length": 20,
+        "ngram_size": 2,
+        "ngram_skip": 0
     },
     "options": {
         "use_pagerank_library": false,
@@ -25,7 +28,73 @@ CONFIG_STRUCTURE = """{
     },
     "target_data_key": [
         "full_text"
-    ]
+    ],
+    "target_data_keys": [],
+    "date_data_key": [
+        "date"
+    ],
+    "dedup": {
+        "enabled": false,
+        "near_duplicate": true,
+        "count_duplicates": false,
+        "similarity_threshold": 0.8,
+        "num_perm": 64,
+        "bands": 16,
+        "shingle_size": 3
+    },
+    "pruning": {
+        "enabled": false,
+        "min_edge_weight": 2,
+        "min_node_frequency": 1,
+        "max_vocabulary": null,
+        "k_core": 0,
+        "report": false,
+        "report_top_k": 20
+    },
+    "heavy_hitters": {
+        "enabled": false,
+        "capacity": 100000,
+        "top_edges": 50000
+    },
+    "rank_cache": {
+        "enabled": false,
+        "max_size_mb": 256
+    },
+    "graph_rendering": {
+        "top_k": 100,
+        "weighted_sample": false,
+        "layout": "spring",
+        "layout_iterations": 50,
+        "edge_labels": false,
+        "format": "png"
+    },
+    "checkpoint": {
+        "enabled": false,
+        "snapshot_interval": 20
+    },
+    "summarization": {
+        "enabled": false,
+        "score": "trust_rank",
+        "min_sentence_words": 3
+    },
+    "memory": {
+        "score_dtype": null,
+        "budget_mb": null,
+        "on_exceed": "downshift"
+    },
+    "planner": {
+        "enabled": false,
+        "backends": ["nx", "custom", "float64", "float32"],
+        "max_workers": null
+    },
+    "corpus": {
+        "file_weight": 1.0
+    },
+    "scoring": {
+        "batch_size": 1024,
+        "workers": 1,
+        "pool": "process"
+    }
 }"""
 
 
@@ -81,8 +150,92 @@ SHOW_GRAPH: bool = CONFIG["options"]["show_graph"]
 # Calculation Config
 TARGET_DATA_KEY: Optional[list] = CONFIG["target_data_key"]
 if len(TARGET_DATA_KEY) == 0: TARGET_DATA_KEY = None
+DATE_DATA_KEY: List[str] = CONFIG.get("date_data_key", ["data", "date"])  # Used by the sliding window mode
+TARGET_DATA_KEYS: Optional[list] = CONFIG.get("target_data_keys") or None  # Several key paths with weights (overrides TARGET_DATA_KEY)
 
 CALCULATION_THRESHOLD: float = CONFIG["parameters"]["calculation_threshold"]
 MAX_CALCULATION_ITERATION: int = CONFIG["parameters"]["max_calculation_iteration"]
 TRUST_RANK_BIAS_AMOUNT: int = CONFIG["parameters"]["trustrank_bias_amount"]
-MAX_TRUST_RANK_ITERATION: int = CONFIG["parameters"]["max_summarize_length"] # Equivalent to max number of summarized words
+MAX_TRUST_RANK_ITERATION: int = CONFIG["parameters"].get("max_trust_rank_iteration", MAX_CALCULATION_ITERATION)
+DAMPING_FACTOR: float = CONFIG["parameters"].get("damping_factor", 0.85)  # Alpha of inverse PageRank and TrustRank
+MAX_SUMMARIZE_LENGTH: int = CONFIG["parameters"]["max_summarize_length"]  # Max number of words of a summary
+NGRAM_SIZE: int = CONFIG["parameters"].get("ngram_size", 2)  # Number of words per graph node
+NGRAM_SKIP: int = CONFIG["parameters"].get("ngram_skip", 0)  # Number of skipped words between the words of a node (skip-grams)
+
+
+# Duplicate collapsing (optional section)
+DEDUP_CONFIG: dict = CONFIG.get("dedup", {})
+DEDUP_ENABLED: bool = DEDUP_CONFIG.get("enabled", False)
+DEDUP_NEAR_DUPLICATE: bool = DEDUP_CONFIG.get("near_duplicate", True)
+DEDUP_COUNT_DUPLICATES: bool = DEDUP_CONFIG.get("count_duplicates", False)
+DEDUP_SIMILARITY_THRESHOLD: float = DEDUP_CONFIG.get("similarity_threshold", 0.8)
+DEDUP_NUM_PERM: int = DEDUP_CONFIG.get("num_perm", 64)
+DEDUP_BANDS: int = DEDUP_CONFIG.get("bands", 16)
+DEDUP_SHINGLE_SIZE: int = DEDUP_CONFIG.get("shingle_size", 3)
+
+# Graph pruning (optional section)
+PRUNING_CONFIG: dict = CONFIG.get("pruning", {})
+PRUNING_ENABLED: bool = PRUNING_CONFIG.get("enabled", False)
+PRUNING_MIN_EDGE_WEIGHT: int = PRUNING_CONFIG.get("min_edge_weight", 1)
+PRUNING_MIN_NODE_FREQUENCY: int = PRUNING_CONFIG.get("min_node_frequency", 1)
+PRUNING_MAX_VOCABULARY: Optional[int] = PRUNING_CONFIG.get("max_vocabulary", None)
+PRUNING_K_CORE: int = PRUNING_CONFIG.get("k_core", 0)
+PRUNING_REPORT: bool = PRUNING_CONFIG.get("report", False)
+PRUNING_REPORT_TOP_K: int = PRUNING_CONFIG.get("report_top_k", 20)
+
+# Approximate heavy hitter edge counting (optional section)
+HEAVY_HITTERS_CONFIG: dict = CONFIG.get("heavy_hitters", {})
+HEAVY_HITTERS_ENABLED: bool = HEAVY_HITTERS_CONFIG.get("enabled", False)
+HEAVY_HITTERS_CAPACITY: int = HEAVY_HITTERS_CONFIG.get("capacity", 100000)  # Number of edge counters (fixed memory)
+HEAVY_HITTERS_TOP_EDGES: Optional[int] = HEAVY_HITTERS_CONFIG.get("top_edges", 50000)  # Number of heaviest edges used for the graph
+
+# Ranking result cache (optional section)
+RANK_CACHE_CONFIG: dict = CONFIG.get("rank_cache", {})
+RANK_CACHE_ENABLED: bool = RANK_CACHE_CONFIG.get("enabled", False)
+RANK_CACHE_MAX_SIZE_MB: float = RANK_CACHE_CONFIG.get("max_size_mb", 256)
+RANK_CACHE_DIR: Path = CACHE_DIR / "rank_cache"
+
+# Graph rendering (optional section, used when show_graph is true)
+GRAPH_RENDER_CONFIG: dict = CONFIG.get("graph_rendering", {})
+GRAPH_RENDER_TOP_K: int = GRAPH_RENDER_CONFIG.get("top_k", 100)
+GRAPH_RENDER_SAMPLE: bool = GRAPH_RENDER_CONFIG.get("weighted_sample", False)
+GRAPH_RENDER_LAYOUT: str = GRAPH_RENDER_CONFIG.get("layout", "spring")
+GRAPH_RENDER_LAYOUT_ITERATIONS: int = GRAPH_RENDER_CONFIG.get("layout_iterations", 50)
+GRAPH_RENDER_EDGE_LABELS: bool = GRAPH_RENDER_CONFIG.get("edge_labels", False)
+GRAPH_RENDER_FORMAT: str = GRAPH_RENDER_CONFIG.get("format", "png")
+
+# Checkpointing of batch runs (optional section)
+CHECKPOINT_CONFIG: dict = CONFIG.get("checkpoint", {})
+CHECKPOINT_ENABLED: bool = CHECKPOINT_CONFIG.get("enabled", False)
+CHECKPOINT_SNAPSHOT_INTERVAL: int = CHECKPOINT_CONFIG.get("snapshot_interval", 20)  # Iterations between score snapshots
+CHECKPOINT_DIR: Path = CACHE_DIR / "checkpoints"
+
+# Extractive summarization (optional section)
+SUMMARIZATION_CONFIG: dict = CONFIG.get("summarization", {})
+SUMMARIZATION_ENABLED: bool = SUMMARIZATION_CONFIG.get("enabled", False)
+SUMMARIZATION_SCORE: str = SUMMARIZATION_CONFIG.get("score", "trust_rank")  # "trust_rank" or "inverse_pagerank"
+SUMMARIZATION_MIN_SENTENCE_WORDS: int = SUMMARIZATION_CONFIG.get("min_sentence_words", 3)
+
+# Compact scores and memory budget (optional section)
+MEMORY_CONFIG: dict = CONFIG.get("memory", {})
+MEMORY_SCORE_DTYPE: Optional[str] = MEMORY_CONFIG.get("score_dtype", None)  # None (dictionaries of floats), "float64" or "float32"
+MEMORY_BUDGET_MB: Optional[float] = MEMORY_CONFIG.get("budget_mb", None)  # Peak memory allowed for building and ranking a graph
+MEMORY_ON_EXCEED: str = MEMORY_CONFIG.get("on_exceed", "downshift")  # "downshift" or "refuse"
+
+# Automatic planning of the ranking backend and worker threads (optional section)
+PLANNER_CONFIG: dict = CONFIG.get("planner", {})
+PLANNER_ENABLED: bool = PLANNER_CONFIG.get("enabled", False)
+PLANNER_BACKENDS: List[str] = PLANNER_CONFIG.get("backends", ["nx", "custom", "float64", "float32"])  # Backends the planner may choose
+PLANNER_MAX_WORKERS: Optional[int] = PLANNER_CONFIG.get("max_workers", None)  # Threads of the sparse power iteration (None: the number of CPUs)
+PLANNER_COST_MODEL_PATH: Path = CACHE_DIR / "planner_cost_model.json"  # Written by --calibrate-planner
+PLANNER_LOG_PATH: Path = OUTPUT_DIR / "planner_log.jsonl"  # Predicted and actual time of every planned ranking
+
+# Global corpus graph with personalized file rankings (optional section, used with --corpus)
+CORPUS_CONFIG: dict = CONFIG.get("corpus", {})
+CORPUS_FILE_WEIGHT: float = CORPUS_CONFIG.get("file_weight", 1.0)  # Share of a file's own edge counts in its ranking (the rest from the global counts)
+
+# Batch document scoring against ranked terms (optional section, used with --score)
+SCORING_CONFIG: dict = CONFIG.get("scoring", {})
+SCORING_BATCH_SIZE: int = SCORING_CONFIG.get("batch_size", 1024)  # Documents per batch
+SCORING_WORKERS: int = SCORING_CONFIG.get("workers", 1)  # 1 scores in the main thread
+SCORING_POOL: str = SCORING_CONFIG.get("pool", "process")  # "thread" or "process"
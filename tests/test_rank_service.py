@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+import orjson
+
+# Run from the repository root (config.json is read from the working directory)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from modules_script import m_rank_service
+
+
+RECORDS = [
+    {"data": {"full_text": "climate change policy climate change action", "date": "2024-01-01"}},
+    {"data": {"full_text": "climate change action now climate change policy", "date": "2024-01-02"}},
+    {"data": {"full_text": "renewable energy policy climate change action", "date": "2024-01-03"}},
+]
+
+
+async def send(port: int, raw_request: bytes) -> tuple:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw_request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), orjson.loads(body)
+
+
+def post(path: str, body: bytes) -> bytes:
+    return f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+
+
+class RankingServiceTest(unittest.TestCase):
+    """
+    Start the ranking service on an ephemeral localhost port and query it over HTTP.
+    """
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.data_dir.name, "records.json"), "wb") as f:
+            f.write(orjson.dumps(RECORDS))
+
+        self.service = m_rank_service.RankingService(
+            data_dir=self.data_dir.name,
+            functions=m_rank_service.ServiceFunctions(main.service_weighted_bigrams, main.build_service_graph, main.rank_word_graph),
+            bias_amount=1,
+            workers=1,
+        )
+
+    def tearDown(self):
+        self.service.close()
+        self.data_dir.cleanup()
+
+    def run_requests(self, *raw_requests: bytes) -> list:
+        async def scenario():
+            server = await self.service.start(host="127.0.0.1", port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return [await send(port, raw_request) for raw_request in raw_requests]
+        return asyncio.run(scenario())
+
+    def test_rank(self):
+        (dataset_status, dataset), (documents_status, documents), (health_status, _) = self.run_requests(
+            post("/rank", orjson.dumps({"dataset": "records.json", "top_k": 3})),
+            post("/rank", orjson.dumps({"documents": [record["data"]["full_text"] for record in RECORDS], "top_k": 3})),
+            b"GET /health HTTP/1.1\r\n\r\n",
+        )
+        self.assertEqual(health_status, 200)
+
+        # The same texts rank the same way from a dataset and from documents
+        self.assertEqual(dataset_status, 200)
+        self.assertEqual(documents_status, 200)
+        self.assertEqual(len(dataset["inverse_pagerank"]), 3)
+        self.assertEqual(dataset["inverse_pagerank"], documents["inverse_pagerank"])
+        self.assertEqual(dataset["trust_rank"], documents["trust_rank"])
+
+        # And as in the batch mode
+        expected_inverse_pagerank, _ = main.rank_word_graph(main.build_service_graph(main.service_weighted_bigrams(RECORDS)))
+        self.assertEqual([term for term, _ in dataset["inverse_pagerank"]], [term for term, _ in expected_inverse_pagerank[:3]])
+
+    def test_malformed_requests(self):
+        responses = self.run_requests(
+            post("/rank", b"[]"),
+            post("/rank", b'"x"'),
+            post("/rank", b"{not json"),
+            post("/rank", orjson.dumps({"documents": "not a list"})),
+            post("/rank", orjson.dumps({"dataset": "../records.json"})),
+            post("/rank", orjson.dumps({"dataset": "missing.json"})),
+            b"GET /rank HTTP/1.1\r\n\r\n",
+            b"GET /unknown HTTP/1.1\r\n\r\n",
+            b"\r\n",
+        )
+        self.assertEqual([status for status, _ in responses], [400, 400, 400, 400, 400, 404, 405, 404, 400])
+        for _, body in responses:
+            self.assertIn("error", body)
+
+
+if __name__ == "__main__":
+    unittest.main()